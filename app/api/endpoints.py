@@ -1,88 +1,605 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Query, Request, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, StreamingResponse
 from io import BytesIO
+from typing import List
 import uuid
-import math
+import time
 
+from redis.exceptions import LockError
+
+from app.core.config import settings
+from app.services.column_selection import ColumnSelection, ColumnSelectionError
 from app.services.data_processor import DataProcessor
 from app.services.storage_service import StorageService
-from app.services.cache_service import CacheService
-from app.services.pdf_service import PDFService
+from app.services.cache_service import CacheService, build_cache_data
+from app.services.job_queue import JobQueue
+from app.services.job_service import JobService, JobQueueFullError
+from app.services.parsers import get_parser, ParserUnavailableError
+from app.services.process_pool import ProcessingPool, PoolSaturatedError
+from app.services.snapshot import SnapshotStore
+from app.services.upload_service import (
+    UploadService, UploadSpool, UploadStream, UploadTooLargeError, InvalidUploadError, StageError
+)
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 storage_service = StorageService()
+# Sin conexiones todavía: el pool de Redis lo crea el lifespan de la app (app.main)
 cache_service = CacheService()
+job_service = JobService(cache_service)
+processing_pool = ProcessingPool()
+snapshot_store = SnapshotStore(storage_service)
+# Solo se conecta con JOB_BACKEND="queue": el cliente de redis abre la conexión en el primer comando
+job_queue = JobQueue()
 
-def sanitize_stats(data):
-    """Limpia valores NaN e infinitos de las estadísticas"""
-    if isinstance(data, dict):
-        return {k: sanitize_stats(v) for k, v in data.items()}
-    elif isinstance(data, float):
-        if math.isnan(data) or math.isinf(data):
-            return None
-        return data
-    else:
-        return data
+# El cuerpo se lee en streaming (ver UploadService), así que el esquema del
+# formulario se documenta a mano para que siga apareciendo en /docs
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
 
-@router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    if not (file.filename.endswith('.csv') or file.filename.endswith('.xlsx')):
+
+def _validate_filename(filename: str):
+    if not (filename.endswith('.csv') or filename.endswith('.xlsx')):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Solo se permiten archivos CSV o Excel (.csv, .xlsx)"
         )
 
-    contents = await file.read()
 
-    # Guardar en MinIO
-    ok = storage_service.save_file(
-        filename=file.filename,
-        file_bytes=contents,
-        content_type=file.content_type or "application/octet-stream"
+def _resolve_parser(parser: str) -> str:
+    """Valida el parser pedido antes de recibir el archivo; devuelve el nombre efectivo"""
+    try:
+        return get_parser(parser).name
+    except ParserUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _resolve_columns(columns: List[str], columns_regex: str):
+    """Selección de columnas del upload; la regex se valida antes de recibir el archivo"""
+    try:
+        return ColumnSelection.from_request(columns, columns_regex)
+    except ColumnSelectionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def _open_upload(request: Request) -> UploadStream:
+    """Lee los encabezados del multipart y valida el nombre antes de recibir el contenido"""
+    try:
+        stream = await UploadStream(request).start()
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    _validate_filename(stream.filename)
+    return stream
+
+
+def _pool_saturated(e: PoolSaturatedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
     )
-    if not ok:
-        raise HTTPException(status_code=500, detail="No se pudo guardar el archivo en MinIO")
 
-    # Procesar archivo con el nuevo DataProcessor
+
+def _queue_backend() -> bool:
+    return settings.JOB_BACKEND == "queue"
+
+
+async def _spool_and_store(stream: UploadStream, object_name: str = None):
+    """Recibe el upload en el spool y lo guarda en MinIO; el spool queda abierto para el parser"""
+    t0 = time.perf_counter()
+
+    # Recibir por bloques en un spool acotado en memoria; el límite se aplica a medida que llegan
+    # los bytes
+    try:
+        spool = await UploadService.spool_upload(stream)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    t_recepcion = time.perf_counter()
+
     try:
-        result = DataProcessor.process_file(contents, file.filename)
+        # Guardar en MinIO leyendo directamente del spool
+        ok = storage_service.save_file(
+            filename=spool.filename,
+            file_bytes=spool.rewind(),
+            content_type=spool.content_type or "application/octet-stream",
+            object_name=object_name
+        )
+        if not ok:
+            raise HTTPException(status_code=500, detail="No se pudo guardar el archivo en MinIO")
+    except Exception:
+        spool.close()
+        raise
+
+    tiempos = {
+        "recepcion_s": round(t_recepcion - t0, 4),
+        "almacenamiento_s": round(time.perf_counter() - t_recepcion, 4)
+    }
+    return spool, tiempos
+
+
+async def _receive_spooled(stream: UploadStream, parser: str = None,
+                           columns: ColumnSelection = None, snapshot_dir: str = None):
+    """Modo por defecto: spool completo, luego MinIO y luego el parser, ambos desde el spool"""
+    spool, tiempos = await _spool_and_store(stream)
+
+    # Procesar archivo con el nuevo DataProcessor, desde el mismo spool y fuera del event loop
+    t0 = time.perf_counter()
+    try:
+        result = await processing_pool.process_spool(spool, parser=parser, columns=columns,
+                                                     snapshot_dir=snapshot_dir)
+    except PoolSaturatedError as e:
+        raise _pool_saturated(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error procesando archivo: {str(e)}")
+    finally:
+        spool.close()
+
+    tiempos["procesamiento_s"] = round(time.perf_counter() - t0, 4)
+    tiempos["total_s"] = round(sum(tiempos.values()), 4)
+    tiempos["solapamiento_s"] = 0.0
+    return result, spool.size, tiempos
+
+
+async def _receive_pipeline(
+    stream: UploadStream, parser: str = None, columns: ColumnSelection = None
+):
+    """
+    Modo pipeline: cada bloque va a la vez a MinIO (multipart de largo desconocido) y al parser.
+    Excel necesita acceso aleatorio al zip, así que su rama de parseo llena un spool y se procesa
+    al final.
+    """
+    filename = stream.filename
+    content_type = stream.content_type or "application/octet-stream"
+    spool = None
 
+    def store(pipe):
+        return storage_service.save_file(filename=filename, file_bytes=pipe,
+                                         content_type=content_type)
+
+    if filename.endswith('.csv'):
+        def parse(pipe):
+            return DataProcessor.process_file(pipe, filename, parser=parser, columns=columns)
+    else:
+        spool = UploadSpool(filename, content_type)
+
+        def parse(pipe):
+            while True:
+                chunk = pipe.read(1024 * 1024)
+                if not chunk:
+                    return None
+                spool.write(chunk)
+
+    try:
+        try:
+            results, tiempos = await UploadService.tee_upload(
+                stream, {"almacenamiento": store, "procesamiento": parse}
+            )
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        except StageError as e:
+            if e.stage == "almacenamiento":
+                raise HTTPException(status_code=500,
+                                    detail="No se pudo guardar el archivo en MinIO")
+            raise HTTPException(status_code=400, detail=f"Error procesando archivo: {str(e.error)}")
+
+        if not results["almacenamiento"]:
+            raise HTTPException(status_code=500, detail="No se pudo guardar el archivo en MinIO")
+
+        result = results["procesamiento"]
+        if spool is not None:
+            t0 = time.perf_counter()
+            try:
+                result = await processing_pool.process_spool(spool, parser=parser, columns=columns)
+            except PoolSaturatedError as e:
+                raise _pool_saturated(e)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Error procesando archivo: {str(e)}")
+            extra = round(time.perf_counter() - t0, 4)
+            tiempos["procesamiento_s"] = round(tiempos["procesamiento_s"] + extra, 4)
+            tiempos["total_s"] = round(tiempos["total_s"] + extra, 4)
+    finally:
+        if spool is not None:
+            spool.close()
+
+    return result, stream.size, tiempos
+
+
+async def _persist_state(file_id: str, result: dict):
+    """
+    Guarda en MinIO, junto a la foto, el estado mergeable que dejó el análisis por bloques (para el
+    primer POST /{file_id}/append). En Redis solo queda el de los archivos que ya tuvieron anexos.
+    """
+    state = result.pop("estado", None)
+    if state is not None:
+        await run_in_threadpool(snapshot_store.save_state, file_id, state)
+
+
+def _object_name(file_id: str, filename: str) -> str:
+    """Con la cola los workers leen el archivo de MinIO: cada upload va a una clave propia"""
+    return f"{file_id}/{filename}" if _queue_backend() else None
+
+
+async def _schedule_analysis(spool: UploadSpool, file_id: str, background_tasks: BackgroundTasks,
+                             parser: str = None, columns: ColumnSelection = None) -> dict:
+    """
+    Registra el trabajo y agenda el análisis completo del spool, que se cierra al terminar.
+    Con JOB_BACKEND="queue" solo se publica en el stream y lo procesa un worker (app.worker).
+    """
+    if _queue_backend():
+        spool.close()
+        return await job_service.enqueue(job_queue, file_id, spool.filename, spool.size, {
+            "object_name": _object_name(file_id, spool.filename),
+            "parser": parser,
+            "columns": columns.to_dict() if columns else None
+        })
+
+    job = await job_service.create(file_id, spool.filename, spool.size)
+
+    async def process():
+        staging = snapshot_store.staging()
+        try:
+            # En segundo plano se espera un lugar en el pool en vez de responder 503
+            result = await processing_pool.process_spool(
+                spool, wait=True, parser=parser, columns=columns, snapshot_dir=staging
+            )
+        except Exception:
+            snapshot_store.discard(staging)
+            raise
+        finally:
+            spool.close()
+        # La subida a MinIO es bloqueante: en un hilo, para no frenar el event loop
+        await run_in_threadpool(snapshot_store.publish_result, file_id, staging, result)
+        await _persist_state(file_id, result)
+        return build_cache_data(result)
+
+    background_tasks.add_task(job_service.run, job, process)
+    return job
+
+
+async def _upload_async(stream: UploadStream, background_tasks: BackgroundTasks, parser: str = None,
+                        columns: ColumnSelection = None):
+    """mode=async: guarda el archivo, responde 202 y procesa en segundo plano"""
     file_id = str(uuid.uuid4())
+    spool, tiempos = await _spool_and_store(stream, _object_name(file_id, stream.filename))
 
-    # Preparar datos para cache - ahora usamos toda la estructura mejorada
-    cache_data = {
-        "resumen_general": result["resumen_general"],
-        "analisis_columnas": sanitize_stats(result["analisis_columnas"]),
-        # Mantenemos las estadísticas originales por compatibilidad
-        "estadisticas_pandas": sanitize_stats(result["estadisticas_pandas"])
-    }
+    try:
+        job = await _schedule_analysis(spool, file_id, background_tasks, parser, columns)
+    except JobQueueFullError as e:
+        spool.close()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception:
+        spool.close()
+        raise
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "file_id": file_id,
+            "filename": spool.filename,
+            "size_bytes": spool.size,
+            "estado": job["estado"],
+            "status_url": f"jobs/{file_id}",
+            "parser": parser,
+            "tiempos": tiempos,
+            "message": "Archivo subido, el análisis se está procesando"
+        }
+    )
 
-    # Guardar en cache
-    cache_service.set_stats(file_id, cache_data)
+
+async def _upload_preview(stream: UploadStream, background_tasks: BackgroundTasks,
+                          parser: str = None, columns: ColumnSelection = None):
+    """
+    mode=preview: responde con el análisis de una muestra y agenda el análisis completo con el
+    mismo file_id. Hasta que termine, GET /files/stats/{file_id} devuelve la versión aproximada.
+    """
+    file_id = str(uuid.uuid4())
+    spool, tiempos = await _spool_and_store(stream, _object_name(file_id, stream.filename))
+
+    t0 = time.perf_counter()
+    try:
+        preview = await processing_pool.preview_spool(spool, parser=parser, columns=columns)
+    except PoolSaturatedError as e:
+        spool.close()
+        raise _pool_saturated(e)
+    except Exception as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=f"Error procesando archivo: {str(e)}")
+    tiempos["preview_s"] = round(time.perf_counter() - t0, 4)
+
+    cache_data = build_cache_data(preview)
+    try:
+        await cache_service.set_stats(file_id, cache_data)
+        job = await _schedule_analysis(spool, file_id, background_tasks, parser, columns)
+        estado, status_url = job["estado"], f"jobs/{file_id}"
+    except JobQueueFullError:
+        # La vista previa ya está lista: se entrega aunque el análisis completo no entre en la cola
+        spool.close()
+        estado, status_url = None, None
+    except Exception:
+        spool.close()
+        raise
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "file_id": file_id,
+            "filename": spool.filename,
+            "size_bytes": spool.size,
+            "aproximado": cache_data["resumen_general"]["aproximado"],
+            "resumen": cache_data["resumen_general"],
+            "analisis_columnas": cache_data["analisis_columnas"],
+            "estado": estado,
+            "status_url": status_url,
+            "parser": parser,
+            "tiempos": tiempos,
+            "message": ("Vista previa sobre una muestra, el análisis completo se está procesando"
+                        if status_url else
+                        "Vista previa sobre una muestra; la cola está llena y no se "
+                        "agendó el análisis completo")
+        }
+    )
+
+
+@router.post("/upload", openapi_extra=UPLOAD_OPENAPI)
+async def upload_file(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    pipeline: bool = False,
+    mode: str = Query("sync", pattern="^(sync|async|preview)$"),
+    parser: str = Query(
+        None, description="Parser de CSV: auto, pandas o pyarrow (por defecto PARSER_BACKEND)"
+    ),
+    columns: List[str] = Query(
+        None, description="Columnas a analizar (repetido o separado por comas)"
+    ),
+    columns_regex: str = Query(
+        None, description="Expresión regular: se analizan las columnas que coinciden"
+    )
+):
+    """
+    Sube y analiza un archivo. Con pipeline=true el upload se envía a MinIO y al parser
+    al mismo tiempo, sin esperar a que termine el almacenamiento. Con mode=async responde
+    202 de inmediato y el estado se consulta en GET /files/jobs/{file_id}. Con mode=preview
+    responde 202 con el análisis aproximado de una muestra y sigue como mode=async. Con columns y/o
+    columns_regex solo se parsean y analizan esas columnas; el resto figura en resumen.columnas.
+    """
+    if pipeline and mode != "sync":
+        raise HTTPException(
+            status_code=400, detail=f"pipeline=true no se puede combinar con mode={mode}"
+        )
+    parser = _resolve_parser(parser)
+    selection = _resolve_columns(columns, columns_regex)
+
+    stream = await _open_upload(request)
+
+    if mode == "async":
+        return await _upload_async(stream, background_tasks, parser, selection)
+    if mode == "preview":
+        return await _upload_preview(stream, background_tasks, parser, selection)
+
+    # En pipeline el CSV se lee como stream y nunca queda entero en memoria: no hay foto
+    staging = None if pipeline else snapshot_store.staging()
+    try:
+        if pipeline:
+            result, size_bytes, tiempos = await _receive_pipeline(stream, parser, selection)
+        else:
+            result, size_bytes, tiempos = await _receive_spooled(stream, parser, selection, staging)
+    except Exception:
+        snapshot_store.discard(staging)
+        raise
+
+    file_id = str(uuid.uuid4())
+    snapshot = await run_in_threadpool(snapshot_store.publish_result, file_id, staging, result)
+
+    # Guardar en cache - ahora usamos toda la estructura mejorada
+    await cache_service.set_stats(file_id, build_cache_data(result))
+    await _persist_state(file_id, result)
 
     # Respuesta al usuario con la nueva estructura
     return JSONResponse(
         status_code=201,
         content={
             "file_id": file_id,
-            "filename": file.filename,
-            "size_bytes": len(contents),
+            "filename": stream.filename,
+            "size_bytes": size_bytes,
             "resumen": result["resumen_general"],
             "preview_analisis": {
                 col: info.get("interpretacion", ["Sin interpretación disponible"])[:2]  # Solo las primeras 2 interpretaciones
                 for col, info in result["analisis_columnas"].items()
             },
+            "tiempos": tiempos,
+            "parser": parser,
+            "snapshot": snapshot,
             "message": "Archivo subido, procesado y análisis generado exitosamente"
         }
     )
 
+
+@router.post("/{file_id}/append", openapi_extra=UPLOAD_OPENAPI)
+async def append_rows(
+    file_id: str,
+    request: Request,
+    parser: str = Query(
+        None, description="Parser de CSV: auto, pandas o pyarrow (por defecto PARSER_BACKEND)"
+    )
+):
+    """
+    Anexa un lote de filas (CSV con las mismas columnas) a un archivo ya analizado. Solo se
+    parsea el lote: se combina con el estado mergeable de las columnas guardado junto a las stats,
+    así que el tiempo depende del lote y no de la historia. El lote queda en MinIO.
+    """
+    parser = _resolve_parser(parser)
+    stream = await _open_upload(request)
+    if not stream.filename.endswith(".csv"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Solo se pueden anexar lotes CSV")
+
+    lock = cache_service.lock(file_id)
+    if not await lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Ya se están anexando filas a ese file_id")
+    try:
+        stats = await cache_service.get_stats(file_id, sections=["resumen_general"])
+        if not stats:
+            raise HTTPException(status_code=404, detail="No se encontraron stats para ese file_id")
+
+        state = await cache_service.get_state(file_id)
+        if state is None and not stats["resumen_general"].get("anexos"):
+            # Primer anexo de un archivo analizado por bloques: su estado quedó en MinIO
+            state = await run_in_threadpool(snapshot_store.load_state, file_id)
+        snapshot = None
+        if state is None:
+            # Analizado en memoria: el estado se arma una vez desde la foto columnar. Si ya tuvo
+            # anexos la foto no los incluye, y sin estado no hay con qué seguir
+            try:
+                if stats["resumen_general"].get("anexos"):
+                    raise FileNotFoundError(file_id)
+                snapshot = await run_in_threadpool(snapshot_store.fetch, file_id)
+            except FileNotFoundError:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="El file_id no tiene estado para anexar filas; vuelva a subir el "
+                           "archivo completo"
+                )
+
+        object_name = f"{file_id}/anexos/{uuid.uuid4()}-{stream.filename}"
+        spool, tiempos = await _spool_and_store(stream, object_name)
+        t0 = time.perf_counter()
+        try:
+            result, state = await processing_pool.append_spool(spool, state, snapshot, parser)
+        except PoolSaturatedError as e:
+            raise _pool_saturated(e)
+        except ColumnSelectionError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error procesando lote: {str(e)}")
+        finally:
+            spool.close()
+        tiempos["procesamiento_s"] = round(time.perf_counter() - t0, 4)
+
+        # El esquema (columnas, columnas_analizadas) es el del upload original
+        batch = result["resumen_general"]
+        resumen = dict(stats["resumen_general"], total_filas=batch["total_filas"],
+                       filas_anexadas=batch["filas_anexadas"],
+                       anexos=stats["resumen_general"].get("anexos", 0) + 1)
+        resumen.pop("memoria", None)
+        cache_data = build_cache_data(result)
+        cache_data["resumen_general"] = resumen
+        await cache_service.set_stats(file_id, cache_data)
+        await cache_service.set_state(file_id, state)
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            pass
+
+    return {
+        "file_id": file_id,
+        "filename": stream.filename,
+        "size_bytes": spool.size,
+        "filas_anexadas": resumen["filas_anexadas"],
+        "total_filas": resumen["total_filas"],
+        "anexos": resumen["anexos"],
+        "columnas_ignoradas": batch["columnas_ignoradas"],
+        "resumen": resumen,
+        "tiempos": tiempos
+    }
+
+
+@router.get("/jobs/{file_id}")
+async def get_job(file_id: str):
+    """Estado, progreso y tiempos de un procesamiento asíncrono"""
+    job = await cache_service.get_job(file_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No existe un trabajo para ese file_id")
+    return job
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """Tamaño y tasa de aciertos del cache L1 de stats de este proceso"""
+    return cache_service.local_metrics()
+
+
+@router.get("/snapshot/{file_id}")
+async def get_snapshot(
+    file_id: str,
+    columns: List[str] = Query(
+        None, description="Columnas a cargar (repetido o separado por comas)"
+    ),
+    columns_regex: str = Query(
+        None, description="Expresión regular: se cargan las columnas que coinciden"
+    )
+):
+    """
+    Esquema de la foto columnar del archivo y cuánto tarda cargar las columnas pedidas
+    (todas por defecto) frente a lo que tardó parsear el original.
+    """
+    selection = _resolve_columns(columns, columns_regex)
+    manifest = await run_in_threadpool(snapshot_store.manifest, file_id)
+    if not manifest:
+        raise HTTPException(status_code=404, detail="No hay snapshot para ese file_id")
+    try:
+        names = (selection.resolve([column["nombre"] for column in manifest["columnas"]])
+                 if selection else None)
+    except ColumnSelectionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    t0 = time.perf_counter()
+    df = await run_in_threadpool(snapshot_store.load, file_id, names, manifest)
+    carga_s = time.perf_counter() - t0
+
+    return {
+        "file_id": file_id,
+        "snapshot": dict(snapshot_store.summary(manifest), filas=manifest["filas"]),
+        "columnas": [{key: column[key] for key in ("nombre", "dtype", "codificacion", "bytes")}
+                     for column in manifest["columnas"]],
+        "carga": {
+            "columnas": df.columns.tolist(),
+            "carga_s": round(carga_s, 4),
+            "lectura_s": manifest["lectura_s"],
+            "aceleracion": (round(manifest["lectura_s"] / carga_s, 2)
+                            if manifest["lectura_s"] and carga_s else None)
+        }
+    }
+
+
 @router.get("/stats/{file_id}")
-async def get_stats(file_id: str):
-    """Obtiene el análisis completo del archivo"""
-    stats = cache_service.get_stats(file_id)
+async def get_stats(
+    file_id: str,
+    columns: List[str] = Query(
+        None, description="Columnas a devolver (repetido o separado por comas)"
+    ),
+    columns_regex: str = Query(
+        None, description="Expresión regular: se devuelven las columnas que coinciden"
+    )
+):
+    """Obtiene el análisis completo del archivo, o solo el de las columnas pedidas"""
+    selection = _resolve_columns(columns, columns_regex)
+    names = None
+    if selection:
+        analyzed = await cache_service.get_stats_columns(file_id)
+        if analyzed is None:
+            raise HTTPException(status_code=404, detail="No se encontraron stats para ese file_id")
+        try:
+            names = selection.resolve(analyzed)
+        except ColumnSelectionError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    stats = await cache_service.get_stats(file_id, columns=names)
     if not stats:
         raise HTTPException(status_code=404, detail="No se encontraron stats para ese file_id")
 
@@ -91,11 +608,13 @@ async def get_stats(file_id: str):
         "analisis_completo": stats
     }
 
+
 @router.get("/stats/{file_id}/resumen")
 async def get_summary(file_id: str):
     """Obtiene solo el resumen general del archivo"""
-    stats = cache_service.get_stats(file_id)
-    if not stats:
+    sections = ["resumen_general", "analisis_columnas"]
+    stats = await cache_service.get_stats(file_id, sections=sections)
+    if stats is None:
         raise HTTPException(status_code=404, detail="No se encontraron stats para ese file_id")
 
     return {
@@ -107,18 +626,30 @@ async def get_summary(file_id: str):
         }
     }
 
+
 @router.get("/export/pdf/{file_id}")
 async def export_stats_pdf(file_id: str):
     """Exporta el análisis completo a PDF"""
-    stats = cache_service.get_stats(file_id)
-    if not stats:
-        raise HTTPException(status_code=404, detail="No se encontraron stats para ese file_id")
+    async def render():
+        sections = ["resumen_general", "analisis_columnas"]
+        stats = await cache_service.get_stats(file_id, sections=sections)
+        if stats is not None and "analisis_columnas" not in stats:
+            # Formato viejo, sin analisis_columnas: el PDF muestra todas las secciones
+            stats = await cache_service.get_stats(file_id)
+        if not stats:
+            raise HTTPException(status_code=404, detail="No se encontraron stats para ese file_id")
+
+        # El PDFService mejorado puede manejar tanto el formato nuevo como el viejo
+        try:
+            return await processing_pool.render_pdf(stats, file_id)
+        except PoolSaturatedError as e:
+            raise _pool_saturated(e)
 
-    # El PDFService mejorado puede manejar tanto el formato nuevo como el viejo
-    pdf_bytes = PDFService.generate_stats_pdf(stats, file_id)
+    # Un link compartido trae muchos pedidos juntos: se genera un solo PDF, también entre réplicas
+    pdf_bytes = await cache_service.flights.run(f"pdf:{file_id}", render, shared=True)
 
     return StreamingResponse(
         BytesIO(pdf_bytes),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=analisis_{file_id[:8]}.pdf"}
-    )
\ No newline at end of file
+    )
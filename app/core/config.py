@@ -12,13 +12,125 @@ class Settings(BaseSettings):
     MINIO_ACCESS_KEY: str = Field(default="minioadmin")
     MINIO_SECRET_KEY: str = Field(default="minioadmin")
     MINIO_BUCKET: str = Field(default="data-files")
+    MINIO_PART_SIZE_MB: int = 10  # Parte de los uploads multipart de largo desconocido (mínimo 5)
 
     # Redis
     REDIS_URL: str = Field(default="redis://localhost:6379/0")
+    # Pool del cliente asíncrono de la API (uno por proceso, ver CacheService)
+    REDIS_POOL_MAX_CONNECTIONS: int = 64
+    REDIS_POOL_TIMEOUT_SECONDS: float = 5.0  # Espera de una conexión libre con el pool lleno
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 5.0
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = 2.0
 
+    # Formato de las stats en Redis (StatsCodec); las entradas en JSON plano se siguen leyendo
+    # Serializador: "auto" (msgpack si está instalado, si no JSON compacto), "json" o "msgpack"
+    STATS_SERIALIZER: str = "auto"
+    # Compresión: "auto" (zstd si está instalado, si no zlib), "zstd", "zlib" o "none"; con
+    # diccionario prefijado
+    STATS_COMPRESSION: str = "auto"
+    STATS_COMPRESSION_MIN_BYTES: int = 128  # Campos más chicos se guardan sin comprimir
+    # Nivel de zlib/zstd: con el diccionario prefijado, 1 ya comprime ~3x cada columna
+    STATS_COMPRESSION_LEVEL: int = 1
+
+    # Cache L1 de stats en cada proceso de la API, invalidado por pub/sub de Redis
+    STATS_L1_ENABLED: bool = True
+    STATS_L1_MAX_MB: int = 64  # Límite en bytes de las stats sin comprimir, con desalojo LRU
+    STATS_INVALIDATION_CHANNEL: str = "stats:invalidaciones"
+
+    # Single-flight: pedidos idénticos concurrentes (export PDF, stats que no están en el L1)
+    # comparten un cálculo
+    # Lease de Redis entre réplicas; vence solo si el proceso muere
+    SINGLE_FLIGHT_LEASE_SECONDS: int = 120
+    # Espera del resultado de otra réplica antes de calcularlo acá
+    SINGLE_FLIGHT_WAIT_SECONDS: float = 60.0
+    SINGLE_FLIGHT_POLL_SECONDS: float = 0.05
+    # El resultado queda en Redis para las réplicas que esperaban
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS: int = 30
+
+    # Procesamiento asíncrono (mode=async)
+    JOB_MAX_PENDING: int = 20
+
+    # Cola de trabajos en un Redis Stream, consumida por workers aparte (python -m app.worker)
+    JOB_BACKEND: str = "inline"  # "inline": la API procesa en segundo plano; "queue": solo encola
+    JOB_STREAM: str = "jobs:analisis"
+    JOB_GROUP: str = "workers"
+    JOB_DEAD_LETTER_STREAM: str = "jobs:analisis:dead"
+    JOB_STREAM_MAXLEN: int = 100_000  # Recorte aproximado (MAXLEN ~) de ambos streams
+    JOB_MAX_ATTEMPTS: int = 3  # Intentos (fallos o workers caídos) antes de ir a dead-letter
+    JOB_CLAIM_IDLE_MS: int = 300_000  # Sin ack por más de esto, otro worker reclama el mensaje
+    JOB_BLOCK_MS: int = 5_000  # Espera de XREADGROUP cuando no hay mensajes
+    # Procesos de cada worker para los rangos de CSV grandes (0 = uno por CPU)
+    JOB_WORKER_PROCESSES: int = 0
+
+    # Pool de procesos para el trabajo de CPU (parseo, análisis, PDF); 0 = hilos en el mismo proceso
+    PROCESS_POOL_WORKERS: int = 2
+    PROCESS_POOL_MAX_QUEUE: int = 8  # Tareas en vuelo antes de responder 503
+    PROCESS_POOL_RETRY_AFTER_SECONDS: int = 5
+
+    # Análisis por bloques de CSV grandes
+    STREAMING_THRESHOLD_MB: int = 20  # CSV por encima de este tamaño se leen con chunksize
+    CSV_CHUNK_ROWS: int = 100_000
+
+    # Cuantiles aproximados (sketch KLL) para columnas numéricas grandes
+    QUANTILE_SKETCH_ERROR: float = 0.01  # Error de rango normalizado objetivo
+    QUANTILE_SKETCH_MIN_ROWS: int = 1_000_000  # En memoria, por encima de esto se usa el sketch
+
+    # Distintos aproximados (HyperLogLog) para columnas de alta cardinalidad
+    HLL_PRECISION: int = 14  # 2^14 registros, ~0.8% de error relativo
+    HLL_MIN_ROWS: int = 1_000_000  # En memoria, por encima de esto no se usa nunique()
+    HLL_EXACT_LIMIT: int = 100_000  # Por bloques, distintos numéricos exactos hasta este número
+
+    # Valores más frecuentes (Space-Saving) para columnas de texto
+    TOPK_CAPACITY: int = 1000  # Contadores del resumen; en texto acota además los distintos exactos
+    TOPK_MIN_ROWS: int = 1_000_000  # En memoria, por encima de esto no hay value_counts() completo
+    TOPK_NEAR_UNIQUE_RATIO: float = 0.95  # Distintos/filas del primer bloque para verla casi única
+    TOPK_NEAR_UNIQUE_MIN_ROWS: int = 10_000  # Filas mínimas del primer bloque para decidirlo
+
+    # Parser de CSV: "auto" (pyarrow si está instalado, si no pandas), "pandas" o "pyarrow"
+    PARSER_BACKEND: str = "auto"
+
+    # Inferencia de tipos por columna
+    TYPE_INFERENCE_SAMPLE_ROWS: int = 1000  # Tamaño de la muestra reservoir que se inspecciona
+    TYPE_CATEGORICAL_MAX_DISTINCT: int = 50  # Texto con pocos distintos se trata como categórico
+    # ...si además los distintos son a lo sumo esta fracción de la muestra
+    TYPE_CATEGORICAL_MAX_RATIO: float = 0.5
+
+    # CSV grandes en modo procesos y en el worker: rangos de bytes analizados en paralelo y
+    # combinados (map-reduce). Solo aplica a uploads de hasta MAX_FILE_SIZE_MB: si se sube ese
+    # límite, revisar este
+    CSV_PARALLEL_MIN_MB: int = 32
+    CSV_PARALLEL_RANGES: int = 0  # 0 = un rango por proceso del pool
+
+    # Perfil numérico de archivos anchos: grupos de columnas en procesos, sobre memoria compartida
+    COLUMN_PARALLEL_MIN_COLUMNS: int = 512  # Por debajo de esto el perfil corre en un solo proceso
+    # 0 = las CPU divididas entre los procesos de PROCESS_POOL_WORKERS
+    COLUMN_PARALLEL_WORKERS: int = 0
+
+    # Modo preview: análisis sobre una muestra uniforme de filas
+    PREVIEW_SAMPLE_ROWS: int = 10_000
+    PREVIEW_CONFIDENCE: float = 0.95  # Nivel de los intervalos de confianza de promedio y mediana
+    # CSV seekable desde este tamaño: muestreo por offsets de bytes
+    PREVIEW_OFFSET_SAMPLING_MIN_MB: int = 20
+
+    # Foto columnar (.npy por columna + manifest) del DataFrame parseado, en MinIO y en un cache
+    # local
+    SNAPSHOT_ENABLED: bool = True
+    # Por defecto data-analysis-snapshots en el temporal del sistema
+    SNAPSHOT_CACHE_DIR: Optional[str] = None
+    # Tamaño del cache local; se desalojan las fotos usadas hace más tiempo
+    SNAPSHOT_CACHE_MAX_MB: int = 2048
+    # Regla de lifecycle del bucket sobre snapshots/ (0 = no se vencen)
+    SNAPSHOT_RETENTION_DAYS: int = 1
+
+    # Anexar filas a un file_id (POST /files/{file_id}/append)
+    APPEND_LOCK_TIMEOUT_SECONDS: int = 600  # El lock del file_id se libera solo si el proceso muere
 
     # Otras settings
     MAX_FILE_SIZE_MB: int = 50
+    UPLOAD_SPOOL_MAX_MEMORY_MB: int = 5  # Por encima de este tamaño el upload se vuelca a disco
+    # Directorio de los spools en disco (por defecto el temporal del sistema)
+    UPLOAD_SPOOL_DIR: Optional[str] = None
+    UPLOAD_PIPELINE_QUEUE_CHUNKS: int = 16  # Bloques en vuelo por etapa en modo pipeline
 
     class Config:
         env_file = ".env"
@@ -1,15 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.api.endpoints import router as files_router
+from app.api.endpoints import router as files_router, processing_pool, cache_service
+from app.services.column_profiler import ColumnProfiler
 
 
 from app.core.config import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un pool de Redis por proceso, compartido por todos los pedidos
+    cache_service.connect()
+    await cache_service.start_invalidation_listener()
+    yield
+    processing_pool.shutdown()
+    ColumnProfiler.shutdown()
+    await cache_service.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version="0.1.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
-    redoc_url=f"{settings.API_V1_STR}/redoc"
+    redoc_url=f"{settings.API_V1_STR}/redoc",
+    lifespan=lifespan
 )
 
 app.include_router(files_router, prefix=settings.API_V1_STR)
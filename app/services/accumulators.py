@@ -0,0 +1,358 @@
+import io
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.sketches import QuantileSketch, HyperLogLog, SpaceSaving
+from app.services.type_inference import ColumnType, TypeInference
+
+
+PERCENTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+PERCENTILE_NAMES = ["p1", "p5", "p25", "p50", "p75", "p95", "p99"]
+STATE_VERSION = 1
+
+
+class NumericAccumulator:
+    """Conteo, media y M2 (Welford/Chan), mínimo, máximo, distintos y sketch de cuantiles"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.integer = True
+        self.distinct = np.empty(0)  # None cuando se superó HLL_EXACT_LIMIT
+        self.quantiles = QuantileSketch()
+
+    def update(self, values: np.ndarray):
+        """values: datos numéricos sin nulos de un bloque"""
+        if not len(values):
+            return
+        self.integer = self.integer and np.issubdtype(values.dtype, np.integer)
+        values = values.astype(np.float64, copy=False)
+        n_b = len(values)
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        self._merge_moments(n_b, mean_b, m2_b)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._add_distinct(values)
+        self.quantiles.update(values)
+
+    def _add_distinct(self, values: np.ndarray):
+        if self.distinct is not None:
+            self.distinct = np.union1d(self.distinct, values)
+            if len(self.distinct) > settings.HLL_EXACT_LIMIT:
+                self.distinct = None
+
+    def _merge_moments(self, n_b, mean_b, m2_b):
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta ** 2 * self.n * n_b / n
+        self.n = n
+
+    def merge(self, other: "NumericAccumulator"):
+        if other.n:
+            self._merge_moments(other.n, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.integer = self.integer and other.integer
+            if other.distinct is None:
+                self.distinct = None
+            else:
+                self._add_distinct(other.distinct)
+            self.quantiles.merge(other.quantiles)
+        return self
+
+    def _native(self, value):
+        return int(value) if self.integer else float(value)
+
+    def result(self) -> dict:
+        values = self.quantiles.quantiles(PERCENTILES)
+        percentiles = dict(zip(PERCENTILE_NAMES, values.tolist()))
+        return {
+            "promedio": self.mean,
+            "minimo": self._native(self.min),
+            "maximo": self._native(self.max),
+            "mediana": percentiles["p50"],
+            "desviacion_estandar": math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan,
+            "percentiles": percentiles,
+            "error_cuantiles": self.quantiles.error_bound
+        }
+
+    def to_state(self, arrays: dict, prefix: str) -> dict:
+        if self.distinct is not None:
+            arrays[f"{prefix}.distintos"] = self.distinct
+        return {
+            "n": self.n, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max,
+            "integer": self.integer, "distintos_exactos": self.distinct is not None,
+            "cuantiles": self.quantiles.to_state(arrays, f"{prefix}.cuantiles")
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, arrays: dict, prefix: str) -> "NumericAccumulator":
+        acc = cls()
+        acc.n, acc.mean, acc.m2 = state["n"], state["mean"], state["m2"]
+        acc.min, acc.max, acc.integer = state["min"], state["max"], state["integer"]
+        acc.distinct = arrays[f"{prefix}.distintos"] if state["distintos_exactos"] else None
+        acc.quantiles = QuantileSketch.from_state(state["cuantiles"], arrays, f"{prefix}.cuantiles")
+        return acc
+
+
+def is_near_unique(values: pd.Series) -> bool:
+    """
+    Mira las primeras TOPK_NEAR_UNIQUE_MIN_ROWS filas: si casi todas son distintas, es un
+    identificador
+    """
+    n = settings.TOPK_NEAR_UNIQUE_MIN_ROWS
+    if len(values) < n:
+        return False
+    return values.iloc[:n].nunique() >= settings.TOPK_NEAR_UNIQUE_RATIO * n
+
+
+class FrequencyAccumulator:
+    """
+    Valores más frecuentes con un resumen Space-Saving de memoria acotada, mergeable.
+    Si el primer bloque es casi todo distinto (emails, IDs) deja de contar frecuencias.
+    """
+
+    def __init__(self):
+        self.summary = SpaceSaving()
+        self.near_unique = False
+        self._checked = False
+
+    def update(self, values: pd.Series):
+        if self.near_unique or not len(values):
+            return
+        if not self._checked:
+            # Se decide con el primer bloque, antes de contar nada
+            self._checked = True
+            if is_near_unique(values):
+                self.near_unique = True
+                return
+        self.summary.update(values)
+
+    def merge(self, other: "FrequencyAccumulator"):
+        self._checked = self._checked or other._checked
+        self.near_unique = self.near_unique or other.near_unique
+        if self.near_unique:
+            self.summary = SpaceSaving()
+        else:
+            self.summary.merge(other.summary)
+        return self
+
+    @property
+    def exact(self) -> bool:
+        """True si los conteos (y la cantidad de distintos) son exactos"""
+        return not self.near_unique and self.summary.exact
+
+    @property
+    def distinct(self) -> int:
+        return len(self.summary.counts)
+
+    def result(self, top: int = 3) -> dict:
+        return {
+            "top": self.summary.top(top),
+            "error_frecuencia": self.summary.floor,
+            "casi_unico": self.near_unique
+        }
+
+    def to_state(self, arrays: dict, prefix: str) -> dict:
+        return {"casi_unico": self.near_unique, "revisado": self._checked,
+                "resumen": self.summary.to_state(arrays, prefix)}
+
+    @classmethod
+    def from_state(cls, state: dict, arrays: dict, prefix: str) -> "FrequencyAccumulator":
+        acc = cls()
+        acc.near_unique, acc._checked = state["casi_unico"], state["revisado"]
+        acc.summary = SpaceSaving.from_state(state["resumen"], arrays, prefix)
+        return acc
+
+
+class ColumnAccumulator:
+    """
+    Estado mergeable de una columna a lo largo de los bloques del archivo.
+    El tipo se infiere (TypeInference) con el primer bloque con datos, salvo que venga fijado
+    (rangos de un mismo archivo analizados por separado deben usar el mismo tipo).
+    """
+
+    def __init__(self, name: str, column_type=None):
+        self.name = name
+        self.total = 0
+        self.nulls = 0
+        self.kind = None  # "numeric" o "text"
+        self.column_type = None
+        self.tipo_datos = None
+        self.numeric = NumericAccumulator()
+        self.frequencies = FrequencyAccumulator()
+        self.distinct = HyperLogLog()
+        self.no_numericos = 0
+        self._fixed = column_type is not None
+        if self._fixed:
+            self._set_type(column_type)
+
+    def _set_type(self, column_type):
+        self.column_type = column_type
+        self.kind = "numeric" if column_type.is_numeric else "text"
+        self.tipo_datos = column_type.label
+
+    def update(self, series: pd.Series):
+        had_data = self._has_data
+        self.total += len(series)
+        clean = series.dropna()
+        self.nulls += len(series) - len(clean)
+
+        # Un bloque sin datos no dice nada del tipo: se vuelve a inferir hasta ver datos
+        if self.column_type is None or (not had_data and len(clean) and not self._fixed):
+            self._set_type(TypeInference.infer(series))
+
+        if self.kind == "numeric":
+            converted = self.column_type.convert(clean)
+            if converted is not clean:
+                self.no_numericos += int(converted.isna().sum())
+                clean = converted.dropna()
+            values = TypeInference.numeric_values(clean)
+            self.numeric.update(values)
+            # Se hashea como float64 para que 5 y 5.0 de bloques distintos cuenten igual
+            self.distinct.update(values.astype(np.float64, copy=False))
+        else:
+            self.frequencies.update(clean)
+            self.distinct.update(clean)
+
+    def merge(self, other: "ColumnAccumulator"):
+        replaces_type = self.column_type is None or (not self._has_data and other._has_data)
+        if other.column_type is not None and replaces_type:
+            self._set_type(other.column_type)
+        self.total += other.total
+        self.nulls += other.nulls
+        self.no_numericos += other.no_numericos
+        self.numeric.merge(other.numeric)
+        self.frequencies.merge(other.frequencies)
+        self.distinct.merge(other.distinct)
+        return self
+
+    @property
+    def _has_data(self) -> bool:
+        return self.total > self.nulls
+
+    @property
+    def distinct_exact(self) -> bool:
+        """False cuando se descartó el conteo exacto de distintos y se informa la estimación HLL"""
+        if self.kind == "numeric":
+            return self.numeric.distinct is not None
+        return self.frequencies.exact
+
+    @property
+    def valores_unicos(self) -> int:
+        if not self.distinct_exact:
+            return self.distinct.estimate()
+        if self.kind == "numeric":
+            return len(self.numeric.distinct)
+        return self.frequencies.distinct
+
+    def to_state(self, arrays: dict, prefix: str) -> dict:
+        column_type = self.column_type
+        return {
+            "nombre": self.name,
+            "total": self.total,
+            "nulos": self.nulls,
+            "no_numericos": self.no_numericos,
+            "fijo": self._fixed,
+            "tipo": None if column_type is None else {
+                "kind": column_type.kind, "date_format": column_type.date_format,
+                "numeric_text": column_type.numeric_text
+            },
+            "numerico": self.numeric.to_state(arrays, f"{prefix}.numerico"),
+            "frecuencias": self.frequencies.to_state(arrays, f"{prefix}.frecuencias"),
+            "distintos": self.distinct.to_state(arrays, f"{prefix}.hll")
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, arrays: dict, prefix: str) -> "ColumnAccumulator":
+        acc = cls(state["nombre"])
+        acc.total, acc.nulls = state["total"], state["nulos"]
+        acc.no_numericos = state["no_numericos"]
+        acc._fixed = state["fijo"]
+        if state["tipo"] is not None:
+            acc._set_type(ColumnType(**state["tipo"]))
+        acc.numeric = NumericAccumulator.from_state(state["numerico"], arrays, f"{prefix}.numerico")
+        acc.frequencies = FrequencyAccumulator.from_state(
+            state["frecuencias"], arrays, f"{prefix}.frecuencias"
+        )
+        acc.distinct = HyperLogLog.from_state(state["distintos"], arrays, f"{prefix}.hll")
+        return acc
+
+
+class StreamingAnalyzer:
+    """Acumula un archivo bloque a bloque; la memoria depende del tamaño de bloque, no del total"""
+
+    def __init__(self, types: dict = None):
+        self.columns = {}
+        self.total_rows = 0
+        self.types = types or {}  # ColumnType fijado por columna; el resto se infiere
+
+    def update(self, chunk: pd.DataFrame):
+        self.total_rows += len(chunk)
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnAccumulator(col, self.types.get(col))
+            self.columns[col].update(chunk[col])
+
+    def merge(self, other: "StreamingAnalyzer"):
+        self.total_rows += other.total_rows
+        for col, acc in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(acc)
+            else:
+                self.columns[col] = acc
+        return self
+
+    @property
+    def column_types(self) -> dict:
+        """
+        Tipo de cada columna que ya vio datos, para fijarlo al analizar más filas del mismo
+        archivo
+        """
+        return {
+            col: acc.column_type for col, acc in self.columns.items()
+            if acc.column_type is not None
+        }
+
+    def dumps(self) -> bytes:
+        """
+        Estado persistible (para anexar filas más tarde): un .npz comprimido con los arreglos
+        de los sketches y un JSON con el resto. Se lee sin pickle, con allow_pickle=False.
+        """
+        arrays = {}
+        state = {
+            "version": STATE_VERSION,
+            "total_filas": self.total_rows,
+            "columnas": [
+                acc.to_state(arrays, str(i)) for i, acc in enumerate(self.columns.values())
+            ]
+        }
+        encoded = json.dumps(state, default=str).encode("utf-8")
+        arrays["estado"] = np.frombuffer(encoded, dtype=np.uint8)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def loads(cls, data: bytes) -> "StreamingAnalyzer":
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        state = json.loads(arrays.pop("estado").tobytes().decode("utf-8"))
+        if state["version"] != STATE_VERSION:
+            raise ValueError(f"Versión de estado no soportada: {state['version']}")
+        analyzer = cls()
+        analyzer.total_rows = state["total_filas"]
+        for i, column in enumerate(state["columnas"]):
+            analyzer.columns[column["nombre"]] = ColumnAccumulator.from_state(
+                column, arrays, str(i)
+            )
+        return analyzer
@@ -1,28 +1,341 @@
-import redis
+import asyncio
 import json
+import math
 import numpy as np
+import redis
+import redis.asyncio
 from app.core.config import settings
+from app.services.local_cache import LocalCache
+from app.services.single_flight import SingleFlight
+from app.services.stats_codec import StatsCodec
+
+
+def sanitize_stats(data):
+    """Limpia valores NaN e infinitos de las estadísticas"""
+    if isinstance(data, dict):
+        return {k: sanitize_stats(v) for k, v in data.items()}
+    elif isinstance(data, float):
+        if math.isnan(data) or math.isinf(data):
+            return None
+        return data
+    else:
+        return data
+
+
+def build_cache_data(result: dict) -> dict:
+    """Estructura que se guarda en cache a partir del resultado de DataProcessor"""
+    return {
+        "resumen_general": result["resumen_general"],
+        "analisis_columnas": sanitize_stats(result["analisis_columnas"]),
+        # Mantenemos las estadísticas originales por compatibilidad
+        "estadisticas_pandas": sanitize_stats(result["estadisticas_pandas"])
+    }
+
+
+# Las stats de un file_id son un hash de Redis: un campo por sección y, en las secciones por
+# columna, un campo por columna ("columna:edad") más el índice con sus nombres en el campo de la
+# sección. Así cada endpoint pide con HMGET solo lo que devuelve.
+SECTIONS_FIELD = "_secciones"
+COLUMN_SECTIONS = {"analisis_columnas": "columna", "estadisticas_pandas": "pandas"}
+
+
+def column_field(section: str, column) -> str:
+    return f"{COLUMN_SECTIONS[section]}:{column}"
+
+
+def stats_fields(stats: dict) -> dict:
+    """Campos del hash (codificados con StatsCodec) para unas stats ya con tipos nativos"""
+    fields = {SECTIONS_FIELD: StatsCodec.encode(list(stats))}
+    for section, value in stats.items():
+        if section in COLUMN_SECTIONS and isinstance(value, dict):
+            fields[section] = StatsCodec.encode([str(column) for column in value])
+            for column, info in value.items():
+                fields[column_field(section, column)] = StatsCodec.encode(info)
+        else:
+            fields[section] = StatsCodec.encode(value)
+    return fields
+
+
+def stats_from_fields(fields: dict, sections: list = None, columns: list = None) -> dict:
+    """
+    Arma las stats desde los campos leídos del hash. Con columns, las secciones por columna
+    traen solo esas (en ese orden, salteando las que no existan) sin decodificar el índice.
+    """
+    order = StatsCodec.decode(fields[SECTIONS_FIELD])
+    stats = {}
+    for section in order if sections is None else [name for name in order if name in sections]:
+        if fields.get(section) is None:
+            continue
+        if section not in COLUMN_SECTIONS:
+            stats[section] = StatsCodec.decode(fields[section])
+            continue
+        if columns is not None:
+            names = [str(column) for column in columns]
+        else:
+            names = StatsCodec.decode(fields[section])
+        if not isinstance(names, list):
+            stats[section] = names
+            continue
+        values = ((column, fields.get(column_field(section, column))) for column in names)
+        stats[section] = {
+            column: StatsCodec.decode(value) for column, value in values if value is not None
+        }
+    return stats
+
+
+def select_stats(stats: dict, sections: list = None, columns: list = None) -> dict:
+    """La misma selección que stats_from_fields, sobre unas stats ya completas"""
+    if sections is None and columns is None:
+        return stats
+    selected = {}
+    for section, value in stats.items():
+        if sections is not None and section not in sections:
+            continue
+        if columns is not None and section in COLUMN_SECTIONS and isinstance(value, dict):
+            value = {str(column): value[str(column)] for column in columns if str(column) in value}
+        selected[section] = value
+    return selected
 
 
 class CacheService:
-    def __init__(self):
-        self.client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    """
+    Stats, estado y trabajos por file_id en Redis con el cliente asíncrono (redis.asyncio).
+    Cada proceso tiene un único pool de conexiones, acotado (REDIS_POOL_MAX_CONNECTIONS): lo crea
+    connect() en el lifespan de la app, o el primer comando si nadie lo llamó antes. Los valores
+    viajan en bytes (el pool no decodifica) y se decodifican acá.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        # L1 de stats en el proceso; solo se usa mientras escucha las invalidaciones de Redis
+        self.local = LocalCache(settings.STATS_L1_MAX_MB * 1024 * 1024)
+        self._listener = None
+        self._pubsub = None
+        # Cálculos compartidos por clave: lecturas de stats fuera del L1, export PDF, etc.
+        self.flights = SingleFlight(self)
+
+    def connect(self):
+        """Crea el pool del proceso; no abre conexiones hasta el primer comando"""
+        if self._client is None:
+            # Bloqueante: con el pool lleno los pedidos esperan una conexión libre en vez de
+            # abrir otra
+            pool = redis.asyncio.BlockingConnectionPool.from_url(
+                settings.REDIS_URL,
+                max_connections=settings.REDIS_POOL_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS
+            )
+            self._client = redis.asyncio.Redis(connection_pool=pool)
+        return self._client
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else self.connect()
+
+    async def close(self):
+        await self.stop_invalidation_listener()
+        if self._client is not None:
+            await self._client.aclose(close_connection_pool=True)
+            self._client = None
 
-    def set_stats(self, file_id: str, stats: dict, expire_seconds: int = 3600):
+    async def set_stats(self, file_id: str, stats: dict, expire_seconds: int = 3600):
         # Convertir tipos numpy a tipos nativos de Python antes de serializar
         clean_stats = self._convert_numpy_types(stats)
-        # Guarda las stats con expiración (por defecto 1h)
-        self.client.setex(f"stats:{file_id}", expire_seconds, json.dumps(clean_stats))
+        # Reemplaza el hash completo y su expiración (por defecto 1h) en una transacción
+        key = f"stats:{file_id}"
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping=stats_fields(clean_stats))
+        pipe.expire(key, expire_seconds)
+        await pipe.execute()
+        await self._invalidate(file_id)
 
-    def get_stats(self, file_id: str):
-        value = self.client.get(f"stats:{file_id}")
+    async def get_stats(self, file_id: str, sections: list = None, columns: list = None):
+        """
+        Stats del file_id o None. sections limita las secciones (resumen_general,
+        analisis_columnas...)
+        y columns las columnas de las secciones por columna: solo esos campos se piden a
+        Redis.
+        La lectura completa pasa por el cache L1.
+        """
+        if self.listening:
+            stats = self.local.get(file_id)
+            if stats is not None:
+                return select_stats(stats, sections, columns)
+            if sections is None and columns is None:
+                # Los fallos simultáneos del L1 hacen una sola lectura; con la versión en la clave,
+                # un pedido que llega después de una invalidación no se suma a una lectura vieja
+                return await self.flights.run(f"stats:{file_id}:{self.local.version}",
+                                              lambda: self._get_full_stats(file_id, cache=True))
+        elif sections is None and columns is None:
+            return await self._get_full_stats(file_id)
+
+        key = f"stats:{file_id}"
+        try:
+            fields = [SECTIONS_FIELD]
+            if sections is None:
+                order = await self.client.hget(key, SECTIONS_FIELD)
+                if order is None:
+                    return None
+                sections = StatsCodec.decode(order)
+            fields += list(sections)
+            if columns is not None:
+                fields += [column_field(section, column) for section in sections
+                           if section in COLUMN_SECTIONS for column in columns]
+            values = dict(zip(fields, await self.client.hmget(key, fields)))
+        except redis.exceptions.ResponseError:
+            return await self._get_legacy_stats(key, sections, columns)
+        if values[SECTIONS_FIELD] is None:
+            return None
+
+        if columns is None:
+            # Segunda vuelta: los campos de cada columna según el índice de su sección
+            wanted = []
+            for section in sections:
+                if section in COLUMN_SECTIONS and values.get(section) is not None:
+                    index = StatsCodec.decode(values[section])
+                    if isinstance(index, list):
+                        wanted += [column_field(section, column) for column in index]
+            if wanted:
+                values.update(zip(wanted, await self.client.hmget(key, wanted)))
+        return stats_from_fields(values, sections, columns)
+
+    async def get_stats_columns(self, file_id: str):
+        """
+        Nombres de las columnas analizadas (el índice de analisis_columnas), o None si no hay
+        stats
+        """
+        stats = self.local.get(file_id) if self.listening else None
+        if stats is not None:
+            return list(stats.get("analisis_columnas", {}))
+        key = f"stats:{file_id}"
+        try:
+            order, index = await self.client.hmget(key, [SECTIONS_FIELD, "analisis_columnas"])
+        except redis.exceptions.ResponseError:
+            stats = await self._get_legacy_stats(key)
+            return None if stats is None else list(stats.get("analisis_columnas", {}))
+        if order is None:
+            return None
+        return [] if index is None else StatsCodec.decode(index)
+
+    async def _get_full_stats(self, file_id: str, cache: bool = False):
+        key = f"stats:{file_id}"
+        version = self.local.version
+        try:
+            if cache:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.hgetall(key)
+                pipe.pttl(key)
+                fields, ttl_ms = await pipe.execute()
+            else:
+                fields = await self.client.hgetall(key)
+        except redis.exceptions.ResponseError:
+            return await self._get_legacy_stats(key)
+        if not fields:
+            return None
+        fields = {name.decode("utf-8") if isinstance(name, bytes) else name: value
+                  for name, value in fields.items()}
+        stats = stats_from_fields(fields)
+        # Vence junto con la clave de Redis (PTTL -1: sin expiración, no se guarda en L1)
+        if cache and ttl_ms > 0:
+            size = sum(StatsCodec.payload_size(value) for value in fields.values())
+            self.local.set(file_id, stats, size, ttl_ms / 1000, version)
+        return stats
+
+    async def _get_legacy_stats(self, key: str, sections: list = None, columns: list = None):
+        # Entradas de antes del hash (un único valor en la clave): se leen hasta que expiren
+        value = await self.client.get(key)
+        return None if value is None else select_stats(StatsCodec.decode(value), sections, columns)
+
+    async def delete_stats(self, file_id: str):
+        await self.client.delete(f"stats:{file_id}")
+        await self._invalidate(file_id)
+
+    async def _invalidate(self, file_id: str):
+        # Este proceso se entera enseguida; los demás, por el canal de pub/sub
+        self.local.delete(file_id)
+        if settings.STATS_L1_ENABLED:
+            await self.client.publish(settings.STATS_INVALIDATION_CHANNEL, file_id)
+
+    @property
+    def listening(self) -> bool:
+        return self._listener is not None and not self._listener.done()
+
+    async def start_invalidation_listener(self):
+        """
+        Se suscribe al canal de invalidaciones en una tarea del event loop y habilita el L1 de
+        stats.
+        Sin suscripción (o si se cae la conexión) las lecturas van directo a Redis.
+        """
+        if not settings.STATS_L1_ENABLED or self.listening:
+            return
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(settings.STATS_INVALIDATION_CHANNEL)
+        except redis.exceptions.RedisError as e:
+            print(f"Cache L1 de stats desactivado, sin suscripción a invalidaciones: {e}")
+            await pubsub.aclose()
+            return
+        self.local.clear()
+        self._pubsub = pubsub
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def stop_invalidation_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self.local.clear()
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                # Con timeout propio: una espera sin mensajes no es un error de socket_timeout
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    self._on_invalidation(message)
+        except redis.exceptions.RedisError as e:
+            # Se pudieron perder invalidaciones: el L1 se vacía y queda apagado
+            print(f"Error en la suscripción a invalidaciones de stats: {e}")
+            self.local.clear()
+
+    def _on_invalidation(self, message):
+        file_id = message["data"]
+        self.local.delete(file_id.decode("utf-8") if isinstance(file_id, bytes) else file_id)
+
+    def local_metrics(self) -> dict:
+        return dict(self.local.metrics(), activo=self.listening, vuelos=self.flights.metrics())
+
+    async def set_state(self, file_id: str, state: bytes, expire_seconds: int = 3600):
+        # Estado mergeable de los acumuladores (StreamingAnalyzer.dumps), junto a las stats
+        await self.client.setex(f"state:{file_id}", expire_seconds, state)
+
+    async def get_state(self, file_id: str):
+        return await self.client.get(f"state:{file_id}")
+
+    def lock(self, file_id: str, timeout: int = None):
+        """
+        Lock de Redis por file_id para que dos anexos no se pisen el estado (acquire/release
+        con await)
+        """
+        timeout = timeout or settings.APPEND_LOCK_TIMEOUT_SECONDS
+        return self.client.lock(f"lock:{file_id}", timeout=timeout)
+
+    async def set_job(self, file_id: str, job: dict, expire_seconds: int = 3600):
+        # Estado del procesamiento asíncrono, junto a las stats del mismo file_id
+        payload = json.dumps(self._convert_numpy_types(job))
+        await self.client.setex(f"job:{file_id}", expire_seconds, payload)
+
+    async def get_job(self, file_id: str):
+        value = await self.client.get(f"job:{file_id}")
         if value is None:
             return None
         return json.loads(value)
 
-    def delete_stats(self, file_id: str):
-        self.client.delete(f"stats:{file_id}")
-
     def _convert_numpy_types(self, obj):
         """Convierte tipos numpy a tipos nativos de Python recursivamente"""
         if isinstance(obj, dict):
@@ -38,4 +351,4 @@ class CacheService:
         elif hasattr(obj, 'item'):  # Para otros tipos numpy
             return obj.item()
         else:
-            return obj
\ No newline at end of file
+            return obj
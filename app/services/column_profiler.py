@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.accumulators import PERCENTILES
+from app.services.sketches import QuantileSketch, HyperLogLog
+
+
+def _profile_shared(name: str, shape: tuple, start: int, stop: int) -> dict:
+    """Proceso hijo: se adjunta al bloque compartido y perfila sus columnas sin copiar los datos"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, order="F")
+        profile = ColumnProfiler.profile_numeric(block[:, start:stop])
+        del block  # la memoria compartida no se puede cerrar con vistas vivas
+        return profile
+    finally:
+        shm.close()
+
+
+class NumericBlock:
+    """
+    Bloque float64 (filas × columnas numéricas) en orden Fortran, una columna contigua por variable.
+    Con shared=True vive en memoria compartida y los procesos hijos lo leen por nombre.
+    """
+
+    def __init__(self, rows: int, cols: int, shared: bool = False):
+        self.shape = (rows, cols)
+        self._shm = None
+        if shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(rows * cols * 8, 1))
+            self.array = np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf, order="F")
+        else:
+            self.array = np.empty(self.shape, dtype=np.float64, order="F")
+
+    @property
+    def name(self):
+        return self._shm.name if self._shm is not None else None
+
+    def close(self):
+        self.array = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnProfiler:
+    """
+    Perfil de todas las columnas numéricas a la vez: el bloque numérico (filas × columnas)
+    se reduce con operaciones 2-D de NumPy en vez de una serie de llamadas de pandas por columna.
+    En archivos anchos los grupos de columnas se reparten entre procesos.
+    """
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def workers() -> int:
+        """
+        Procesos del perfil paralelo. Por defecto las CPU se reparten entre los procesos del
+        ProcessingPool, que pueden estar perfilando archivos anchos a la vez.
+        Dentro de un proceso hijo (del ProcessingPool o de los rangos del worker) el perfil es
+        secuencial: nadie apagaría ahí un pool anidado y el hijo no terminaría al salir.
+        """
+        if multiprocessing.parent_process() is not None:
+            return 1
+        if settings.COLUMN_PARALLEL_WORKERS:
+            return settings.COLUMN_PARALLEL_WORKERS
+        return max((os.cpu_count() or 1) // max(settings.PROCESS_POOL_WORKERS, 1), 1)
+
+    @staticmethod
+    def block(rows: int, cols: int) -> NumericBlock:
+        """Bloque para cols columnas: compartido si el perfil va a correr en paralelo"""
+        shared = cols >= settings.COLUMN_PARALLEL_MIN_COLUMNS and ColumnProfiler.workers() > 1
+        return NumericBlock(rows, cols, shared=shared)
+
+    @classmethod
+    def executor(cls) -> ProcessPoolExecutor:
+        # Uno por proceso y reutilizado; "spawn" como el ProcessingPool. Con el lock, dos pedidos
+        # en hilos (PROCESS_POOL_WORKERS = 0) no crean cada uno el suyo
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=cls.workers(),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return cls._executor
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False, cancel_futures=True)
+                cls._executor = None
+
+    @staticmethod
+    def profile_block(block: NumericBlock) -> dict:
+        """
+        Perfil de un NumericBlock. Si está en memoria compartida cada proceso recibe solo el nombre
+        y su rango de columnas, y los resultados se concatenan en el orden de las columnas.
+        """
+        if block.name is None:
+            return ColumnProfiler.profile_numeric(block.array)
+
+        bounds = np.linspace(0, block.shape[1], ColumnProfiler.workers() + 1).astype(int)
+        executor = ColumnProfiler.executor()
+        futures = [
+            executor.submit(_profile_shared, block.name, block.shape, start, stop)
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+        parts = [future.result() for future in futures]
+        # Todos los arrays tienen las columnas en el último eje (percentiles es 2-D)
+        return {key: np.concatenate([part[key] for part in parts], axis=-1) for key in parts[0]}
+
+    @staticmethod
+    def profile_numeric(block: np.ndarray) -> dict:
+        """
+        Devuelve arrays con un valor por columna: count, nulls, mean, std, min, max, distinct,
+        distinct_exact, error_cuantiles y percentiles (una fila por cada valor de PERCENTILES).
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if not block.flags.f_contiguous:
+            # Cada columna contigua: las reducciones por eje 0 recorren memoria seguida
+            block = np.asfortranarray(block)
+        n, k = block.shape
+        count = n - np.isnan(block).sum(axis=0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(block, axis=0) / count
+            # Dos pasadas como pandas: primero la media y después los desvíos
+            m2 = np.nansum((block - mean) ** 2, axis=0)
+            std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+            # Con ±inf la media no es finita y, como en pandas, el desvío es NaN: nansum ignoraba
+            # los inf - inf como si fueran nulos
+            std = np.where(np.isfinite(mean), std, np.nan)
+
+        profile = {"count": count, "nulls": n - count, "mean": mean, "std": std}
+        if n <= settings.QUANTILE_SKETCH_MIN_ROWS:
+            profile.update(ColumnProfiler._sorted_stats(block, count))
+        else:
+            profile.update(ColumnProfiler._sketch_stats(block, count))
+        return profile
+
+    @staticmethod
+    def _sorted_stats(block: np.ndarray, count: np.ndarray) -> dict:
+        """Un único sort por columna da extremos, percentiles exactos y distintos"""
+        if not len(block):
+            block = np.full((1, block.shape[1]), np.nan)
+        n, k = block.shape
+        ordered = np.sort(block, axis=0)  # los NaN quedan al final de cada columna
+        last = np.maximum(count - 1, 0)
+
+        # Interpolación lineal, igual que np.quantile y describe(). Con ±inf la fórmula da NaN
+        # (inf * 0, -inf + inf) donde median() no: en una posición exacta, entre dos valores iguales
+        # o entre -inf y un finito el resultado es el valor de abajo
+        qs = np.asarray(PERCENTILES)[:, None]
+        position = qs * last
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, last)
+        below = np.take_along_axis(ordered, lower, axis=0)
+        above = np.take_along_axis(ordered, upper, axis=0)
+        fraction = position - lower
+        with np.errstate(invalid="ignore"):
+            interpolated = below + (above - below) * fraction
+        exact = (fraction == 0) | (below == above) | (np.isneginf(below) & np.isfinite(above))
+        percentiles = np.where(exact, below, interpolated)
+
+        valid = np.arange(1, n)[:, None] < count
+        changes = (ordered[1:] != ordered[:-1]) & valid
+        distinct = (count > 0).astype(np.int64) + changes.sum(axis=0)
+
+        return {
+            "min": ordered[0],
+            "max": np.take_along_axis(ordered, last[None, :], axis=0)[0],
+            "percentiles": percentiles,
+            "error_cuantiles": np.zeros(k),
+            "distinct": distinct,
+            "distinct_exact": np.ones(k, dtype=bool)
+        }
+
+    @staticmethod
+    def _sketch_stats(block: np.ndarray, count: np.ndarray) -> dict:
+        """Bloques grandes: extremos vectorizados, cuantiles con sketch KLL y distintos con HLL"""
+        k = block.shape[1]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # columnas sin datos dan NaN
+            minimo = np.nanmin(block, axis=0)
+            maximo = np.nanmax(block, axis=0)
+
+        percentiles = np.full((len(PERCENTILES), k), np.nan)
+        error = np.zeros(k)
+        distinct = np.zeros(k, dtype=np.int64)
+        exact = np.ones(k, dtype=bool)
+        for j in range(k):
+            values = block[:, j]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                continue
+            sketch = QuantileSketch()
+            sketch.update(values)
+            percentiles[:, j], error[j] = sketch.quantiles(PERCENTILES), sketch.error_bound
+            if len(values) > settings.HLL_MIN_ROWS:
+                hll = HyperLogLog()
+                hll.update(values)
+                distinct[j], exact[j] = hll.estimate(), False
+            else:
+                distinct[j] = len(np.unique(values))
+
+        return {
+            "min": minimo,
+            "max": maximo,
+            "percentiles": percentiles,
+            "error_cuantiles": error,
+            "distinct": distinct,
+            "distinct_exact": exact
+        }
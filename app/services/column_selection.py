@@ -0,0 +1,77 @@
+import re
+
+
+class ColumnSelectionError(ValueError):
+    """La selección de columnas no coincide con el archivo o la expresión regular es inválida"""
+
+
+class ColumnSelection:
+    """
+    Proyección de columnas pedida en el upload: nombres exactos y/o una expresión regular.
+    Se resuelve contra el encabezado del archivo y llega al parser como usecols, así que
+    las columnas que no se piden ni se parsean ni se analizan.
+    """
+
+    def __init__(self, names: list = None, pattern: str = None):
+        self.names = list(dict.fromkeys(names or []))
+        self.pattern = pattern
+        try:
+            self._regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise ColumnSelectionError(f"Expresión regular inválida en columns_regex: {e}")
+
+    @classmethod
+    def from_request(cls, columns: list = None, columns_regex: str = None):
+        """
+        Acepta columns repetido (?columns=a&columns=b) o separado por comas; None si no se
+        pidió nada
+        """
+        values = [name.strip() for value in columns or [] for name in value.split(",")]
+        names = [name for name in values if name]
+        if not names and not columns_regex:
+            return None
+        return cls(names, columns_regex)
+
+    def to_dict(self) -> dict:
+        return {"names": self.names, "pattern": self.pattern}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Inversa de to_dict (trabajos encolados); None si no había selección"""
+        return cls(data["names"], data["pattern"]) if data else None
+
+    def matches(self, name) -> bool:
+        name = str(name)
+        if name in self.names:
+            return True
+        return self._regex is not None and self._regex.search(name) is not None
+
+    def select(self, header: list) -> list:
+        """Columnas del encabezado que entran en la selección, en el orden del archivo"""
+        return [col for col in header if self.matches(col)]
+
+    def validate(self, header: list):
+        """Falla si algún nombre pedido no existe o si la selección no deja ninguna columna"""
+        present = {str(col) for col in header}
+        missing = [name for name in self.names if name not in present]
+        if missing:
+            raise ColumnSelectionError(f"Columnas inexistentes en el archivo: {', '.join(missing)}")
+        if not self.select(header):
+            raise ColumnSelectionError("Ninguna columna del archivo coincide con la selección")
+
+    def resolve(self, header: list) -> list:
+        self.validate(header)
+        return self.select(header)
+
+    def recording(self, header: list):
+        """
+        usecols para cuando no se puede leer el encabezado por separado (streams no seekable,
+        hojas de Excel): anota cada nombre en header mientras el lector lo recorre.
+        """
+        def usecols(name) -> bool:
+            header.append(name)
+            return self.matches(name)
+        return usecols
+
+    def __repr__(self):
+        return f"ColumnSelection(names={self.names!r}, pattern={self.pattern!r})"
@@ -0,0 +1,135 @@
+import io
+
+import numpy as np
+
+
+QUOTE = ord('"')
+NEWLINE = ord("\n")
+SCAN_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def _line_starts(block: bytes, quotes_before: int):
+    """
+    Para un bloque: cantidad de comillas y, para cada paridad (0 par, 1 impar) de quotes_before
+    más las comillas previas del bloque, la posición siguiente al primer salto de línea con esa
+    paridad.
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    quotes = np.flatnonzero(data == QUOTE)
+    newlines = np.flatnonzero(data == NEWLINE)
+    parity = (quotes_before + np.searchsorted(quotes, newlines)) % 2
+    first = []
+    for p in (0, 1):
+        hits = newlines[parity == p]
+        first.append(int(hits[0]) + 1 if len(hits) else None)
+    return len(quotes), first
+
+
+def scan_range(path: str, start: int, end: int) -> tuple:
+    """
+    Se ejecuta en un proceso hijo: cuenta las comillas de [start, end) y guarda dónde empieza la
+    primera línea según la paridad de comillas desde start. El padre elige una de las dos cuando
+    conoce la paridad acumulada antes de start (fase 1 del split seguro).
+    """
+    quotes = 0
+    first = [None, None]
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            block = f.read(min(SCAN_BLOCK_BYTES, end - position))
+            if not block:
+                break
+            if first[0] is None or first[1] is None:
+                count, starts = _line_starts(block, quotes)
+                for p in (0, 1):
+                    if first[p] is None and starts[p] is not None:
+                        first[p] = position + starts[p]
+                quotes += count
+            else:
+                quotes += block.count(b'"')
+            position += len(block)
+    return quotes, first[0], first[1]
+
+
+class CsvRangeSplitter:
+    """
+    Parte un CSV en disco en rangos de bytes que empiezan y terminan en un límite de fila.
+    Un salto de línea es límite solo si la cantidad de comillas anterior es par (fuera de comillas);
+    las comillas escapadas ("") no cambian la paridad, así que sirve para CSV estándar.
+    """
+
+    @staticmethod
+    def header(path: str) -> bytes:
+        """
+        Bytes de la fila de encabezado, con su salto de línea (puede tener saltos entre
+        comillas)
+        """
+        quotes = 0
+        chunks = []
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(SCAN_BLOCK_BYTES)
+                if not block:
+                    return b"".join(chunks)
+                count, starts = _line_starts(block, quotes)
+                if starts[0] is not None:
+                    chunks.append(block[:starts[0]])
+                    return b"".join(chunks)
+                chunks.append(block)
+                quotes += count
+
+    @staticmethod
+    def candidates(data_start: int, size: int, parts: int) -> list:
+        """Offsets equiespaciados (sin alinear) donde empieza cada rango de la fase 1"""
+        parts = max(1, min(parts, size - data_start))
+        return [int(x) for x in np.linspace(data_start, size, parts + 1)[:-1]]
+
+    @staticmethod
+    def resolve(offsets: list, scans: list, size: int) -> list:
+        """
+        Rangos alineados: la paridad de comillas antes de cada offset es la suma de los conteos
+        de los rangos anteriores, y con ella se elige el inicio de línea correcto que anotó
+        scan_range.
+        Un rango sin ningún límite válido se une al anterior.
+        """
+        boundaries = [offsets[0]]
+        quotes_before = scans[0][0]
+        for offset, (quotes, first_even, first_odd) in zip(offsets[1:], scans[1:]):
+            # La línea empieza fuera de comillas si las comillas locales tienen la paridad de
+            # las previas
+            boundary = first_odd if quotes_before % 2 else first_even
+            if boundary is not None and boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            quotes_before += quotes
+        boundaries.append(size)
+        return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+class RangeReader(io.RawIOBase):
+    """Archivo de solo lectura que entrega el encabezado y después el rango [start, end) del CSV"""
+
+    def __init__(self, path: str, start: int, end: int, header: bytes):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+        self._header = memoryview(header)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if len(self._header):
+            n = min(len(buffer), len(self._header))
+            buffer[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        if self._remaining <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
@@ -1,69 +1,548 @@
+import os
+import time
 import pandas as pd
-from io import BytesIO
+from io import BytesIO, BufferedReader
 import numpy as np
+from pandas.api import types as ptypes
+
+from app.core.config import settings
+from app.services.accumulators import (
+    StreamingAnalyzer, FrequencyAccumulator, is_near_unique, PERCENTILES, PERCENTILE_NAMES
+)
+from app.services.column_profiler import ColumnProfiler
+from app.services.column_selection import ColumnSelection, ColumnSelectionError
+from app.services.csv_ranges import CsvRangeSplitter, RangeReader, scan_range
+from app.services.frame_compactor import FrameCompactor
+from app.services.parsers import ParserBackend, get_parser
+from app.services.preview import PreviewSampler
+from app.services.snapshot import DatasetSnapshot
+from app.services.sketches import QuantileSketch, HyperLogLog
+from app.services.type_inference import TypeInference
+from app.services.xlsx_reader import XlsxReader
 
 class DataProcessor:
     @staticmethod
-    def process_file(file_bytes: bytes, filename: str) -> dict:
-        # Detectar extensión y cargar con pandas
+    def process_file(file_bytes, filename: str, streaming: bool = None, parser: str = None,
+                     columns: ColumnSelection = None, snapshot_dir: str = None) -> dict:
+        # Acepta bytes, un archivo binario abierto (el spool del upload) o un stream no seekable
+        # columns limita el análisis a esas columnas (el resto solo aparece en el esquema)
+        # Con snapshot_dir, un CSV que se carga entero deja ahí su foto columnar
+        # (result["snapshot"])
+        backend = get_parser(parser)
+        if isinstance(file_bytes, (bytes, bytearray)):
+            source = BytesIO(file_bytes)
+        else:
+            source = file_bytes
+            if source.seekable():
+                source.seek(0)
+
+        # Detectar extensión y cargar con el parser elegido (PARSER_BACKEND o por petición)
+        if filename.endswith('.csv'):
+            usecols, header = DataProcessor._csv_projection(source, columns)
+            if streaming is None:
+                streaming = DataProcessor._should_stream(source)
+            if streaming:
+                result = DataProcessor._process_csv_streaming(
+                    source, filename, backend, usecols, header, columns
+                )
+                return DataProcessor._with_schema(result, header, columns)
+            t0 = time.perf_counter()
+            df = DataProcessor._read_csv_compact(source, backend, usecols)
+            lectura_s = time.perf_counter() - t0
+        elif filename.endswith('.xlsx'):
+            # Cada hoja se analiza por separado; el pool reparte las hojas entre procesos
+            sheets = [DataProcessor.analyze_excel_sheet(source, filename, sheet, columns)
+                      for sheet in XlsxReader.sheet_names(source)]
+            return DataProcessor.combine_sheets(filename, sheets, columns)
+        else:
+            raise ValueError("Formato de archivo no soportado")
+
+        result = DataProcessor._profile_dataframe(df, filename)
+        result["resumen_general"]["memoria"] = FrameCompactor.footprint(df)
+        if snapshot_dir:
+            result["snapshot"] = DatasetSnapshot.write(df, snapshot_dir, filename, lectura_s)
+        return DataProcessor._with_schema(result, header, columns)
+
+    @staticmethod
+    def preview_file(file_bytes, filename: str, parser: str = None, columns: ColumnSelection = None,
+                     rows: int = None) -> dict:
+        """
+        Análisis aproximado sobre una muestra uniforme de filas (mode=preview). Un CSV grande en
+        disco se muestrea por offsets sin recorrerlo; el resto en una pasada con reservorio.
+        En un libro .xlsx se muestrea la primera hoja.
+        """
+        backend = get_parser(parser)
+        rows = rows or settings.PREVIEW_SAMPLE_ROWS
+        if isinstance(file_bytes, (bytes, bytearray)):
+            source = BytesIO(file_bytes)
+        else:
+            source = file_bytes
+            if source.seekable():
+                source.seek(0)
+
         if filename.endswith('.csv'):
-            df = pd.read_csv(BytesIO(file_bytes))
+            usecols, header = DataProcessor._csv_projection(source, columns)
+            offset_min = settings.PREVIEW_OFFSET_SAMPLING_MIN_MB * 1024 * 1024
+            if source.seekable() and DataProcessor._size(source) >= offset_min:
+                sample = PreviewSampler.sample_offsets(source, rows, usecols)
+            else:
+                chunks = backend.iter_csv(source, settings.CSV_CHUNK_ROWS, usecols)
+                sample = PreviewSampler.sample_stream(chunks, rows)
         elif filename.endswith('.xlsx'):
-            df = pd.read_excel(BytesIO(file_bytes))
+            header = []
+            usecols = columns.recording(header) if columns is not None else None
+            sheet = XlsxReader.sheet_names(source)[0]
+            sample = PreviewSampler.sample_stream(
+                XlsxReader.iter_chunks(source, sheet, settings.CSV_CHUNK_ROWS, usecols), rows
+            )
         else:
             raise ValueError("Formato de archivo no soportado")
+        if callable(usecols):
+            columns.validate(header)
+
+        result = DataProcessor._profile_dataframe(sample.frame, filename)
+        return DataProcessor._with_schema(PreviewSampler.annotate(result, sample), header, columns)
+
+    @staticmethod
+    def process_csv_ranges(path: str, filename: str, executor, parts: int, parser: str = None,
+                           columns: ColumnSelection = None) -> dict:
+        """
+        Map-reduce de un CSV en disco: se parte en rangos de bytes alineados a filas (fase 1 en
+        paralelo: conteo de comillas), cada rango se analiza en un proceso con acumuladores
+        mergeables y el padre los combina en orden. Los tipos se fijan con las primeras filas para
+        que todos los rangos analicen cada columna igual. executor es un Executor de
+        concurrent.futures.
+        """
+        with open(path, "rb") as f:
+            usecols, header_names = DataProcessor._csv_projection(f, columns)
+            head = pd.read_csv(f, nrows=settings.CSV_CHUNK_ROWS, usecols=usecols)
+        types = {
+            col: TypeInference.infer(head[col]) for col in head.columns if head[col].notna().any()
+        }
+
+        header = CsvRangeSplitter.header(path)
+        size = os.path.getsize(path)
+        offsets = CsvRangeSplitter.candidates(len(header), size, parts)
+        ends = offsets[1:] + [size]
+        scans = list(executor.map(scan_range, [path] * len(offsets), offsets, ends))
+        ranges = CsvRangeSplitter.resolve(offsets, scans, size)
+
+        futures = [
+            executor.submit(
+                DataProcessor.analyze_csv_range, path, start, end, header, types, usecols, parser
+            )
+            for start, end in ranges
+        ]
+        analyzer = StreamingAnalyzer(types)
+        for future in futures:
+            analyzer.merge(future.result())
+
+        result = DataProcessor.build_streaming_result(analyzer, filename)
+        result["resumen_general"]["rangos"] = len(ranges)
+        result["estado"] = analyzer.dumps()
+        return DataProcessor._with_schema(result, header_names, columns)
+
+    @staticmethod
+    def append_csv(source, filename: str, state: bytes = None, snapshot: tuple = None,
+                   parser: str = None) -> tuple:
+        """
+        Anexa un lote de filas a un archivo ya analizado: parsea solo el lote, con los tipos ya
+        fijados, y lo combina con el estado mergeable guardado. Sin estado (archivos analizados en
+        memoria) se arma una vez desde la foto columnar, snapshot = (directorio, manifest).
+        Devuelve el resultado del archivo completo y el estado nuevo.
+        """
+        if state is not None:
+            analyzer = StreamingAnalyzer.loads(state)
+        else:
+            analyzer = DataProcessor._analyzer_from_frame(DatasetSnapshot.read(*snapshot))
+
+        if source.seekable():
+            source.seek(0)
+        start = source.tell()
+        header = pd.read_csv(source, nrows=0).columns.tolist()
+        source.seek(start)
+        missing = [col for col in analyzer.columns if col not in header]
+        if missing:
+            raise ColumnSelectionError(
+                f"Columnas que faltan en el lote: {', '.join(map(str, missing))}"
+            )
+
+        batch = StreamingAnalyzer(analyzer.column_types)
+        backend = get_parser(parser)
+        for chunk in backend.iter_csv(source, settings.CSV_CHUNK_ROWS, list(analyzer.columns)):
+            batch.update(chunk)
+        analyzer.merge(batch)
+
+        result = DataProcessor.build_streaming_result(analyzer, filename)
+        result["resumen_general"]["filas_anexadas"] = batch.total_rows
+        result["resumen_general"]["columnas_ignoradas"] = [
+            col for col in header if col not in analyzer.columns
+        ]
+        return result, analyzer.dumps()
+
+    @staticmethod
+    def _analyzer_from_frame(df: pd.DataFrame) -> StreamingAnalyzer:
+        """Acumuladores de un DataFrame entero; category vuelve a texto como llega de read_csv"""
+        categorical = [
+            col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)
+        ]
+        if categorical:
+            df = df.astype({col: object for col in categorical})
+        analyzer = StreamingAnalyzer()
+        analyzer.update(df)
+        return analyzer
+
+    @staticmethod
+    def analyze_csv_range(path: str, start: int, end: int, header: bytes, types: dict,
+                          usecols: list = None, parser: str = None) -> StreamingAnalyzer:
+        """Un rango [start, end) del CSV, leído por bloques con el encabezado adelante"""
+        analyzer = StreamingAnalyzer(types)
+        with BufferedReader(RangeReader(path, start, end, header)) as source:
+            for chunk in get_parser(parser).iter_csv(source, settings.CSV_CHUNK_ROWS, usecols):
+                analyzer.update(chunk)
+        return analyzer
+
+    @staticmethod
+    def _csv_projection(source, columns: ColumnSelection):
+        """
+        usecols y encabezado completo para una selección de columnas. Si el archivo es seekable
+        se lee solo la fila de encabezado y se valida antes de parsear los datos; en un stream
+        el encabezado se anota mientras pandas lo recorre y se valida con el primer bloque.
+        """
+        if columns is None:
+            return None, None
+        if not source.seekable():
+            header = []
+            return columns.recording(header), header
+        start = source.tell()
+        header = pd.read_csv(source, nrows=0).columns.tolist()
+        source.seek(start)
+        return columns.resolve(header), header
+
+    @staticmethod
+    def _with_schema(result: dict, header: list, columns: ColumnSelection) -> dict:
+        """
+        Con selección, columnas lista todo el encabezado y columnas_analizadas lo que se
+        analizó
+        """
+        if columns is None:
+            return result
+        resumen = result["resumen_general"]
+        resumen["columnas_analizadas"] = resumen["columnas"]
+        resumen["columnas"] = list(dict.fromkeys(header))
+        resumen["total_columnas"] = len(resumen["columnas"])
+        return result
+
+    @staticmethod
+    def analyze_excel_sheet(
+        source, filename: str, sheet: str, columns: ColumnSelection = None
+    ) -> dict:
+        """
+        Una hoja leída fila a fila en modo read_only. Si entra en un bloque se analiza en memoria
+        como un CSV chico; si no, los bloques alimentan los mismos acumuladores que el CSV en
+        streaming.
+        """
+        header = []
+        usecols = columns.recording(header) if columns is not None else None
+        chunks = XlsxReader.iter_chunks(source, sheet, settings.CSV_CHUNK_ROWS, usecols)
+        first = next(chunks)
+        second = next(chunks, None)
+
+        if second is None:
+            types = {col: TypeInference.infer(first[col]) for col in first.columns}
+            df = FrameCompactor.compact(first, types)
+            result = DataProcessor._profile_dataframe(df, filename)
+            result["resumen_general"]["memoria"] = FrameCompactor.footprint(df)
+        else:
+            analyzer = StreamingAnalyzer()
+            analyzer.update(first)
+            analyzer.update(second)
+            for chunk in chunks:
+                analyzer.update(chunk)
+            result = DataProcessor.build_streaming_result(analyzer, filename)
+
+        result["resumen_general"]["hoja"] = sheet
+        return DataProcessor._with_schema(result, header, columns)
+
+    @staticmethod
+    def combine_sheets(filename: str, sheets: list, columns: ColumnSelection = None) -> dict:
+        """
+        Resultado de un libro: la primera hoja ocupa el nivel superior (como antes, cuando solo
+        se leía esa) y resumen_general["hojas"] trae el análisis de cada hoja por nombre.
+        Una selección de columnas se valida contra el libro entero: cada hoja analiza las suyas.
+        """
+        if columns is not None:
+            columns.validate(
+                [col for sheet in sheets for col in sheet["resumen_general"]["columnas"]]
+            )
+        result = dict(sheets[0])
+        result["resumen_general"] = dict(sheets[0]["resumen_general"])
+        result["resumen_general"]["total_hojas"] = len(sheets)
+        result["resumen_general"]["hojas"] = {
+            sheet["resumen_general"]["hoja"]: {
+                "total_filas": sheet["resumen_general"]["total_filas"],
+                "total_columnas": sheet["resumen_general"]["total_columnas"],
+                "columnas": sheet["resumen_general"]["columnas"],
+                "analisis_columnas": sheet["analisis_columnas"]
+            }
+            for sheet in sheets
+        }
+        return result
+
+    @staticmethod
+    def _read_csv_compact(
+        source, backend: ParserBackend = None, usecols: list = None
+    ) -> pd.DataFrame:
+        """
+        Lectura en dos fases: las primeras filas deciden los tipos y la lectura completa ya
+        usa category para el texto de pocos distintos; después se achican los numéricos.
+        """
+        start = source.tell()
+        sample = pd.read_csv(source, nrows=settings.TYPE_INFERENCE_SAMPLE_ROWS, usecols=usecols)
+        source.seek(start)
+        types = {col: TypeInference.infer(sample[col]) for col in sample.columns}
+        backend = backend or get_parser()
+        dtypes = FrameCompactor.read_dtypes(sample, types)
+        df = backend.read_csv(source, dtype=dtypes, sample=sample, usecols=usecols)
+        return FrameCompactor.compact(df, types)
+
+    @staticmethod
+    def _profile_dataframe(df: pd.DataFrame, filename: str) -> dict:
+        """
+        Análisis en memoria: las columnas numéricas se perfilan juntas con ColumnProfiler y
+        el bloque estadisticas_pandas se arma con esos mismos resultados en vez de llamar a
+        describe().
+        """
+        # Las Series por posición se toman una sola vez: con miles de columnas iloc pesa
+        series = [col_data for _, col_data in df.items()]
+        types = [TypeInference.infer(col_data) for col_data in series]
+        numeric_positions = [pos for pos, column_type in enumerate(types) if column_type.is_numeric]
+        numeric_index = {pos: j for j, pos in enumerate(numeric_positions)}
 
-        # Análisis básico
-        total_rows = len(df)
-        total_columns = len(df.columns)
-        columnas = df.columns.tolist()
+        # Bloque numérico en orden Fortran (una columna contigua por variable), ya convertido;
+        # en archivos anchos va a memoria compartida y el perfil se reparte entre procesos
+        converted = []
+        with ColumnProfiler.block(len(df), len(numeric_positions)) as block:
+            for j, pos in enumerate(numeric_positions):
+                col_data = series[pos]
+                values = types[pos].convert(col_data)
+                if values is not col_data:
+                    converted.append(pos)
+                block.array[:, j] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            profile = ColumnProfiler.profile_block(block)
+
+        # Nulos originales de las columnas que no salen del perfil (texto o números convertidos)
+        other_positions = [
+            pos for pos in range(len(df.columns)) if pos not in numeric_index
+        ] + converted
+        other_nulls = df.iloc[:, other_positions].isna().sum().to_numpy() if other_positions else []
+        nulls = dict(zip(other_positions, other_nulls))
+        nulls.update(
+            {pos: profile["nulls"][j] for pos, j in numeric_index.items() if pos not in nulls}
+        )
 
-        # Análisis por columna más amigable
         column_analysis = {}
+        describe = {}
 
-        for col in df.columns:
-            col_data = df[col]
+        for pos, col in enumerate(df.columns):
+            col_data = series[pos]
             col_info = {
                 "nombre_columna": col,
-                "tipo_datos": DataProcessor._get_column_type(col_data),
+                "tipo_datos": types[pos].label,
                 "valores_totales": len(col_data),
-                "valores_vacios": col_data.isnull().sum(),
-                "valores_unicos": col_data.nunique()
+                "valores_vacios": int(nulls[pos])
             }
+            if types[pos].date_format:
+                col_info["formato_fecha"] = types[pos].date_format
 
             # Análisis específico según el tipo de datos
-            if col_data.dtype in ['int64', 'float64']:
-                col_info.update(DataProcessor._analyze_numeric_column(col_data, col))
+            if pos in numeric_index:
+                j = numeric_index[pos]
+                col_info["valores_unicos"] = int(profile["distinct"][j])
+                col_info["exacto"] = bool(profile["distinct_exact"][j])
+                # Valores presentes que la conversión a número dejó en NaN ("n/d" en montos)
+                col_info["valores_no_numericos"] = int(profile["nulls"][j] - nulls[pos])
+                integer = ptypes.is_integer_dtype(col_data.dtype)
+                extremes = None
+                if integer and max(abs(profile["min"][j]), abs(profile["max"][j])) >= 2 ** 53:
+                    # Desde 2^53 el bloque float64 redondea: los extremos salen de los enteros
+                    extremes = (int(col_data.min()), int(col_data.max()))
+                analysis, describe[col] = DataProcessor._profiled_numeric_result(
+                    col, profile, j, integer, extremes
+                )
             else:
-                col_info.update(DataProcessor._analyze_text_column(col_data, col))
+                analysis = DataProcessor._analyze_text_column(col_data, col)
+                # El análisis de texto ya contó los distintos: no se hace otro nunique()
+                stats = analysis.get("estadisticas", {})
+                col_info["valores_unicos"] = stats.get("valores_unicos", 0)
+                col_info["exacto"] = analysis.pop("exacto", True)
+                describe[col] = {"count": len(col_data) - col_info["valores_vacios"],
+                                 "unique": col_info["valores_unicos"]}
+                if stats.get("valor_mas_comun") is not None:
+                    describe[col]["top"] = stats["valor_mas_comun"]
+                    describe[col]["freq"] = stats["frecuencia"]
 
+            col_info.update(analysis)
             column_analysis[col] = col_info
 
         return {
             "resumen_general": {
                 "nombre_archivo": filename,
-                "total_filas": total_rows,
-                "total_columnas": total_columns,
-                "columnas": columnas
+                "total_filas": len(df),
+                "total_columnas": len(df.columns),
+                "columnas": df.columns.tolist()
             },
             "analisis_columnas": column_analysis,
-            "estadisticas_pandas": df.describe(include='all').to_dict()  # Mantenemos las originales por si acaso
+            "estadisticas_pandas": DataProcessor._describe_like_pandas(describe)
+        }
+
+    @staticmethod
+    def _profiled_numeric_result(col_name, profile: dict, j: int, integer: bool,
+                                 extremes: tuple = None):
+        """
+        Resultado y fila de describe() de la columna j del perfil numérico.
+        extremes: (mínimo, máximo) exactos de una columna entera fuera del rango exacto de float64
+        """
+        if not profile["count"][j]:
+            return {"interpretacion": "No hay datos numéricos válidos"}, {"count": 0}
+
+        native = int if integer else float
+        percentiles = dict(zip(PERCENTILE_NAMES, profile["percentiles"][:, j].tolist()))
+        mean, std = float(profile["mean"][j]), float(profile["std"][j])
+        minimo, maximo = float(profile["min"][j]), float(profile["max"][j])
+        exact_min, exact_max = extremes or (native(minimo), native(maximo))
+        analysis = DataProcessor._numeric_result(
+            col_name, mean, exact_min, exact_max, percentiles["p50"], std,
+            percentiles, float(profile["error_cuantiles"][j])
+        )
+        describe = {
+            "count": int(profile["count"][j]), "mean": mean, "std": std, "min": minimo,
+            "25%": percentiles["p25"], "50%": percentiles["p50"], "75%": percentiles["p75"],
+            "max": maximo
         }
+        return analysis, describe
+
+    @staticmethod
+    def _should_stream(source) -> bool:
+        """Los CSV grandes, o los streams de tamaño desconocido, se analizan por bloques"""
+        if not source.seekable():
+            return True
+        return DataProcessor._size(source) > settings.STREAMING_THRESHOLD_MB * 1024 * 1024
+
+    @staticmethod
+    def _size(source) -> int:
+        """Bytes desde la posición actual hasta el final, sin mover la posición"""
+        start = source.tell()
+        size = source.seek(0, 2) - start
+        source.seek(start)
+        return size
+
+    @staticmethod
+    def _process_csv_streaming(source, filename: str, backend: ParserBackend = None, usecols=None,
+                               header: list = None, columns: ColumnSelection = None) -> dict:
+        """Lee el CSV con chunksize y actualiza acumuladores por columna; nunca lo carga entero"""
+        analyzer = StreamingAnalyzer()
+        # Con un usecols callable (stream no seekable) el encabezado no se validó antes de leer
+        validated = not callable(usecols)
+        for chunk in (backend or get_parser()).iter_csv(source, settings.CSV_CHUNK_ROWS, usecols):
+            if not validated:
+                columns.validate(header)
+                validated = True
+            analyzer.update(chunk)
+        if not validated:
+            columns.validate(header)
+        result = DataProcessor.build_streaming_result(analyzer, filename)
+        # Los acumuladores ya están: se guardan para poder anexar filas sin releer el archivo
+        result["estado"] = analyzer.dumps()
+        return result
+
+    @staticmethod
+    def build_streaming_result(analyzer: StreamingAnalyzer, filename: str) -> dict:
+        """Convierte los acumuladores en la misma estructura que el análisis en memoria"""
+        column_analysis = {}
+        describe = {}
+
+        for col, acc in analyzer.columns.items():
+            col_info = {
+                "nombre_columna": col,
+                "tipo_datos": acc.tipo_datos,
+                "valores_totales": acc.total,
+                "valores_vacios": acc.nulls,
+                "valores_unicos": acc.valores_unicos,
+                "exacto": acc.distinct_exact
+            }
+            if acc.column_type is not None and acc.column_type.date_format:
+                col_info["formato_fecha"] = acc.column_type.date_format
+
+            if acc.kind == "numeric":
+                col_info["valores_no_numericos"] = acc.no_numericos
+                if not acc.numeric.n:
+                    col_info["interpretacion"] = "No hay datos numéricos válidos"
+                    describe[col] = {"count": 0}
+                else:
+                    r = acc.numeric.result()
+                    col_info.update(DataProcessor._numeric_result(
+                        col, r["promedio"], r["minimo"], r["maximo"], r["mediana"],
+                        r["desviacion_estandar"], r["percentiles"], r["error_cuantiles"]
+                    ))
+                    p = r["percentiles"]
+                    describe[col] = {
+                        "count": acc.numeric.n, "mean": r["promedio"],
+                        "std": r["desviacion_estandar"],
+                        "min": r["minimo"], "25%": p["p25"], "50%": p["p50"], "75%": p["p75"],
+                        "max": r["maximo"]
+                    }
+            else:
+                r = acc.frequencies.result()
+                if not r["top"] and not r["casi_unico"]:
+                    col_info["interpretacion"] = "No hay datos de texto válidos"
+                    describe[col] = {"count": 0, "unique": 0}
+                else:
+                    col_info.update(DataProcessor._frequency_result(
+                        col, acc.frequencies, acc.valores_unicos
+                    ))
+                    describe[col] = {"count": acc.total - acc.nulls, "unique": acc.valores_unicos}
+                    if r["top"]:
+                        describe[col]["top"], describe[col]["freq"] = r["top"][0]
+
+            column_analysis[col] = col_info
+
+        return {
+            "resumen_general": {
+                "nombre_archivo": filename,
+                "total_filas": analyzer.total_rows,
+                "total_columnas": len(analyzer.columns),
+                "columnas": list(analyzer.columns)
+            },
+            "analisis_columnas": column_analysis,
+            "estadisticas_pandas": DataProcessor._describe_like_pandas(describe)
+        }
+
+    @staticmethod
+    def _count_distinct(series):
+        """nunique() exacto, o estimación HyperLogLog en columnas por encima de HLL_MIN_ROWS"""
+        if len(series) > settings.HLL_MIN_ROWS:
+            hll = HyperLogLog()
+            hll.update(series.dropna())
+            return hll.estimate(), False
+        return series.nunique(), True
+
+    @staticmethod
+    def _describe_like_pandas(parts: dict) -> dict:
+        """Completa las filas como describe(include='all'): NaN donde la estadística no aplica"""
+        order = ["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        present = set(k for stats in parts.values() for k in stats)
+        if present & {"mean", "min"}:
+            present |= {"mean", "std", "min", "25%", "50%", "75%", "max"}
+        if present & {"unique", "top"}:
+            present |= {"unique", "top", "freq"}
+        rows = [r for r in order if r in present]
+        return {col: {r: stats.get(r, np.nan) for r in rows} for col, stats in parts.items()}
 
     @staticmethod
     def _get_column_type(series):
-        """Determina el tipo de datos de manera amigable"""
-        if series.dtype in ['int64', 'float64']:
-            return "Numérico"
-        elif series.dtype == 'object':
-            # Intentar determinar si es fecha
-            try:
-                pd.to_datetime(series.dropna().iloc[0])
-                return "Fecha/Texto"
-            except:
-                return "Texto"
-        else:
-            return "Otro"
+        """Determina el tipo de datos de manera amigable (ver TypeInference)"""
+        return TypeInference.infer(series).label
 
     @staticmethod
     def _analyze_numeric_column(series, col_name):
@@ -73,11 +552,28 @@ class DataProcessor:
         if len(clean_data) == 0:
             return {"interpretacion": "No hay datos numéricos válidos"}
 
-        promedio = clean_data.mean()
-        minimo = clean_data.min()
-        maximo = clean_data.max()
-        mediana = clean_data.median()
+        values = clean_data.to_numpy(dtype=np.float64)
+        if len(values) > settings.QUANTILE_SKETCH_MIN_ROWS:
+            # Columnas grandes: sketch KLL en vez de ordenar/particionar la columna entera
+            sketch = QuantileSketch()
+            sketch.update(values)
+            cuantiles, error = sketch.quantiles(PERCENTILES), sketch.error_bound
+        else:
+            cuantiles, error = np.quantile(values, PERCENTILES), 0.0
+        percentiles = dict(zip(PERCENTILE_NAMES, cuantiles.tolist()))
+
+        return DataProcessor._numeric_result(
+            col_name, clean_data.mean(), clean_data.min(), clean_data.max(),
+            percentiles["p50"], clean_data.std(), percentiles, error
+        )
 
+    @staticmethod
+    def _numeric_result(col_name, promedio, minimo, maximo, mediana, desviacion,
+                        percentiles=None, error_cuantiles=0.0):
+        """
+        Estadísticas e interpretación amigable de una columna numérica.
+        error_cuantiles es el error de rango normalizado de mediana y percentiles (0 = exactos).
+        """
         # Interpretación amigable
         interpretacion = []
 
@@ -107,7 +603,11 @@ class DataProcessor:
                 "minimo": round(minimo, 2),
                 "maximo": round(maximo, 2),
                 "mediana": round(mediana, 2),
-                "desviacion_estandar": round(clean_data.std(), 2)
+                "desviacion_estandar": round(desviacion, 2),
+                "percentiles": {
+                    k: round(v, 2) for k, v in (percentiles or {}).items() if k != "p50"
+                },
+                "error_cuantiles": round(error_cuantiles, 4)
             },
             "interpretacion": interpretacion
         }
@@ -120,34 +620,90 @@ class DataProcessor:
         if len(clean_data) == 0:
             return {"interpretacion": "No hay datos de texto válidos"}
 
-        value_counts = clean_data.value_counts()
-        mas_comun = value_counts.index[0]
-        frecuencia_mas_comun = value_counts.iloc[0]
+        if isinstance(clean_data.dtype, pd.CategoricalDtype):
+            # Columna codificada: las frecuencias salen de un bincount sobre los códigos
+            codes = clean_data.cat.codes.to_numpy()
+            counts = np.bincount(codes, minlength=len(clean_data.cat.categories))
+            # Empates por orden de aparición, como value_counts() (no por orden de las categorías)
+            first = np.full(len(counts), len(codes))
+            present, first_rows = np.unique(codes, return_index=True)
+            first[present] = first_rows
+            order = np.lexsort((first, -counts))[:3]
+            top = [(clean_data.cat.categories[i], int(counts[i])) for i in order if counts[i]]
+            return DataProcessor._text_result(col_name, top, int(np.count_nonzero(counts)))
+
+        if len(clean_data) <= settings.TOPK_MIN_ROWS and not is_near_unique(clean_data):
+            value_counts = clean_data.value_counts()
+            top = list(value_counts.head(3).items())
+            return DataProcessor._text_result(col_name, top, len(value_counts))
+
+        # Columnas grandes o casi únicas: top-k por bloques en vez de ordenar todo value_counts()
+        frequencies = FrequencyAccumulator()
+        for start in range(0, len(clean_data), settings.CSV_CHUNK_ROWS):
+            frequencies.update(clean_data.iloc[start:start + settings.CSV_CHUNK_ROWS])
+            if frequencies.near_unique:
+                break
+
+        if frequencies.exact:
+            unicos, exacto = frequencies.distinct, True
+        else:
+            unicos, exacto = DataProcessor._count_distinct(clean_data)
+        result = DataProcessor._frequency_result(col_name, frequencies, unicos)
+        result["exacto"] = exacto
+        return result
+
+    @staticmethod
+    def _frequency_result(col_name, frequencies: FrequencyAccumulator, valores_unicos):
+        """Resultado de texto a partir de un FrequencyAccumulator (en memoria o por bloques)"""
+        r = frequencies.result()
+        if r["casi_unico"]:
+            return {
+                "estadisticas": {
+                    "valores_unicos": valores_unicos,
+                    "casi_unico": True,
+                    "top_3_valores": []
+                },
+                "interpretacion": [
+                    "Casi todos los valores son distintos (posible identificador)",
+                    f"Valores únicos: {valores_unicos}"
+                ]
+            }
+        return DataProcessor._text_result(col_name, r["top"], valores_unicos, r["error_frecuencia"])
+
+    @staticmethod
+    def _text_result(col_name, top_valores_conteo, valores_unicos, error_frecuencia=0):
+        """
+        Estadísticas e interpretación de una columna de texto a partir de
+        sus valores más frecuentes [(valor, conteo), ...] y la cantidad de distintos.
+        error_frecuencia es cuánto puede sobreestimar cada conteo el resumen top-k (0 = exactos).
+        """
+        mas_comun, frecuencia_mas_comun = top_valores_conteo[0]
 
         interpretacion = []
 
         if col_name.lower() in ['departamento', 'department', 'area']:
             interpretacion.append(f"Departamento más común: {mas_comun} ({frecuencia_mas_comun} personas)")
-            interpretacion.append(f"Total de departamentos diferentes: {len(value_counts)}")
+            interpretacion.append(f"Total de departamentos diferentes: {valores_unicos}")
 
         elif col_name.lower() in ['remoto', 'remote', 'trabajo_remoto']:
             interpretacion.append(f"Modalidad más común: {mas_comun} ({frecuencia_mas_comun} personas)")
 
         else:
             interpretacion.append(f"Valor más frecuente: {mas_comun} (aparece {frecuencia_mas_comun} veces)")
-            interpretacion.append(f"Valores únicos: {len(value_counts)}")
+            interpretacion.append(f"Valores únicos: {valores_unicos}")
 
         # Top 3 valores más comunes
         top_valores = []
-        for i, (valor, count) in enumerate(value_counts.head(3).items()):
+        for valor, count in top_valores_conteo[:3]:
             top_valores.append(f"{valor}: {count} veces")
 
         return {
             "estadisticas": {
                 "valor_mas_comun": mas_comun,
                 "frecuencia": frecuencia_mas_comun,
-                "valores_unicos": len(value_counts),
-                "top_3_valores": top_valores
+                "valores_unicos": valores_unicos,
+                "top_3_valores": top_valores,
+                "error_frecuencia": int(error_frecuencia)
             },
             "interpretacion": interpretacion
-        }
\ No newline at end of file
+        }
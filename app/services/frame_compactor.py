@@ -0,0 +1,88 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+from app.services.type_inference import CATEGORICAL, BOOLEAN
+
+
+# Texto con pocos valores posibles que conviene codificar como diccionario
+ENCODED_KINDS = (CATEGORICAL, BOOLEAN)
+
+
+class FrameCompactor:
+    """
+    Carga compacta de un DataFrame: texto de pocos distintos como category (diccionario + códigos)
+    y numéricos en el ancho más chico que conserva todos los valores.
+    """
+
+    @staticmethod
+    def read_dtypes(sample: pd.DataFrame, types: dict) -> dict:
+        """dtype= para read_csv a partir de los tipos inferidos en la muestra"""
+        return {
+            col: "category" for col, column_type in types.items()
+            if column_type.kind in ENCODED_KINDS and sample[col].dtype == object
+        }
+
+    @staticmethod
+    def compact(df: pd.DataFrame, types: dict = None) -> pd.DataFrame:
+        """Reduce los numéricos de 64 bits y pasa a category lo que no vino así de la lectura"""
+        columns = {}
+        for col in df.columns:
+            series = df[col]
+            column_type = (types or {}).get(col)
+            encoded = column_type is not None and column_type.kind in ENCODED_KINDS
+            if encoded and series.dtype == object:
+                columns[col] = series.astype("category")
+            elif series.dtype == np.int64:
+                columns[col] = pd.to_numeric(series, downcast="integer")
+            elif series.dtype == np.float64:
+                columns[col] = FrameCompactor._downcast_float(series)
+        if not columns:
+            return df
+        df = df.copy(deep=False)
+        for col, values in columns.items():
+            df[col] = values
+        return df
+
+    @staticmethod
+    def _downcast_float(series: pd.Series) -> pd.Series:
+        """float32 solo si todos los valores vuelven idénticos a float64"""
+        values = series.to_numpy()
+        narrow = values.astype(np.float32)
+        with np.errstate(over="ignore", invalid="ignore"):
+            same = np.array_equal(narrow.astype(np.float64), values, equal_nan=True)
+        return pd.Series(narrow, index=series.index, name=series.name) if same else series
+
+    @staticmethod
+    def footprint(df: pd.DataFrame) -> dict:
+        """
+        Memoria del DataFrame compacto y la estimada con la carga por defecto
+        (object para el texto y 64 bits para los números), en bytes.
+        """
+        despues = int(df.memory_usage(index=False, deep=True).sum())
+        antes = 0
+        for col in df.columns:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                antes += FrameCompactor._object_bytes(series)
+            elif ptypes.is_numeric_dtype(series.dtype) and not ptypes.is_bool_dtype(series.dtype):
+                antes += 8 * len(series)
+            else:
+                antes += int(series.memory_usage(index=False, deep=True))
+        return {
+            "antes_bytes": antes,
+            "despues_bytes": despues,
+            "reduccion": round(antes / despues, 2) if despues else 1.0
+        }
+
+    @staticmethod
+    def _object_bytes(series: pd.Series) -> int:
+        """Lo que ocuparía la columna como object: un puntero por fila más cada valor repetido"""
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        sizes = np.fromiter((sys.getsizeof(v) for v in series.cat.categories), dtype=np.int64,
+                            count=len(series.cat.categories))
+        nulls = len(codes) - int(counts.sum())  # cada NaN en una columna object es un float
+        return int(8 * len(series) + (counts * sizes).sum() + nulls * sys.getsizeof(np.nan))
@@ -0,0 +1,116 @@
+import json
+
+import redis
+
+from app.core.config import settings
+
+
+class QueuedTask:
+    """Un mensaje del stream: el trabajo a procesar y cuántos intentos lleva"""
+
+    def __init__(self, message_id: str, task: dict, attempts: int = 0):
+        self.message_id = message_id
+        self.task = task
+        self.attempts = attempts
+
+    def __repr__(self):
+        return (f"QueuedTask({self.message_id!r}, file_id={self.task.get('file_id')!r}, "
+                f"attempts={self.attempts})")
+
+
+class JobQueue:
+    """
+    Cola de trabajos de análisis sobre un Redis Stream con consumer group: cada mensaje lo toma un
+    solo worker y queda pendiente hasta el ack. Si el worker se cae, otro lo reclama con XAUTOCLAIM
+    pasado JOB_CLAIM_IDLE_MS; un trabajo que falla se reencola, y tras JOB_MAX_ATTEMPTS intentos
+    pasa al stream de dead-letter con el último error.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.stream = settings.JOB_STREAM
+        self.group = settings.JOB_GROUP
+        self.dead_letter_stream = settings.JOB_DEAD_LETTER_STREAM
+
+    def ensure_group(self):
+        """Crea el stream y el grupo si no existen; el grupo lee desde el principio del stream"""
+        try:
+            self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def enqueue(self, task: dict, attempts: int = 0, client=None) -> str:
+        return (client or self.client).xadd(
+            self.stream, {"task": json.dumps(task), "attempts": attempts},
+            maxlen=settings.JOB_STREAM_MAXLEN, approximate=True
+        )
+
+    def read(self, consumer: str, count: int = 1, block_ms: int = None) -> list:
+        """Mensajes nuevos (nunca entregados) para este consumer"""
+        response = self.client.xreadgroup(self.group, consumer, {self.stream: ">"},
+                                          count=count, block=block_ms)
+        return [self._decode(message_id, fields)
+                for _, messages in response or [] for message_id, fields in messages]
+
+    def claim_stalled(self, consumer: str, count: int = 1, min_idle_ms: int = None) -> list:
+        """
+        Mensajes entregados a otro worker que no hizo ack en min_idle_ms. Cada entrega previa sin
+        ack cuenta como un intento, así un archivo que tira abajo al worker termina en dead-letter.
+        """
+        min_idle_ms = settings.JOB_CLAIM_IDLE_MS if min_idle_ms is None else min_idle_ms
+        claimed = self.client.xautoclaim(self.stream, self.group, consumer, min_idle_ms,
+                                         start_id="0-0", count=count)
+        tasks = []
+        for message_id, fields in claimed[1]:
+            if not fields:
+                # Borrado del stream mientras estaba pendiente (Redis 6.2): solo queda sacarlo
+                # del PEL
+                if message_id is not None:
+                    self.client.xack(self.stream, self.group, message_id)
+                continue
+            task = self._decode(message_id, fields)
+            pending = self.client.xpending_range(self.stream, self.group, min=message_id,
+                                                 max=message_id, count=1)
+            if pending:
+                task.attempts += pending[0]["times_delivered"] - 1
+            tasks.append(task)
+        return tasks
+
+    def ack(self, message_id: str, client=None):
+        client = client or self.client
+        client.xack(self.stream, self.group, message_id)
+        client.xdel(self.stream, message_id)
+
+    def retry(self, message: QueuedTask, error: str) -> bool:
+        """
+        Reencola el trabajo con un intento más, o lo manda a dead-letter si ya no le quedan.
+        El nuevo mensaje y el ack del actual van en una misma transacción. True si se reintenta.
+        """
+        attempts = message.attempts + 1
+        pipe = self.client.pipeline(transaction=True)
+        if attempts < settings.JOB_MAX_ATTEMPTS:
+            self.enqueue(message.task, attempts, client=pipe)
+        else:
+            self._dead_letter(message, attempts, error, pipe)
+        self.ack(message.message_id, client=pipe)
+        pipe.execute()
+        return attempts < settings.JOB_MAX_ATTEMPTS
+
+    def dead_letter(self, message: QueuedTask, error: str):
+        pipe = self.client.pipeline(transaction=True)
+        self._dead_letter(message, message.attempts, error, pipe)
+        self.ack(message.message_id, client=pipe)
+        pipe.execute()
+
+    def _dead_letter(self, message: QueuedTask, attempts: int, error: str, client):
+        client.xadd(
+            self.dead_letter_stream,
+            {"task": json.dumps(message.task), "attempts": attempts, "error": error,
+             "message_id": message.message_id},
+            maxlen=settings.JOB_STREAM_MAXLEN, approximate=True
+        )
+
+    @staticmethod
+    def _decode(message_id: str, fields: dict) -> QueuedTask:
+        return QueuedTask(message_id, json.loads(fields["task"]), int(fields.get("attempts", 0)))
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+import redis
+
+from app.core.config import settings
+
+
+class JobState:
+    """Estados del procesamiento, los mismos de diagrams/estados.md"""
+    SUBIDO = "Subido"
+    PROCESANDO = "Procesando"
+    PROCESADO = "Procesado"
+    ERROR = "Error"
+
+
+class JobQueueFullError(Exception):
+    """Hay demasiados trabajos pendientes; el cliente debe reintentar más tarde"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobService:
+    """
+    Procesamiento asíncrono de archivos con una cola acotada y estado en Redis.
+    El trabajo de CPU lo hace quien se pasa a run() (el ProcessingPool en la API).
+    """
+
+    def __init__(self, cache_service, max_pending: int = None):
+        self.cache_service = cache_service
+        self.max_pending = max_pending or settings.JOB_MAX_PENDING
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_job(file_id: str, filename: str, size_bytes: int) -> dict:
+        return {
+            "file_id": file_id,
+            "filename": filename,
+            "size_bytes": size_bytes,
+            "estado": JobState.SUBIDO,
+            "progreso": 0,
+            "tiempos": {},
+            "error": None,
+            "creado": _now(),
+            "actualizado": _now()
+        }
+
+    async def create(self, file_id: str, filename: str, size_bytes: int) -> dict:
+        """Reserva un lugar en la cola y registra el trabajo como Subido"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError("La cola de procesamiento está llena, intente más tarde")
+            self._pending += 1
+
+        job = self.new_job(file_id, filename, size_bytes)
+        try:
+            await self.cache_service.set_job(file_id, job)
+        except Exception:
+            # Sin el trabajo registrado nadie va a llamar a run(): el lugar se libera acá
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job
+
+    async def enqueue(
+        self, job_queue, file_id: str, filename: str, size_bytes: int, task: dict
+    ) -> dict:
+        """
+        JOB_BACKEND="queue": registra el trabajo como Subido y lo publica en el stream. No ocupa
+        lugar en la cola local: lo procesa el primer worker libre (app.worker).
+        """
+        job = self.new_job(file_id, filename, size_bytes)
+        await self.cache_service.set_job(file_id, job)
+        try:
+            # JobQueue usa el cliente síncrono (lo comparte con los workers): XADD fuera del
+            # event loop
+            await asyncio.to_thread(
+                job_queue.enqueue,
+                dict(task, file_id=file_id, filename=filename, size_bytes=size_bytes)
+            )
+        except redis.RedisError as e:
+            raise JobQueueFullError(
+                "La cola de trabajos no está disponible, intente más tarde"
+            ) from e
+        return job
+
+    async def _update(self, job: dict, **changes):
+        job.update(changes)
+        job["actualizado"] = _now()
+        await self.cache_service.set_job(job["file_id"], job)
+
+    async def start(self, job: dict) -> float:
+        """Pasa el trabajo a Procesando; devuelve los segundos que esperó en cola"""
+        t_creado = datetime.fromisoformat(job["creado"])
+        en_cola = (datetime.now(timezone.utc) - t_creado).total_seconds()
+        job["tiempos"] = dict(job.get("tiempos") or {}, en_cola_s=round(en_cola, 4))
+        await self._update(job, estado=JobState.PROCESANDO, progreso=10, error=None)
+        return en_cola
+
+    async def finish(self, job: dict, cache_data: dict, t0: float, en_cola: float):
+        """Guarda el resultado como stats del file_id y marca el trabajo Procesado"""
+        t_procesado = time.perf_counter()
+        await self._update(job, progreso=90)
+        await self.cache_service.set_stats(job["file_id"], cache_data)
+
+        job["tiempos"].update({
+            "procesamiento_s": round(t_procesado - t0, 4),
+            "total_s": round(time.perf_counter() - t0 + en_cola, 4)
+        })
+        await self._update(job, estado=JobState.PROCESADO, progreso=100)
+
+    async def fail(self, job: dict, error: str, t0: float, final: bool = True):
+        """Error definitivo, o de vuelta a Subido si el trabajo se va a reintentar"""
+        job["tiempos"]["total_s"] = round(time.perf_counter() - t0, 4)
+        if final:
+            await self._update(job, estado=JobState.ERROR, error=error)
+        else:
+            await self._update(job, estado=JobState.SUBIDO, progreso=0, error=error,
+                               reintentos=job.get("reintentos", 0) + 1)
+
+    async def run(self, job: dict, process):
+        """
+        Espera la corrutina process() y guarda su resultado como stats del file_id.
+        Recorre Subido → Procesando → Procesado/Error actualizando progreso y tiempos.
+        """
+        t0 = time.perf_counter()
+        try:
+            en_cola = await self.start(job)
+            cache_data = await process()
+            await self.finish(job, cache_data, t0, en_cola)
+        except Exception as e:
+            await self.fail(job, str(e), t0)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        return job
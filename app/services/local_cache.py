@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Cache en memoria del proceso (L1) delante de Redis: LRU acotado por bytes, no por entradas,
+    con vencimiento por entrada. El tamaño de cada entrada lo da quien la guarda (para las stats,
+    el largo del JSON que vino de Redis). Los valores se comparten entre lecturas: no se mutan.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (valor, bytes, vence)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Sube con cada invalidación: una lectura de Redis que empezó antes no se guarda
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size: int, ttl_seconds: float, version: int = None) -> bool:
+        """
+        Guarda value si entra en el límite y no hubo invalidaciones desde version
+        (la que tenía el cache antes de ir a Redis). Desaloja las menos usadas hasta hacerle lugar.
+        """
+        if size > self.max_bytes or ttl_seconds <= 0:
+            return False
+        with self._lock:
+            if version is not None and version != self.version:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            while self._bytes + size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+            self._bytes += size
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self.version += 1
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entradas": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.hits,
+                "fallos": self.misses,
+                "desalojos": self.evictions,
+                "tasa_aciertos": round(self.hits / lookups, 4) if lookups else None
+            }
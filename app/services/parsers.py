@@ -0,0 +1,131 @@
+import importlib.util
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from app.core.config import settings
+
+
+# Valores que read_csv toma como nulos por defecto (na_values en la documentación de pandas);
+# pyarrow necesita la lista explícita para leer los mismos nulos que el motor C
+NA_VALUES = (
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+)
+
+
+class ParserUnavailableError(ValueError):
+    """El parser pedido no existe o su dependencia no está instalada"""
+
+
+class ParserBackend(ABC):
+    """
+    Interfaz de lectura que usa DataProcessor. Todas las implementaciones deben devolver
+    el mismo DataFrame que el motor C de pandas (mismos dtypes, nulos y valores).
+    """
+
+    name = None
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def read_csv(self, source, dtype: dict = None, sample: pd.DataFrame = None,
+                 usecols: list = None) -> pd.DataFrame:
+        """
+        CSV completo; sample son las primeras filas ya leídas con pandas (para fijar tipos)
+        y usecols la lista de columnas a parsear (None para todas).
+        """
+
+    def iter_csv(self, source, chunksize: int, usecols=None):
+        """
+        CSV por bloques de chunksize filas; usecols puede ser una lista o un callable, como
+        en pandas
+        """
+        with pd.read_csv(source, chunksize=chunksize, usecols=usecols) as reader:
+            yield from reader
+
+
+class PandasParser(ParserBackend):
+    """Motor C de pandas: la referencia contra la que se comparan los demás"""
+
+    name = "pandas"
+
+    def read_csv(self, source, dtype: dict = None, sample: pd.DataFrame = None,
+                 usecols: list = None) -> pd.DataFrame:
+        return pd.read_csv(source, engine="c", dtype=dtype, usecols=usecols)
+
+
+class PyArrowParser(ParserBackend):
+    """
+    Lector CSV multihilo de pyarrow (opcional). Las columnas que pandas leyó como texto en la
+    muestra se fijan como string para que pyarrow no las convierta en fechas, y los nulos usan
+    la misma lista que pandas. La lectura por bloques sigue en pandas: el lector en streaming de
+    pyarrow fija los tipos con su primer bloque y no puede volver atrás en un stream no seekable.
+    """
+
+    name = "pyarrow"
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("pyarrow") is not None
+
+    def read_csv(self, source, dtype: dict = None, sample: pd.DataFrame = None,
+                 usecols: list = None) -> pd.DataFrame:
+        import pyarrow as pa
+        from pyarrow import csv
+
+        dtype = dtype or {}
+        column_types = {}
+        if sample is not None:
+            for col in sample.columns:
+                if dtype.get(col) == "category":
+                    column_types[col] = pa.dictionary(pa.int32(), pa.string())
+                elif sample[col].dtype == object:
+                    column_types[col] = pa.string()
+                elif sample[col].isna().all():
+                    # pandas lee una columna vacía como float64; pyarrow la dejaría como null
+                    column_types[col] = pa.float64()
+
+        start = source.tell()
+        try:
+            table = csv.read_csv(
+                source,
+                read_options=csv.ReadOptions(use_threads=True),
+                convert_options=csv.ConvertOptions(
+                    column_types=column_types,
+                    include_columns=usecols or [],
+                    null_values=list(NA_VALUES),
+                    strings_can_be_null=True,
+                    quoted_strings_can_be_null=True
+                )
+            )
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Tipos que cambian después del primer bloque u otros casos que el motor C sí resuelve
+            source.seek(start)
+            return PandasParser().read_csv(source, dtype=dtype, usecols=usecols)
+
+        df = table.to_pandas()
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # pandas ordena las categorías; pyarrow las deja en orden de aparición
+                df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+        return df
+
+
+PARSERS = {parser.name: parser for parser in (PandasParser(), PyArrowParser())}
+# Con PARSER_BACKEND="auto" se usa el primero disponible
+AUTO_ORDER = ["pyarrow", "pandas"]
+
+
+def get_parser(name: str = None) -> ParserBackend:
+    """Parser por nombre, o el de la configuración; "auto" elige el más rápido instalado"""
+    name = name or settings.PARSER_BACKEND
+    if name == "auto":
+        return next(PARSERS[n] for n in AUTO_ORDER if PARSERS[n].available())
+    if name not in PARSERS:
+        raise ParserUnavailableError(
+            f"Parser desconocido: {name}. Opciones: auto, {', '.join(PARSERS)}"
+        )
+    if not PARSERS[name].available():
+        raise ParserUnavailableError(f"El parser {name} no está instalado en este servidor")
+    return PARSERS[name]
@@ -108,6 +108,8 @@ class PDFService:
                     for key, value in col_info['estadisticas'].items():
                         if isinstance(value, list):
                             value = ", ".join(map(str, value))
+                        elif isinstance(value, dict):
+                            value = ", ".join(f"{k}: {v}" for k, v in value.items())
                         stats_data.append([key.replace('_', ' ').title() + ":", str(value)])
 
                     if stats_data:
@@ -0,0 +1,147 @@
+import math
+from io import BytesIO
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.type_inference import TypeInference
+
+
+RESERVOIR = "reservorio"
+OFFSETS = "offsets"
+
+
+class PreviewSample:
+    """Filas muestreadas para el modo preview y lo que se sabe del total del archivo"""
+
+    def __init__(self, frame: pd.DataFrame, total_rows: int, exact: bool, method: str):
+        self.frame = frame
+        self.total_rows = total_rows
+        self.exact = exact  # True si la muestra es el archivo completo
+        self.method = method
+
+
+class PreviewSampler:
+    """
+    Muestra uniforme de filas para responder en menos de un segundo: en una pasada (reservorio
+    por claves aleatorias) o, en un CSV grande en disco, leyendo líneas en offsets de bytes al azar.
+    Las estimaciones llevan intervalos de confianza y se marcan como aproximadas.
+    """
+
+    @staticmethod
+    def sample_stream(chunks, rows: int, seed: int = 0) -> PreviewSample:
+        """
+        Reservorio sobre bloques de DataFrame: cada fila recibe una clave uniforme y se quedan las
+        rows de menor clave (muestra uniforme sin reemplazo), en el orden original del archivo.
+        """
+        rng = np.random.default_rng(seed)
+        kept, keys, seen = None, np.empty(0), 0
+        for chunk in chunks:
+            seen += len(chunk)
+            chunk_keys = rng.random(len(chunk))
+            if kept is None:
+                kept, keys = chunk.reset_index(drop=True), chunk_keys
+            else:
+                kept = pd.concat([kept, chunk], ignore_index=True)
+                keys = np.concatenate([keys, chunk_keys])
+            if len(kept) > rows:
+                keep = np.sort(np.argpartition(keys, rows)[:rows])
+                kept, keys = kept.iloc[keep].reset_index(drop=True), keys[keep]
+        return PreviewSample(kept, seen, exact=seen <= rows, method=RESERVOIR)
+
+    @staticmethod
+    def sample_offsets(source, rows: int, usecols=None, seed: int = 0) -> PreviewSample:
+        """
+        Muestreo por offsets de un CSV seekable: en cada offset al azar se descarta la línea parcial
+        y se toma la siguiente. No recorre el archivo, así que el total de filas se estima con el
+        largo promedio de las líneas leídas. Supone que no hay saltos de línea dentro de comillas.
+        """
+        rng = np.random.default_rng(seed)
+        start = source.tell()
+        header = source.readline()
+        data_start = source.tell()
+        size = source.seek(0, 2)
+
+        lines = {}
+        for offset in np.sort(rng.integers(data_start, size, rows)):
+            source.seek(offset)
+            source.readline()
+            position = source.tell()
+            if position >= size or position in lines:
+                continue
+            line = source.readline()
+            lines[position] = line if line.endswith(b"\n") else line + b"\n"
+        source.seek(start)
+
+        body = BytesIO(header + b"".join(lines.values()))
+        frame = pd.read_csv(body, usecols=usecols, on_bad_lines="skip")
+        mean_length = np.mean([len(line) for line in lines.values()]) if lines else 1
+        total_rows = max(len(frame), int(round((size - data_start) / mean_length)))
+        return PreviewSample(frame, total_rows, exact=False, method=OFFSETS)
+
+    @staticmethod
+    def mean_interval(values: np.ndarray, population: int, confidence: float) -> list:
+        """Promedio ± z·s/√n, con corrección por población finita (la muestra es sin reemplazo)"""
+        n = len(values)
+        mean = float(values.mean())
+        if n < 2:
+            return [mean, mean]
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        se = float(values.std(ddof=1)) / math.sqrt(n)
+        if population > 1:
+            se *= math.sqrt(max(population - n, 0) / (population - 1))
+        return [mean - z * se, mean + z * se]
+
+    @staticmethod
+    def median_interval(values: np.ndarray, confidence: float) -> list:
+        """Intervalo sin supuestos de distribución: estadísticos de orden n/2 ± z·√n/2"""
+        ordered = np.sort(values)
+        n = len(ordered)
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        low = max(int(math.floor(n / 2 - z * math.sqrt(n) / 2)), 0)
+        high = min(int(math.ceil(n / 2 + z * math.sqrt(n) / 2)), n - 1)
+        return [float(ordered[low]), float(ordered[high])]
+
+    @staticmethod
+    def annotate(result: dict, sample: PreviewSample, confidence: float = None) -> dict:
+        """Convierte el análisis de la muestra en estimaciones del archivo completo"""
+        confidence = confidence or settings.PREVIEW_CONFIDENCE
+        frame = sample.frame
+        n = len(frame)
+        scale = sample.total_rows / n if n else 0
+
+        resumen = result["resumen_general"]
+        resumen.update({
+            "total_filas": sample.total_rows,
+            "total_filas_exacto": sample.exact or sample.method == RESERVOIR,
+            "filas_muestra": n,
+            "metodo_muestreo": sample.method,
+            "nivel_confianza": confidence,
+            "aproximado": not sample.exact
+        })
+
+        for col, info in result["analisis_columnas"].items():
+            info["aproximado"] = not sample.exact
+            info["valores_muestra"] = info["valores_totales"]
+            info["valores_totales"] = sample.total_rows
+            info["valores_vacios"] = int(round(info["valores_vacios"] * scale))
+            if "valores_no_numericos" in info:
+                info["valores_no_numericos"] = int(round(info["valores_no_numericos"] * scale))
+            column_type = TypeInference.infer(frame[col])
+            if not column_type.is_numeric:
+                continue
+            values = column_type.convert(frame[col]).dropna().to_numpy(dtype=np.float64)
+            if not len(values):
+                continue
+            if sample.exact:
+                mean, median = float(values.mean()), float(np.median(values))
+                intervals = {"promedio": [mean, mean], "mediana": [median, median]}
+            else:
+                intervals = {
+                    "promedio": PreviewSampler.mean_interval(values, sample.total_rows, confidence),
+                    "mediana": PreviewSampler.median_interval(values, confidence)
+                }
+            info["intervalos_confianza"] = intervals
+        return result
@@ -0,0 +1,213 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+from app.services.column_selection import ColumnSelection
+from app.services.data_processor import DataProcessor
+from app.services.pdf_service import PDFService
+from app.services.xlsx_reader import XlsxReader
+
+
+class PoolSaturatedError(Exception):
+    """El pool tiene demasiadas tareas en vuelo; se responde 503 con Retry-After"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("El servidor está procesando demasiados archivos, intente más tarde")
+        self.retry_after = retry_after
+
+
+def _process_path(path: str, filename: str, parser: str = None, columns: ColumnSelection = None,
+                  snapshot_dir: str = None) -> dict:
+    """Se ejecuta en el proceso hijo: lee el spool desde disco, sin recibir los bytes por pickle"""
+    with open(path, "rb") as f:
+        return DataProcessor.process_file(f, filename, parser=parser, columns=columns,
+                                          snapshot_dir=snapshot_dir)
+
+
+def _process_file(source, filename: str, parser: str = None, columns: ColumnSelection = None,
+                  snapshot_dir: str = None) -> dict:
+    # run_in_executor no acepta kwargs: el parser, la selección y el directorio van posicionales
+    return DataProcessor.process_file(source, filename, parser=parser, columns=columns,
+                                      snapshot_dir=snapshot_dir)
+
+
+def _preview_path(
+    path: str, filename: str, parser: str = None, columns: ColumnSelection = None
+) -> dict:
+    with open(path, "rb") as f:
+        return DataProcessor.preview_file(f, filename, parser, columns)
+
+
+def _append_path(
+    path: str, filename: str, state: bytes = None, snapshot: tuple = None, parser: str = None
+):
+    with open(path, "rb") as f:
+        return DataProcessor.append_csv(f, filename, state, snapshot, parser)
+
+
+def _sheet_names(path: str) -> list:
+    with open(path, "rb") as f:
+        return XlsxReader.sheet_names(f)
+
+
+def _process_sheet(path: str, filename: str, sheet: str, columns: ColumnSelection = None) -> dict:
+    """Una hoja de un libro .xlsx: cada proceso abre el spool por su cuenta"""
+    with open(path, "rb") as f:
+        return DataProcessor.analyze_excel_sheet(f, filename, sheet, columns)
+
+
+def _render_pdf(stats: dict, file_id: str) -> bytes:
+    return PDFService.generate_stats_pdf(stats, file_id)
+
+
+class ProcessingPool:
+    """
+    Ejecuta el trabajo de CPU fuera del event loop: en un pool de procesos, o en hilos
+    si PROCESS_POOL_WORKERS es 0. Limita las tareas en vuelo para no acumular una cola infinita.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None):
+        self.max_workers = settings.PROCESS_POOL_WORKERS if max_workers is None else max_workers
+        self.max_queue = max_queue or settings.PROCESS_POOL_MAX_QUEUE
+        self._executor = None
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Se crea con el primer uso; "spawn" evita heredar hilos y conexiones del proceso de la API
+        if self._executor is None and self.max_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return self._inflight
+
+    def _acquire(self):
+        with self._lock:
+            if self._inflight >= self.max_queue:
+                raise PoolSaturatedError(settings.PROCESS_POOL_RETRY_AFTER_SECONDS)
+            self._inflight += 1
+
+    def _release(self):
+        with self._lock:
+            self._inflight -= 1
+
+    async def _reserve(self, wait: bool):
+        """Toma un lugar en la cola; espera uno libre si wait=True"""
+        while True:
+            try:
+                self._acquire()
+                return
+            except PoolSaturatedError:
+                if not wait:
+                    raise
+                await asyncio.sleep(0.05)
+
+    async def run(self, fn, *args, wait: bool = False):
+        """
+        Ejecuta fn(*args) en el pool. Si está saturado lanza PoolSaturatedError,
+        o espera un lugar libre cuando wait=True (trabajos en segundo plano).
+        """
+        await self._reserve(wait)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self._release()
+
+    async def process_spool(self, spool, wait: bool = False, parser: str = None,
+                            columns: ColumnSelection = None, snapshot_dir: str = None) -> dict:
+        """
+        Analiza un upload; en modo procesos el hijo recibe solo la ruta del spool.
+        snapshot_dir: ver DataProcessor.process_file (libros y CSV por rangos no dejan foto)
+        """
+        if self.max_workers > 0 and spool.filename.endswith(".xlsx"):
+            return await self._process_workbook(spool, wait, columns)
+        if (self.max_workers > 0 and spool.filename.endswith(".csv")
+                and spool.size >= settings.CSV_PARALLEL_MIN_MB * 1024 * 1024):
+            return await self._process_ranges(spool, wait, parser, columns)
+        if self.max_workers > 0:
+            return await self.run(_process_path, spool.ensure_on_disk(), spool.filename, parser,
+                                  columns, snapshot_dir, wait=wait)
+        return await self.run(_process_file, spool.rewind(), spool.filename, parser, columns,
+                              snapshot_dir, wait=wait)
+
+    async def preview_spool(
+        self, spool, parser: str = None, columns: ColumnSelection = None
+    ) -> dict:
+        """
+        Análisis sobre una muestra (mode=preview); el spool queda disponible para el análisis
+        completo
+        """
+        if self.max_workers > 0:
+            return await self.run(
+                _preview_path, spool.ensure_on_disk(), spool.filename, parser, columns
+            )
+        return await self.run(
+            DataProcessor.preview_file, spool.rewind(), spool.filename, parser, columns
+        )
+
+    async def append_spool(
+        self, spool, state: bytes = None, snapshot: tuple = None, parser: str = None
+    ) -> tuple:
+        """Lote de filas para un archivo ya analizado (ver DataProcessor.append_csv)"""
+        if self.max_workers > 0:
+            return await self.run(_append_path, spool.ensure_on_disk(), spool.filename, state,
+                                  snapshot, parser)
+        return await self.run(DataProcessor.append_csv, spool.rewind(), spool.filename, state,
+                              snapshot, parser)
+
+    async def _process_workbook(self, spool, wait: bool, columns: ColumnSelection = None) -> dict:
+        """
+        Un libro ocupa un lugar en la cola, pero sus hojas se analizan en paralelo:
+        una tarea por hoja en el executor y la combinación en este proceso.
+        """
+        await self._reserve(wait)
+        try:
+            loop = asyncio.get_running_loop()
+            path = spool.ensure_on_disk()
+            sheets = await loop.run_in_executor(self.executor, _sheet_names, path)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(
+                    self.executor, _process_sheet, path, spool.filename, sheet, columns
+                )
+                for sheet in sheets
+            ))
+            return DataProcessor.combine_sheets(spool.filename, list(results), columns)
+        finally:
+            self._release()
+
+    async def _process_ranges(
+        self, spool, wait: bool, parser: str = None, columns: ColumnSelection = None
+    ) -> dict:
+        """
+        CSV grande: un lugar en la cola y sus rangos de bytes repartidos entre los procesos.
+        La coordinación (split, espera y reduce) corre en un hilo para no bloquear el event loop.
+        """
+        await self._reserve(wait)
+        try:
+            loop = asyncio.get_running_loop()
+            parts = settings.CSV_PARALLEL_RANGES or self.max_workers
+            return await loop.run_in_executor(
+                None, DataProcessor.process_csv_ranges,
+                spool.ensure_on_disk(), spool.filename, self.executor, parts, parser, columns
+            )
+        finally:
+            self._release()
+
+    async def render_pdf(self, stats: dict, file_id: str) -> bytes:
+        if self.max_workers > 0:
+            return await self.run(_render_pdf, stats, file_id)
+        return await self.run(PDFService.generate_stats_pdf, stats, file_id)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import time
+import uuid
+
+import redis
+
+from app.core.config import settings
+
+
+class SingleFlight:
+    """
+    Une pedidos concurrentes idénticos (la misma clave) en un solo cálculo en vuelo: el primero
+    lo arranca y los demás esperan su resultado, o su excepción. Con shared=True además se
+    coordina con las otras réplicas por un lease en Redis: la que lo toma calcula y deja el
+    resultado (bytes) unos segundos en Redis, y las demás lo leen de ahí en vez de recalcularlo.
+    """
+
+    def __init__(self, cache=None):
+        # CacheService del proceso, para el cliente de Redis; sin él no hay modo compartido
+        self.cache = cache
+        self._flights = {}
+        self.computed = 0
+        self.joined = 0
+        self.remote = 0
+
+    async def run(self, key: str, compute, shared: bool = False):
+        """
+        Resultado de await compute() para key. Si un pedido se va (cancelado) el cálculo sigue
+        para los demás. shared solo sirve si compute devuelve bytes.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            if shared and self.cache is not None:
+                work = self._shared(key, compute)
+            else:
+                work = self._compute(compute)
+            flight = asyncio.ensure_future(work)
+            self._flights[key] = flight
+            flight.add_done_callback(functools.partial(self._done, key))
+        else:
+            self.joined += 1
+        return await asyncio.shield(flight)
+
+    def _done(self, key: str, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # La marca como leída aunque ya no quede nadie esperando
+            flight.exception()
+
+    async def _compute(self, compute):
+        self.computed += 1
+        return await compute()
+
+    async def _shared(self, key: str, compute):
+        client = self.cache.client
+        name = f"vuelo:{key}"
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_SECONDS
+        while True:
+            # Token propio: el resultado se guarda bajo el token del lease que lo calculó
+            token = uuid.uuid4().hex
+            lease = client.lock(name, timeout=settings.SINGLE_FLIGHT_LEASE_SECONDS)
+            try:
+                leader = await lease.acquire(blocking=False, token=token)
+                holder = None if leader else await client.get(name)
+            except redis.exceptions.RedisError as e:
+                print(f"Single-flight de {key} solo en este proceso, sin lease de Redis: {e}")
+                return await self._compute(compute)
+
+            if leader:
+                try:
+                    value = await self._compute(compute)
+                    try:
+                        await client.set(f"{name}:{token}", value,
+                                         ex=settings.SINGLE_FLIGHT_RESULT_TTL_SECONDS)
+                    except redis.exceptions.RedisError as e:
+                        print(f"No se pudo compartir el resultado de {key} en Redis: {e}")
+                    return value
+                finally:
+                    try:
+                        await lease.release()
+                    except redis.exceptions.RedisError:
+                        pass  # Venció el lease o se cayó Redis: lo libera la expiración
+
+            value = await self._wait(name, holder, deadline)
+            if value is not None:
+                self.remote += 1
+                return value
+            if time.monotonic() >= deadline:
+                return await self._compute(compute)
+            # La otra réplica terminó sin resultado (falló, o venció el lease): se vuelve a intentar
+
+    async def _wait(self, name: str, holder, deadline: float):
+        """Resultado del lease holder, o None si se liberó sin dejarlo o se pasó el deadline"""
+        if holder is None:
+            return None
+        result = f"{name}:{holder.decode('utf-8') if isinstance(holder, bytes) else holder}"
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_SECONDS)
+                # Atómico: el líder guarda el resultado antes de soltar el lease
+                value, current = await self.cache.client.mget([result, name])
+                if value is not None or current != holder:
+                    return value
+        except redis.exceptions.RedisError as e:
+            print(f"Error esperando el resultado de {name} en Redis: {e}")
+        return None
+
+    def metrics(self) -> dict:
+        return {
+            "en_vuelo": len(self._flights),
+            "calculos": self.computed,
+            "compartidos": self.joined,
+            "de_otra_replica": self.remote
+        }
@@ -0,0 +1,287 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+
+class ReservoirSample:
+    """
+    Muestra uniforme de tamaño fijo sobre un stream (algoritmo R, vectorizado por bloque).
+    Es mergeable: dos muestras de streams distintos se combinan en proporción a lo que vio cada una.
+    """
+
+    def __init__(self, capacity: int, seed: int = 0):
+        self.capacity = capacity
+        self.seen = 0
+        self.values = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values)
+        if not len(values):
+            return
+        if not len(self.values):
+            self.values = np.empty(0, dtype=values.dtype)
+
+        # Llenar la muestra mientras haya lugar
+        free = self.capacity - len(self.values)
+        if free > 0:
+            self.values = np.concatenate([self.values, values[:free]])
+            self.seen += min(free, len(values))
+            values = values[free:]
+            if not len(values):
+                return
+
+        # El elemento t-ésimo (base 0) entra con probabilidad capacity / (t + 1)
+        positions = self.seen + np.arange(1, len(values) + 1)
+        slots = (self._rng.random(len(values)) * positions).astype(np.int64)
+        accepted = slots < self.capacity
+        self.values[slots[accepted]] = values[accepted]
+        self.seen += len(values)
+
+    def merge(self, other: "ReservoirSample"):
+        if not other.seen:
+            return self
+        if not self.seen:
+            self.values, self.seen = other.values.copy(), other.seen
+            return self
+        total = self.seen + other.seen
+        size = min(self.capacity, len(self.values) + len(other.values))
+        from_self = min(len(self.values), int(round(size * self.seen / total)))
+        from_other = min(len(other.values), size - from_self)
+        self.values = np.concatenate([
+            self._rng.choice(self.values, from_self, replace=False),
+            self._rng.choice(other.values, from_other, replace=False)
+        ])
+        self.seen = total
+        return self
+
+    @property
+    def exact(self) -> bool:
+        """True si la muestra contiene todos los elementos vistos"""
+        return self.seen <= self.capacity
+
+    def quantiles(self, qs) -> np.ndarray:
+        return np.quantile(self.values, qs)
+
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles tipo KLL sobre NumPy: niveles de compactadores donde cada ítem del
+    nivel h pesa 2^h. Ocupa O(k) memoria, es mergeable y el error de rango normalizado
+    es ~2.296 / k^0.9723 (con 99% de confianza). Mientras no compacta, es exacto.
+    """
+
+    C = 2 / 3
+
+    def __init__(self, error: float = None, k: int = None, seed: int = 0):
+        if k is None:
+            error = error or settings.QUANTILE_SKETCH_ERROR
+            k = int(math.ceil((2.296 / error) ** (1 / 0.9723)))
+        self.k = max(8, k)
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.compacted = False
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * self.C ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(level)
+                # Con cantidad impar queda un ítem en el nivel; el resto se promueve de a pares
+                keep = level[:len(level) % 2]
+                promoted = level[len(keep):][self._rng.integers(2)::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.compacted = True
+            h += 1
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self.compacted = self.compacted or other.compacted
+        self._compress()
+        return self
+
+    @property
+    def error_bound(self) -> float:
+        """Error de rango normalizado de los cuantiles (0 si todavía es exacto)"""
+        if not self.compacted:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.n:
+            return np.full(qs.shape, np.nan)
+        if not self.compacted:
+            return np.quantile(self.levels[0], qs)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        return items[np.minimum(idx, len(items) - 1)]
+
+    def to_state(self, arrays: dict, prefix: str) -> dict:
+        """Estado persistible: los niveles van a arrays (bajo prefix) y el resto al dict"""
+        for h, level in enumerate(self.levels):
+            arrays[f"{prefix}.{h}"] = level
+        # El estado del generador también: seguir desde el estado da lo mismo que no haberlo cortado
+        return {"k": self.k, "n": self.n, "niveles": len(self.levels), "compactado": self.compacted,
+                "rng": self._rng.bit_generator.state}
+
+    @classmethod
+    def from_state(cls, state: dict, arrays: dict, prefix: str) -> "QuantileSketch":
+        sketch = cls(k=state["k"])
+        sketch.n = state["n"]
+        sketch.levels = [arrays[f"{prefix}.{h}"] for h in range(state["niveles"])]
+        sketch.compacted = state["compactado"]
+        sketch._rng.bit_generator.state = state["rng"]
+        return sketch
+
+
+class HyperLogLog:
+    """
+    Conteo aproximado de distintos sobre hashes de 64 bits (pd.util.hash_pandas_object).
+    Vectorizado con NumPy, mergeable con un máximo por registro; error relativo ~1.04 / sqrt(2^p).
+    """
+
+    def __init__(self, precision: int = None):
+        self.p = precision or settings.HLL_PRECISION
+        self.m = 1 << self.p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        bits = 64 - self.p
+        idx = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # rest tiene menos de 53 bits, así que frexp da su largo en bits de forma exacta
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def update(self, values):
+        """Agrega una Serie/array de valores hasheándolos con pandas"""
+        if isinstance(values, pd.Series):
+            hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        else:
+            hashes = pd.util.hash_array(np.asarray(values))
+        self.update_hashes(hashes)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Corrección de rango bajo (linear counting)
+            return int(round(self.m * math.log(self.m / zeros)))
+        return int(round(raw))
+
+    def to_state(self, arrays: dict, prefix: str) -> dict:
+        arrays[prefix] = self.registers
+        return {"p": self.p}
+
+    @classmethod
+    def from_state(cls, state: dict, arrays: dict, prefix: str) -> "HyperLogLog":
+        hll = cls(state["p"])
+        hll.registers = arrays[prefix].astype(np.uint8, copy=True)
+        return hll
+
+
+class SpaceSaving:
+    """
+    Top-k aproximado (Space-Saving) con a lo sumo `capacity` contadores, mergeable.
+    Cada conteo sobreestima el real en a lo sumo `floor`, y todo valor con frecuencia
+    mayor que n / capacity está garantizado en el resumen. Mientras no descarta, es exacto.
+    """
+
+    def __init__(self, capacity: int = None):
+        self.capacity = capacity or settings.TOPK_CAPACITY
+        self.n = 0
+        self.floor = 0  # cota del conteo de cualquier valor que quedó fuera del resumen
+        self.counts = pd.Series(dtype="int64")
+
+    def update(self, values: pd.Series):
+        if len(values):
+            self.add_counts(values.value_counts(), len(values))
+
+    def add_counts(self, counts: pd.Series, n: int, floor: int = 0):
+        """Suma conteos (valor → frecuencia) de n elementos; floor es la cota de los ausentes"""
+        # Se conserva el orden de aparición para desempatar igual que value_counts()
+        new = counts.index.difference(self.counts.index, sort=False)
+        # Sin los índices vacíos: pandas dejará de ignorarlos al elegir el dtype del resultado
+        pieces = [piece for piece in (self.counts.index, new) if len(piece)]
+        index = pieces[0].append(pieces[1:]) if pieces else counts.index
+        merged = (self.counts.reindex(index, fill_value=self.floor)
+                  + counts.reindex(index, fill_value=floor))
+        self.n += n
+        self.floor += floor
+        if len(merged) > self.capacity:
+            merged = merged.sort_values(ascending=False, kind="stable")
+            self.floor = max(self.floor, int(merged.iloc[self.capacity]))
+            merged = merged.iloc[:self.capacity]
+        self.counts = merged.astype("int64")
+
+    def merge(self, other: "SpaceSaving"):
+        self.add_counts(other.counts, other.n, other.floor)
+        return self
+
+    @property
+    def exact(self) -> bool:
+        return self.floor == 0
+
+    def top(self, k: int) -> list:
+        ordered = self.counts.sort_values(ascending=False, kind="stable")
+        return list(ordered.head(k).items())
+
+    def to_state(self, arrays: dict, prefix: str) -> dict:
+        """Los conteos van a arrays; los valores (texto) al dict, en el mismo orden"""
+        arrays[prefix] = self.counts.to_numpy(dtype=np.int64)
+        return {"capacity": self.capacity, "n": self.n, "floor": self.floor,
+                "valores": self.counts.index.tolist()}
+
+    @classmethod
+    def from_state(cls, state: dict, arrays: dict, prefix: str) -> "SpaceSaving":
+        summary = cls(state["capacity"])
+        summary.n = state["n"]
+        summary.floor = state["floor"]
+        index = pd.Index(state["valores"], dtype=object)
+        summary.counts = pd.Series(arrays[prefix], index=index, dtype="int64")
+        return summary
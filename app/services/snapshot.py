@@ -0,0 +1,334 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from minio.error import S3Error
+from pandas.api import types as ptypes
+
+from app.core.config import settings
+
+
+MANIFEST = "manifest.json"
+STATE = "estado.npz"  # Estado mergeable del análisis por bloques (StreamingAnalyzer.dumps)
+VERSION = 1
+
+# Codificaciones por columna
+PLAIN = "plano"  # numéricos, booleanos y fechas: un .npy con los valores
+DICTIONARY = "diccionario"  # category: códigos enteros + categorías en utf8
+UTF8 = "utf8"  # texto: bytes concatenados + offsets + máscara de válidos (como Arrow)
+
+# Desalojo del cache local: no se borran fotos usadas hace menos que esto (puede haber una lectura
+# en curso), y los staging más viejos que esto son restos de un proceso que se cayó
+EVICTION_GRACE_SECONDS = 60
+STAGING_MAX_AGE_SECONDS = 6 * 3600
+
+
+class DatasetSnapshot:
+    """
+    Foto binaria y columnar de un DataFrame ya tipado: un .npy por arreglo de cada columna
+    más un manifest.json con el esquema. Los .npy no usan pickle, así que se abren con
+    np.load(mmap_mode="r") y los numéricos se leen sin copiar.
+    """
+
+    @staticmethod
+    def write(df: pd.DataFrame, directory: str, filename: str, lectura_s: float = None) -> dict:
+        """
+        Escribe la foto en directory y devuelve el manifest (lectura_s: lo que tardó el
+        parseo)
+        """
+        t0 = time.perf_counter()
+        columns = []
+        for i, (name, series) in enumerate(df.items()):
+            encoding, arrays = DatasetSnapshot._encode(series)
+            files = {}
+            size = 0
+            for part, array in arrays.items():
+                files[part] = f"{i}.{part}.npy"
+                path = os.path.join(directory, files[part])
+                np.save(path, array, allow_pickle=False)
+                size += os.path.getsize(path)
+            columns.append({
+                "nombre": name,
+                "dtype": str(series.dtype),
+                "codificacion": encoding,
+                "archivos": files,
+                "bytes": size
+            })
+
+        manifest = {
+            "version": VERSION,
+            "nombre_archivo": filename,
+            "filas": len(df),
+            "columnas": columns,
+            "bytes": sum(column["bytes"] for column in columns),
+            "lectura_s": None if lectura_s is None else round(lectura_s, 4),
+            "escritura_s": round(time.perf_counter() - t0, 4)
+        }
+        with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        return manifest
+
+    @staticmethod
+    def read(directory: str, manifest: dict, columns: list = None) -> pd.DataFrame:
+        """DataFrame con las columnas pedidas (todas si columns es None), abiertas con mmap"""
+        wanted = None if columns is None else set(columns)
+        data = {}
+        for column in manifest["columnas"]:
+            if wanted is not None and column["nombre"] not in wanted:
+                continue
+            arrays = {part: np.load(os.path.join(directory, name), mmap_mode="r",
+                                    allow_pickle=False)
+                      for part, name in column["archivos"].items()}
+            data[column["nombre"]] = DatasetSnapshot._decode(column, arrays)
+        if not data:
+            return pd.DataFrame(index=range(manifest["filas"]))
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def _encode(series: pd.Series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = pd.Series(series.cat.categories, dtype=object)
+            data, offsets, valid = DatasetSnapshot._utf8(categories)
+            codes = series.cat.codes.to_numpy()
+            return DICTIONARY, {"codigos": codes, "datos": data, "offsets": offsets}
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM":
+            return PLAIN, {"valores": series.to_numpy()}
+        if ptypes.is_numeric_dtype(series.dtype) and not ptypes.is_bool_dtype(series.dtype):
+            # Enteros con nulos de pandas (Int64 y similares): float64 con NaN, se restauran al leer
+            return PLAIN, {"valores": series.to_numpy(dtype=np.float64, na_value=np.nan)}
+        data, offsets, valid = DatasetSnapshot._utf8(series)
+        return UTF8, {"datos": data, "offsets": offsets, "validos": valid}
+
+    @staticmethod
+    def _utf8(series: pd.Series):
+        valid = series.notna().to_numpy()
+        encoded = [str(value).encode("utf-8") if ok else b""
+                   for value, ok in zip(series.tolist(), valid)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return data, offsets, valid
+
+    @staticmethod
+    def _strings(data: np.ndarray, offsets: np.ndarray, valid: np.ndarray = None) -> np.ndarray:
+        buffer = data.tobytes()
+        bounds = offsets.tolist()
+        values = np.empty(len(bounds) - 1, dtype=object)
+        for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            values[i] = buffer[start:end].decode("utf-8")
+        if valid is not None:
+            values[~np.asarray(valid)] = None
+        return values
+
+    @staticmethod
+    def _decode(column: dict, arrays: dict) -> pd.Series:
+        if column["codificacion"] == PLAIN:
+            # Vista ndarray sobre el memmap: sin copia, pero con el tipo que esperan pandas y numpy
+            values = pd.Series(arrays["valores"].view(np.ndarray), name=column["nombre"],
+                               copy=False)
+            if str(values.dtype) == column["dtype"]:
+                return values
+            return values.astype(column["dtype"])
+        if column["codificacion"] == DICTIONARY:
+            categories = DatasetSnapshot._strings(arrays["datos"], arrays["offsets"])
+            values = pd.Categorical.from_codes(arrays["codigos"].view(np.ndarray),
+                                               categories=categories, validate=False)
+            return pd.Series(values, name=column["nombre"], copy=False)
+        values = DatasetSnapshot._strings(arrays["datos"], arrays["offsets"], arrays["validos"])
+        return pd.Series(values, name=column["nombre"], dtype=object)
+
+
+class SnapshotStore:
+    """
+    Fotos por file_id: se publican en MinIO (snapshots/{file_id}/...) y se leen desde un
+    directorio local (SNAPSHOT_CACHE_DIR) que baja de MinIO solo los archivos de las columnas
+    pedidas. El directorio local es un LRU acotado por SNAPSHOT_CACHE_MAX_MB (el uso se marca en
+    el mtime de cada foto); en MinIO las vence la regla de lifecycle de StorageService
+    (SNAPSHOT_RETENTION_DAYS).
+    """
+
+    def __init__(self, storage, cache_dir: str = None):
+        self.storage = storage
+        self.cache_dir = cache_dir or settings.SNAPSHOT_CACHE_DIR or os.path.join(
+            tempfile.gettempdir(), "data-analysis-snapshots"
+        )
+
+    def staging(self):
+        """
+        Directorio donde el análisis escribe la foto antes de tener file_id (None si están
+        desactivadas)
+        """
+        if not settings.SNAPSHOT_ENABLED:
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+
+    def publish_result(self, file_id: str, staging: str, result: dict):
+        """
+        Publica la foto que dejó el análisis en staging (la saca de result) y devuelve su resumen.
+        Sin foto, o si falla la subida, devuelve None: el análisis ya está hecho y no se pierde.
+        """
+        manifest = result.pop("snapshot", None)
+        if staging is None or manifest is None:
+            self.discard(staging)
+            return None
+        try:
+            return self.publish(file_id, staging, manifest)
+        except Exception as e:
+            self.discard(staging)
+            print(f"Error guardando el snapshot de {file_id}: {e}")
+            return None
+
+    def publish(self, file_id: str, staging: str, manifest: dict) -> dict:
+        """Sube la foto a MinIO (el manifest al final) y la deja en el cache local como {file_id}"""
+        names = [name for column in manifest["columnas"] for name in column["archivos"].values()]
+        self.storage.save_snapshot(file_id, staging, names + [MANIFEST])
+        directory = os.path.join(self.cache_dir, file_id)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+        os.utime(directory)  # Marca de uso para el LRU
+        self.evict(keep=file_id)
+        return self.summary(manifest)
+
+    def save_state(self, file_id: str, state: bytes) -> bool:
+        """
+        Guarda junto a la foto el estado mergeable del upload, para el primer anexo: pesa megabytes
+        en archivos anchos y la mayoría nunca se anexa, así que no ocupa Redis. Si falla la
+        subida el análisis sigue valiendo; solo no se van a poder anexar filas.
+        """
+        try:
+            self.storage.save_snapshot_bytes(file_id, STATE, state)
+            return True
+        except Exception as e:
+            print(f"Error guardando el estado de {file_id}: {e}")
+            return False
+
+    def load_state(self, file_id: str):
+        """Estado guardado con save_state, o None"""
+        buffer = io.BytesIO()
+        try:
+            self.storage.download_file(self.storage.snapshot_object(file_id, STATE), buffer)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return None
+            raise
+        return buffer.getvalue()
+
+    @staticmethod
+    def discard(staging: str):
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def summary(manifest: dict) -> dict:
+        return {
+            "columnas": len(manifest["columnas"]),
+            "bytes": manifest["bytes"],
+            "lectura_s": manifest["lectura_s"],
+            "escritura_s": manifest["escritura_s"]
+        }
+
+    def manifest(self, file_id: str):
+        """Manifest de la foto, o None si el file_id no tiene"""
+        path = self._fetch(file_id, MANIFEST)
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self, file_id: str, columns: list = None, manifest: dict = None) -> pd.DataFrame:
+        """Columnas pedidas del file_id; lanza KeyError si alguna no está en la foto"""
+        directory, manifest = self.fetch(file_id, columns, manifest)
+        return DatasetSnapshot.read(directory, manifest, columns)
+
+    def fetch(self, file_id: str, columns: list = None, manifest: dict = None) -> tuple:
+        """
+        Deja en el cache local los archivos de las columnas pedidas (todas por defecto) y devuelve
+        (directorio, manifest), lo que necesita DatasetSnapshot.read en este u otro proceso.
+        """
+        manifest = manifest or self.manifest(file_id)
+        if manifest is None:
+            raise FileNotFoundError(f"No hay snapshot para {file_id}")
+        by_name = {column["nombre"]: column for column in manifest["columnas"]}
+        missing = [name for name in columns or [] if name not in by_name]
+        if missing:
+            raise KeyError(f"Columnas que no están en el snapshot: {', '.join(map(str, missing))}")
+        directory = os.path.join(self.cache_dir, file_id)
+        parts = [part for name in (by_name if columns is None else columns)
+                 for part in by_name[name]["archivos"].values()]
+        downloads = [part for part in parts if not os.path.exists(os.path.join(directory, part))]
+        for part in downloads:
+            self._fetch(file_id, part)
+        os.makedirs(directory, exist_ok=True)
+        os.utime(directory)  # Marca de uso para el LRU
+        if downloads:
+            self.evict(keep=file_id)
+        return directory, manifest
+
+    def evict(self, keep: str = None) -> list:
+        """
+        Borra del cache local las fotos usadas hace más tiempo hasta quedar debajo de
+        SNAPSHOT_CACHE_MAX_MB, salvo keep y las usadas en los últimos EVICTION_GRACE_SECONDS.
+        Siguen en MinIO: se vuelven a bajar si se piden. Devuelve los file_id borrados.
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            listing = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return []
+        for entry in listing:
+            try:
+                if not entry.is_dir():
+                    continue
+                used = entry.stat().st_mtime
+                if entry.name.startswith(".staging-"):
+                    if now - used > STAGING_MAX_AGE_SECONDS:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            except FileNotFoundError:
+                continue  # Otro proceso la borró mientras tanto
+            entries.append((used, entry.name, entry.path, size))
+            total += size
+
+        evicted = []
+        limit = settings.SNAPSHOT_CACHE_MAX_MB * 1024 * 1024
+        for used, name, path, size in sorted(entries):
+            if total <= limit:
+                break
+            if name == keep or now - used < EVICTION_GRACE_SECONDS:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted.append(name)
+        return evicted
+
+    def _fetch(self, file_id: str, name: str):
+        """Ruta local del archivo, bajándolo de MinIO si falta; None si tampoco está allí"""
+        directory = os.path.join(self.cache_dir, file_id)
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+        os.makedirs(directory, exist_ok=True)
+        fd, partial = tempfile.mkstemp(prefix=f".{name}.", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self.storage.download_file(self.storage.snapshot_object(file_id, name), f)
+        except S3Error as e:
+            os.unlink(partial)
+            if e.code == "NoSuchKey":
+                return None
+            raise
+        except Exception:
+            os.unlink(partial)
+            raise
+        # Otro proceso pudo bajarlo al mismo tiempo: replace deja uno u otro, completos
+        os.replace(partial, path)
+        return path
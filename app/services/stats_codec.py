@@ -0,0 +1,157 @@
+import functools
+import importlib.util
+import json
+import struct
+import zlib
+
+from app.core.config import settings
+
+
+class StatsCodecError(ValueError):
+    """Entrada de stats con una versión o un formato que este código no sabe leer"""
+
+
+# Cabecera: magic, versión, serializador, compresión y largo del payload sin comprimir.
+# Empieza con un byte NUL, así que nunca se confunde con el JSON de las entradas anteriores.
+MAGIC = b"\x00st"
+VERSION = 1
+HEADER = struct.Struct(">3sBccI")
+
+JSON = b"j"
+MSGPACK = b"m"
+NONE = b"-"
+ZLIB_DICT = b"d"
+ZSTD_DICT = b"D"
+
+# Diccionario prefijado de la compresión: fragmentos del JSON que se repiten en cada columna.
+# Con él también se comprimen los campos chicos (una columna del hash ocupa unos cientos de bytes).
+# Es parte del formato: si cambia, necesita otros códigos de compresión para leer lo ya guardado.
+DICTIONARY = (
+    '"formato_fecha":"%Y-%m-%d","tipo_datos":"Fecha/Texto","tipo_datos":"Booleano",'
+    '"tipo_datos":"Texto",'
+    '"estadisticas":{"valor_mas_comun":"","frecuencia":1,"valores_unicos":,'
+    '"top_3_valores":[": 1 veces",'
+    '": 2 veces"],"error_frecuencia":0},"interpretacion":["Valor más frecuente:  (aparece  veces)",'
+    '"Valores únicos: "]}'
+    '{"count":,"unique":null,"top":null,"freq":null,"mean":null,"std":null,"min":null,"25%":null,'
+    '"50%":null,"75%":null,"max":null}{"count":,"unique":null,"top":null,"freq":null,'
+    '"mean":,"std":,'
+    '"min":,"25%":,"50%":,"75%":,"max":}'
+    '{"nombre_columna":"","tipo_datos":"Numérico","valores_totales":,"valores_vacios":0,'
+    '"valores_unicos":,'
+    '"exacto":true,"estadisticas":{"promedio":,"minimo":,"maximo":,"mediana":,'
+    '"desviacion_estandar":,'
+    '"percentiles":{"p1":,"p5":,"p25":,"p75":,"p95":,"p99":},"error_cuantiles":0.0},'
+    '"interpretacion":["Valor promedio: ","Rango:  a ","Valor central (mediana): "]}'
+).encode("utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def _installed(module: str) -> bool:
+    # Se consulta en cada encode (un campo por columna): find_spec recorre sys.path
+    return importlib.util.find_spec(module) is not None
+
+
+class StatsCodec:
+    """
+    Formato binario versionado de las stats en Redis: cabecera fija + payload serializado
+    (msgpack si está instalado, si no JSON compacto en utf-8), comprimido con zstd o zlib
+    cuando supera STATS_COMPRESSION_MIN_BYTES. decode también lee las entradas en JSON plano.
+    """
+
+    @staticmethod
+    def serializer() -> bytes:
+        name = settings.STATS_SERIALIZER
+        if name == "auto":
+            return MSGPACK if _installed("msgpack") else JSON
+        if name == "msgpack" and not _installed("msgpack"):
+            raise StatsCodecError("STATS_SERIALIZER=msgpack requiere el paquete msgpack")
+        if name not in ("json", "msgpack"):
+            raise StatsCodecError(f"Serializador de stats desconocido: {name}")
+        return MSGPACK if name == "msgpack" else JSON
+
+    @staticmethod
+    def compression() -> bytes:
+        name = settings.STATS_COMPRESSION
+        if name == "auto":
+            return ZSTD_DICT if _installed("zstandard") else ZLIB_DICT
+        if name == "zstd" and not _installed("zstandard"):
+            raise StatsCodecError("STATS_COMPRESSION=zstd requiere el paquete zstandard")
+        if name not in ("zstd", "zlib", "none"):
+            raise StatsCodecError(f"Compresión de stats desconocida: {name}")
+        return {"zstd": ZSTD_DICT, "zlib": ZLIB_DICT, "none": NONE}[name]
+
+    @staticmethod
+    def encode(stats: dict) -> bytes:
+        """stats ya con tipos nativos de Python (CacheService._convert_numpy_types)"""
+        serializer = StatsCodec.serializer()
+        if serializer == MSGPACK:
+            import msgpack
+            payload = msgpack.packb(stats, use_bin_type=True)
+        else:
+            payload = json.dumps(stats, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+        compressible = len(payload) >= settings.STATS_COMPRESSION_MIN_BYTES
+        compression = StatsCodec.compression() if compressible else NONE
+        body = StatsCodec._compress(payload, compression)
+        return HEADER.pack(MAGIC, VERSION, serializer, compression, len(payload)) + body
+
+    @staticmethod
+    def decode(value):
+        """Stats guardadas con encode, o con el json.dumps de antes (str o bytes)"""
+        if isinstance(value, str) or not value.startswith(MAGIC):
+            return json.loads(value)
+        _, _, serializer, compression, size = StatsCodec._header(value)
+        payload = StatsCodec._decompress(value[HEADER.size:], compression, size)
+        if serializer == MSGPACK:
+            import msgpack
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if serializer == JSON:
+            return json.loads(payload)
+        raise StatsCodecError(f"Serializador de stats desconocido: {serializer!r}")
+
+    @staticmethod
+    def payload_size(value) -> int:
+        """Bytes del payload sin comprimir: lo que se cuenta para el cache L1"""
+        if isinstance(value, str) or not value.startswith(MAGIC):
+            return len(value)
+        return StatsCodec._header(value)[4]
+
+    @staticmethod
+    def _header(value: bytes) -> tuple:
+        if len(value) < HEADER.size:
+            raise StatsCodecError("Entrada de stats truncada")
+        header = HEADER.unpack_from(value)
+        if header[1] != VERSION:
+            raise StatsCodecError(f"Versión de stats no soportada: {header[1]}")
+        return header
+
+    @staticmethod
+    def _zstd_dictionary():
+        import zstandard
+        return zstandard.ZstdCompressionDict(DICTIONARY, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+    @staticmethod
+    def _compress(payload: bytes, compression: bytes) -> bytes:
+        if compression == ZSTD_DICT:
+            import zstandard
+            compressor = zstandard.ZstdCompressor(level=settings.STATS_COMPRESSION_LEVEL,
+                                                  dict_data=StatsCodec._zstd_dictionary())
+            return compressor.compress(payload)
+        if compression == ZLIB_DICT:
+            compressor = zlib.compressobj(settings.STATS_COMPRESSION_LEVEL, zdict=DICTIONARY)
+            return compressor.compress(payload) + compressor.flush()
+        return payload
+
+    @staticmethod
+    def _decompress(body: bytes, compression: bytes, size: int) -> bytes:
+        if compression == ZSTD_DICT:
+            import zstandard
+            decompressor = zstandard.ZstdDecompressor(dict_data=StatsCodec._zstd_dictionary())
+            return decompressor.decompress(body, max_output_size=size)
+        if compression == ZLIB_DICT:
+            decompressor = zlib.decompressobj(zdict=DICTIONARY)
+            return decompressor.decompress(body) + decompressor.flush()
+        if compression == NONE:
+            return body
+        raise StatsCodecError(f"Compresión de stats desconocida: {compression!r}")
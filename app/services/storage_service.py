@@ -1,7 +1,14 @@
 from minio import Minio
+from minio.commonconfig import ENABLED, Filter
 from minio.error import S3Error
+from minio.lifecycleconfig import Expiration, LifecycleConfig, Rule
 from app.core.config import settings
 from io import BytesIO
+import os
+import shutil
+
+SNAPSHOT_LIFECYCLE_RULE = "vencer-snapshots"
+
 
 class StorageService:
     def __init__(self):
@@ -15,17 +22,88 @@ class StorageService:
         found = self.client.bucket_exists(settings.MINIO_BUCKET)
         if not found:
             self.client.make_bucket(settings.MINIO_BUCKET)
+        # La regla de vencimiento de snapshots/ se configura con la primera foto que se sube
+        self._snapshot_lifecycle = settings.SNAPSHOT_RETENTION_DAYS <= 0
 
-    def save_file(self, filename: str, file_bytes: bytes, content_type: str = "application/octet-stream"):
+    def save_file(self, filename: str, file_bytes, content_type: str = "application/octet-stream",
+                  object_name: str = None):
+        """
+        Guarda bytes o un archivo binario abierto (p. ej. el spool del upload) sin copiarlo entero.
+        Si el stream no es seekable se sube como multipart de largo desconocido.
+        object_name permite guardar bajo otra clave que el nombre del archivo.
+        """
+        part_size = 0
+        if isinstance(file_bytes, (bytes, bytearray)):
+            data, length = BytesIO(file_bytes), len(file_bytes)
+        elif file_bytes.seekable():
+            data = file_bytes
+            start = data.tell()
+            length = data.seek(0, 2) - start
+            data.seek(start)
+        else:
+            data, length = file_bytes, -1
+            part_size = max(settings.MINIO_PART_SIZE_MB, 5) * 1024 * 1024
         try:
             self.client.put_object(
                 bucket_name=settings.MINIO_BUCKET,
-                object_name=filename,
-                data=BytesIO(file_bytes),
-                length=len(file_bytes),
-                content_type=content_type
+                object_name=object_name or filename,
+                data=data,
+                length=length,
+                content_type=content_type,
+                part_size=part_size
             )
             return True
         except S3Error as e:
             print(f"Error subiendo archivo a MinIO: {e}")
             return False
+
+    def download_file(self, object_name: str, destination):
+        """Copia un objeto del bucket a un archivo binario abierto, por bloques"""
+        response = self.client.get_object(settings.MINIO_BUCKET, object_name)
+        try:
+            shutil.copyfileobj(response, destination, 1024 * 1024)
+        finally:
+            response.close()
+            response.release_conn()
+
+    @staticmethod
+    def snapshot_object(file_id: str, name: str) -> str:
+        return f"snapshots/{file_id}/{name}"
+
+    def ensure_snapshot_lifecycle(self, days: int):
+        """
+        Regla de lifecycle que vence las fotos columnar (snapshots/) a los days días: las stats
+        vencen en Redis y nadie más las borra. Conserva las otras reglas del bucket.
+        """
+        rule = Rule(ENABLED, rule_filter=Filter(prefix="snapshots/"),
+                    rule_id=SNAPSHOT_LIFECYCLE_RULE, expiration=Expiration(days=days))
+        try:
+            current = self.client.get_bucket_lifecycle(settings.MINIO_BUCKET)
+            rules = [r for r in (current.rules if current else [])
+                     if r.rule_id != SNAPSHOT_LIFECYCLE_RULE]
+            self.client.set_bucket_lifecycle(settings.MINIO_BUCKET, LifecycleConfig(rules + [rule]))
+        except S3Error as e:
+            print(f"No se pudo configurar el vencimiento de los snapshots en MinIO: {e}")
+
+    def _snapshot_lifecycle_once(self):
+        if not self._snapshot_lifecycle:
+            self.ensure_snapshot_lifecycle(settings.SNAPSHOT_RETENTION_DAYS)
+            self._snapshot_lifecycle = True
+
+    def save_snapshot_bytes(self, file_id: str, name: str, data: bytes):
+        """Un objeto más bajo snapshots/{file_id}/, con el mismo vencimiento que la foto"""
+        self._snapshot_lifecycle_once()
+        self.client.put_object(settings.MINIO_BUCKET, self.snapshot_object(file_id, name),
+                               BytesIO(data), len(data), content_type="application/octet-stream")
+
+    def save_snapshot(self, file_id: str, directory: str, names: list):
+        """Sube los archivos de una foto columnar en el orden dado (el manifest va último)"""
+        self._snapshot_lifecycle_once()
+        for name in names:
+            self.client.fput_object(
+                settings.MINIO_BUCKET,
+                self.snapshot_object(file_id, name),
+                os.path.join(directory, name),
+                content_type=("application/json" if name.endswith(".json")
+                              else "application/octet-stream")
+            )
@@ -0,0 +1,152 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+from pandas.tseries.api import guess_datetime_format
+
+from app.core.config import settings
+from app.services.sketches import ReservoirSample
+
+
+NUMERIC = "numeric"
+BOOLEAN = "boolean"
+DATE = "date"
+CATEGORICAL = "categorical"
+TEXT = "text"
+
+LABELS = {
+    NUMERIC: "Numérico",
+    BOOLEAN: "Booleano",
+    DATE: "Fecha/Texto",
+    CATEGORICAL: "Categórico",
+    TEXT: "Texto"
+}
+
+BOOLEAN_STRINGS = {
+    "true", "false", "verdadero", "falso", "si", "sí", "no", "yes", "y", "n", "t", "f"
+}
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d",
+                "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d/%m/%Y %H:%M"]
+# Moneda y espacios alrededor; separador de miles "," solo en grupos de tres dígitos
+CURRENCY_PATTERN = r"[\s$€£¥]"
+NUMBER_PATTERN = r"[-+]?(\d{1,3}(,\d{3})+|\d+)(\.\d+)?"
+
+
+class ColumnType:
+    """Tipo inferido de una columna: decide cómo se convierte y qué análisis recibe"""
+
+    def __init__(self, kind: str, date_format: str = None, numeric_text: bool = False):
+        self.kind = kind
+        self.label = LABELS[kind]
+        self.date_format = date_format
+        self.numeric_text = numeric_text  # números guardados como texto ("$1,234")
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.kind == NUMERIC
+
+    def convert(self, series: pd.Series) -> pd.Series:
+        """Lleva la columna al dtype con el que se analiza (solo cambia las numéricas)"""
+        already_numeric = (
+            ptypes.is_numeric_dtype(series.dtype) and not ptypes.is_bool_dtype(series.dtype)
+        )
+        if not self.is_numeric or already_numeric:
+            return series
+        if self.numeric_text or series.dtype == object:
+            series = series.astype("string").str.replace(CURRENCY_PATTERN, "", regex=True)
+            series = series.str.replace(",", "")
+        return pd.to_numeric(series, errors="coerce").astype(np.float64)
+
+    def __repr__(self):
+        return f"ColumnType({self.kind!r}, date_format={self.date_format!r})"
+
+
+class TypeInference:
+    """
+    Clasifica columnas mirando una vez una muestra reservoir de sus valores no nulos,
+    con chequeos vectorizados: numérico, booleano, fecha (con formato), categórico o texto.
+    """
+
+    @staticmethod
+    def sample(series: pd.Series) -> pd.Series:
+        clean = series.dropna()
+        reservoir = ReservoirSample(settings.TYPE_INFERENCE_SAMPLE_ROWS)
+        reservoir.update(clean.to_numpy())
+        return pd.Series(reservoir.values, dtype=clean.dtype)
+
+    @staticmethod
+    def infer(series: pd.Series) -> ColumnType:
+        dtype = series.dtype
+        if ptypes.is_bool_dtype(dtype):
+            return ColumnType(BOOLEAN)
+        if ptypes.is_numeric_dtype(dtype):
+            return ColumnType(NUMERIC)
+        if ptypes.is_datetime64_any_dtype(dtype):
+            return ColumnType(DATE)
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Ya viene codificada (carga compacta); con muchos distintos se informa como texto
+            categories = pd.Series(dtype.categories)
+            labels = categories.astype(str).str.strip().str.lower()
+            if 0 < len(categories) <= 2 and labels.isin(BOOLEAN_STRINGS).all():
+                return ColumnType(BOOLEAN)
+            many = len(categories) > settings.TYPE_CATEGORICAL_MAX_DISTINCT
+            return ColumnType(TEXT if many else CATEGORICAL)
+
+        sample = TypeInference.sample(series)
+        if not len(sample):
+            return ColumnType(TEXT)
+
+        inferred = ptypes.infer_dtype(sample, skipna=True)
+        if inferred == "boolean":
+            return ColumnType(BOOLEAN)
+        if inferred in ("integer", "floating", "mixed-integer-float", "decimal"):
+            return ColumnType(NUMERIC)
+        if inferred in ("datetime", "datetime64", "date"):
+            return ColumnType(DATE)
+        if inferred == "string":
+            return TypeInference._infer_strings(sample.astype("string"))
+        return ColumnType(TEXT)
+
+    @staticmethod
+    def _infer_strings(sample: pd.Series) -> ColumnType:
+        stripped = sample.str.strip()
+        if stripped.str.lower().isin(BOOLEAN_STRINGS).all() and stripped.str.lower().nunique() <= 2:
+            return ColumnType(BOOLEAN)
+
+        numbers = stripped.str.replace(CURRENCY_PATTERN, "", regex=True)
+        if numbers.str.fullmatch(NUMBER_PATTERN).all():
+            return ColumnType(NUMERIC, numeric_text=True)
+
+        date_format = TypeInference._date_format(stripped)
+        if date_format:
+            return ColumnType(DATE, date_format=date_format)
+
+        distinct = stripped.nunique()
+        if (distinct <= settings.TYPE_CATEGORICAL_MAX_DISTINCT
+                and distinct <= settings.TYPE_CATEGORICAL_MAX_RATIO * len(stripped)):
+            return ColumnType(CATEGORICAL)
+        return ColumnType(TEXT)
+
+    @staticmethod
+    def _date_format(sample: pd.Series):
+        """Formato strftime que parsea toda la muestra, o None si no es una columna de fechas"""
+        if not sample.str.contains(r"\d", regex=True).all():
+            return None
+        with warnings.catch_warnings():
+            # aviso de dayfirst: el formato se valida abajo
+            warnings.simplefilter("ignore", UserWarning)
+            guessed = guess_datetime_format(sample.iloc[0])
+        candidates = ([guessed] if guessed else []) + DATE_FORMATS
+        for fmt in candidates:
+            parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+            if parsed.notna().all():
+                return fmt
+        return None
+
+    @staticmethod
+    def numeric_values(series: pd.Series) -> np.ndarray:
+        """Valores de una columna numérica sin nulos: int64 si es entera, float64 si no"""
+        if ptypes.is_integer_dtype(series.dtype):
+            return series.to_numpy(dtype=np.int64)
+        return series.to_numpy(dtype=np.float64)
@@ -0,0 +1,333 @@
+import asyncio
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+
+import multipart
+from multipart.multipart import parse_options_header
+from fastapi import Request
+
+from app.core.config import settings
+
+
+class UploadTooLargeError(Exception):
+    """El archivo supera MAX_FILE_SIZE_MB"""
+
+
+class InvalidUploadError(Exception):
+    """La petición no trae un archivo multipart válido"""
+
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+class UploadSpool:
+    """
+    Archivo recibido: en memoria bajo el umbral y en un archivo temporal con nombre por encima.
+    Tener una ruta en disco permite pasarlo a otro proceso sin copiar los bytes.
+    """
+
+    def __init__(self, filename: str, content_type: str, max_memory_bytes: int = None):
+        if max_memory_bytes is None:
+            max_memory_bytes = settings.UPLOAD_SPOOL_MAX_MEMORY_MB * 1024 * 1024
+        self.filename = filename
+        self.content_type = content_type
+        self.max_memory_bytes = max_memory_bytes
+        self.size = 0
+        self.path = None
+        self.file = io.BytesIO()
+
+    def _rollover(self):
+        data = self.file.getbuffer()
+        tmp = tempfile.NamedTemporaryFile(
+            prefix="upload_", suffix=os.path.splitext(self.filename)[1],
+            dir=settings.UPLOAD_SPOOL_DIR, delete=False
+        )
+        tmp.write(data)
+        data.release()
+        self.file.close()
+        self.file = tmp
+        self.path = tmp.name
+
+    def write(self, chunk: bytes):
+        if self.path is None and self.size + len(chunk) > self.max_memory_bytes:
+            self._rollover()
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def rewind(self):
+        """Deja el spool al inicio para que la siguiente etapa lo lea completo"""
+        self.file.seek(0)
+        return self.file
+
+    def ensure_on_disk(self) -> str:
+        """Devuelve la ruta del spool en disco (lo vuelca si todavía estaba en memoria)"""
+        if self.path is None:
+            self.file.seek(0, 2)
+            self._rollover()
+        self.file.flush()
+        return self.path
+
+    def close(self):
+        self.file.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class StageError(Exception):
+    """Error de una etapa del pipeline (almacenamiento o procesamiento)"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class ChunkPipe(io.RawIOBase):
+    """
+    Tubo acotado de bloques entre el event loop (productor) y un hilo consumidor.
+    Se lee como un archivo binario no seekable, así que sirve tanto para put_object como para
+    pandas.
+    """
+
+    _EOF = object()
+
+    def __init__(self, max_chunks: int = None):
+        super().__init__()
+        self._queue = queue.Queue(maxsize=max_chunks or settings.UPLOAD_PIPELINE_QUEUE_CHUNKS)
+        self._current = memoryview(b"")
+        self._eof = False
+        self._reader_closed = threading.Event()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not len(self._current) and not self._eof:
+            item = self._queue.get()
+            if item is self._EOF:
+                self._eof = True
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                self._current = memoryview(item)
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+    def put(self, item, timeout: float = None) -> bool:
+        """Encola un bloque; False si la cola está llena. Se descarta si el lector ya terminó"""
+        if self._reader_closed.is_set():
+            return True
+        try:
+            self._queue.put(item, timeout=timeout) if timeout else self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def put_blocking(self, item):
+        """Encola esperando espacio, sin quedar colgado si el lector abandona"""
+        while not self.put(item, timeout=0.1):
+            pass
+
+    def close_reader(self):
+        """Lo llama el consumidor al terminar: los bloques siguientes se descartan"""
+        self._reader_closed.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class UploadStream:
+    """
+    Lee el cuerpo multipart de la petición por bloques, a medida que llega,
+    y entrega solo los bytes del campo de archivo.
+    """
+
+    def __init__(self, request: Request, field_name: str = "file", max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+        self.field_name = field_name
+        self.max_bytes = max_bytes
+        self.filename = None
+        self.content_type = None
+        self.size = 0
+
+        self._request = request
+        self._body = request.stream()
+        self._parser = None
+        self._pending = deque()
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._in_file = False
+        self._file_done = False
+        self._body_done = False
+
+    # Callbacks del parser de python-multipart
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        is_file = (
+            b"filename" in options
+            and _decode(options.get(b"name", b"")) == self.field_name
+            and self.filename is None
+        )
+        self._in_file = is_file
+        if is_file:
+            self.filename = _decode(options[b"filename"])
+            self.content_type = _decode(
+                self._headers.get(b"content-type", b"application/octet-stream")
+            )
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+    async def _feed(self) -> bool:
+        """Pasa el siguiente bloque del cuerpo al parser; False si ya no hay más"""
+        if self._body_done:
+            return False
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            chunk = b""
+        if not chunk:
+            self._body_done = True
+            self._parser.finalize()
+            return False
+        self._parser.write(chunk)
+        return True
+
+    async def start(self):
+        """Lee hasta conocer el nombre del archivo, sin consumir todavía su contenido"""
+        content_type = self._request.headers.get("content-type", "")
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not content_type.startswith("multipart/form-data") or not boundary:
+            raise InvalidUploadError("Se esperaba un formulario multipart con el campo 'file'")
+
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+        while self.filename is None:
+            if not await self._feed():
+                raise InvalidUploadError("No se recibió ningún archivo en el campo 'file'")
+        return self
+
+    async def chunks(self):
+        """Genera los bloques del archivo aplicando el límite de tamaño mientras llegan"""
+        while True:
+            while self._pending:
+                chunk = self._pending.popleft()
+                self.size += len(chunk)
+                if self.size > self.max_bytes:
+                    raise UploadTooLargeError(
+                        "El archivo supera el tamaño máximo permitido "
+                        f"({settings.MAX_FILE_SIZE_MB} MB)"
+                    )
+                yield chunk
+            if self._file_done or not await self._feed():
+                return
+
+
+class UploadService:
+    @staticmethod
+    async def spool_upload(stream: UploadStream) -> UploadSpool:
+        """Consume el upload por bloques en un único spool que comparten storage y parser"""
+        spool = UploadSpool(stream.filename, stream.content_type)
+        try:
+            async for chunk in stream.chunks():
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        spool.rewind()
+        return spool
+
+    @staticmethod
+    async def tee_upload(stream: UploadStream, stages: dict):
+        """
+        Reparte cada bloque del upload entre varias etapas que corren a la vez en hilos
+        (p. ej. MinIO y el parser), sin construir nunca el archivo completo en memoria.
+        Devuelve los resultados por etapa y los tiempos de cada una.
+        """
+        loop = asyncio.get_running_loop()
+        pipes = {name: ChunkPipe() for name in stages}
+        t0 = time.perf_counter()
+        tiempos = {}
+
+        def run_stage(name, stage):
+            start = time.perf_counter()
+            try:
+                return stage(pipes[name])
+            except Exception as e:
+                raise StageError(name, e) from e
+            finally:
+                pipes[name].close_reader()
+                tiempos[f"{name}_s"] = round(time.perf_counter() - start, 4)
+
+        futures = [
+            loop.run_in_executor(None, run_stage, name, stage)
+            for name, stage in stages.items()
+        ]
+
+        async def push(item):
+            for pipe in pipes.values():
+                if not pipe.put(item):
+                    await asyncio.to_thread(pipe.put_blocking, item)
+
+        try:
+            async for chunk in stream.chunks():
+                await push(chunk)
+        except Exception as e:
+            await push(e)
+            await asyncio.gather(*futures, return_exceptions=True)
+            raise
+        await push(ChunkPipe._EOF)
+        tiempos["recepcion_s"] = round(time.perf_counter() - t0, 4)
+
+        results = await asyncio.gather(*futures)
+        tiempos["total_s"] = round(time.perf_counter() - t0, 4)
+        etapas = sum(v for k, v in tiempos.items() if k[:-2] in stages)
+        tiempos["solapamiento_s"] = round(max(etapas - tiempos["total_s"], 0.0), 4)
+        return dict(zip(stages, results)), tiempos
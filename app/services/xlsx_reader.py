@@ -0,0 +1,89 @@
+from operator import itemgetter
+
+import openpyxl
+import pandas as pd
+
+
+class XlsxReader:
+    """
+    Lectura de .xlsx con openpyxl en modo read_only: las filas se recorren en streaming
+    desde el zip, sin construir el DOM de la hoja, y se entregan en DataFrames por bloques.
+    """
+
+    @staticmethod
+    def _open(source):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+
+    @staticmethod
+    def sheet_names(source) -> list:
+        workbook = XlsxReader._open(source)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def iter_chunks(source, sheet: str, chunksize: int, usecols=None):
+        """
+        DataFrames de hasta chunksize filas de la hoja, con la primera fila como encabezado.
+        Siempre genera al menos uno (vacío si la hoja no tiene datos) para conservar las columnas.
+        usecols es un callable como en pandas: recibe cada nombre y decide si la columna se lee.
+        """
+        workbook = XlsxReader._open(source)
+        try:
+            rows = XlsxReader._rows(workbook[sheet])
+            names = XlsxReader._columns(next(rows, ()))
+            width = len(names)
+            positions = [i for i, name in enumerate(names) if usecols is None or usecols(name)]
+            columns = [names[i] for i in positions]
+            # itemgetter con una sola posición devuelve el valor suelto, no una tupla
+            pick = (
+                itemgetter(*positions) if len(positions) > 1
+                else (lambda row: tuple(row[i] for i in positions))
+            )
+
+            batch = []
+            emitted = False
+            for row in rows:
+                row = tuple(row[:width])
+                batch.append(pick(row + (None,) * (width - len(row))))
+                if len(batch) == chunksize:
+                    yield pd.DataFrame.from_records(batch, columns=columns)
+                    batch = []
+                    emitted = True
+            if batch or not emitted:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _rows(worksheet):
+        """Filas como tuplas de valores, sin las filas vacías del final (formato sin datos)"""
+        empty = []
+        for row in worksheet.iter_rows(values_only=True):
+            if all(value is None for value in row):
+                empty.append(row)
+                continue
+            yield from empty
+            empty = []
+            yield row
+
+    @staticmethod
+    def _columns(header) -> list:
+        """Nombres como los pone pandas: 'Unnamed: i' para celdas vacías y sufijo .n en repetidos"""
+        header = list(header)
+        while header and header[-1] is None:
+            header.pop()
+
+        columns, seen = [], {}
+        for i, value in enumerate(header):
+            name = f"Unnamed: {i}" if value is None else value
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            columns.append(name)
+        return columns
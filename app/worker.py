@@ -0,0 +1,200 @@
+"""
+Worker de análisis: consume trabajos del Redis Stream (JOB_STREAM) como parte del consumer group
+JOB_GROUP, analiza el archivo ya guardado en MinIO y escribe las stats con CacheService
+(asíncrono, en el event loop propio del worker) y el estado para anexar filas en MinIO.
+Se escala horizontalmente levantando más procesos, en esta u otras máquinas:
+
+    python -m app.worker --consumer worker-1
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import redis
+
+from app.core.config import settings
+from app.services.cache_service import CacheService, build_cache_data
+from app.services.column_profiler import ColumnProfiler
+from app.services.column_selection import ColumnSelection
+from app.services.data_processor import DataProcessor
+from app.services.job_queue import JobQueue, QueuedTask
+from app.services.job_service import JobService
+from app.services.snapshot import SnapshotStore
+from app.services.storage_service import StorageService
+
+logger = logging.getLogger("app.worker")
+
+
+class Worker:
+    """Un consumer del grupo: procesa de a un mensaje y hace ack recién con las stats guardadas"""
+
+    def __init__(self, consumer: str = None, job_queue: JobQueue = None,
+                 storage: StorageService = None, cache: CacheService = None, executor=None):
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.queue = job_queue or JobQueue()
+        self.storage = storage or StorageService()
+        self.cache = cache or CacheService()
+        self.jobs = JobService(self.cache)
+        self.snapshots = SnapshotStore(self.storage)
+        self._executor = executor
+        self._stop = threading.Event()
+
+    @property
+    def executor(self):
+        # Para los rangos de CSV grandes; se crea con el primer uso, con "spawn" como el pool
+        # de la API
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.JOB_WORKER_PROCESSES or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def analyze(self, task: dict) -> dict:
+        """
+        Descarga el objeto a un archivo temporal (Excel necesita acceso aleatorio) y lo analiza.
+        Un CSV desde CSV_PARALLEL_MIN_MB se analiza por rangos de bytes en los procesos del worker.
+        Todo en un hilo: MinIO y el análisis son bloqueantes y el event loop atiende el cache.
+        """
+        return await asyncio.to_thread(self._analyze, task)
+
+    def _analyze(self, task: dict) -> dict:
+        suffix = os.path.splitext(task["filename"])[1]
+        columns = ColumnSelection.from_dict(task.get("columns"))
+        staging = self.snapshots.staging()
+        try:
+            with tempfile.NamedTemporaryFile(suffix=suffix) as f:
+                self.storage.download_file(task["object_name"], f)
+                if suffix == ".csv" and f.tell() >= settings.CSV_PARALLEL_MIN_MB * 1024 * 1024:
+                    f.flush()
+                    parts = (
+                        settings.CSV_PARALLEL_RANGES or settings.JOB_WORKER_PROCESSES
+                        or os.cpu_count()
+                    )
+                    result = DataProcessor.process_csv_ranges(
+                        f.name, task["filename"], self.executor, parts, task.get("parser"), columns
+                    )
+                else:
+                    result = DataProcessor.process_file(
+                        f, task["filename"], parser=task.get("parser"), columns=columns,
+                        snapshot_dir=staging
+                    )
+        except Exception:
+            self.snapshots.discard(staging)
+            raise
+        self.snapshots.publish_result(task["file_id"], staging, result)
+        state = result.pop("estado", None)
+        if state is not None:
+            self.snapshots.save_state(task["file_id"], state)
+        return build_cache_data(result)
+
+    async def handle(self, message: QueuedTask) -> bool:
+        """Procesa un mensaje; si falla lo reencola o lo manda a dead-letter. True si salió bien"""
+        try:
+            return await self._handle(message)
+        except redis.RedisError as e:
+            # Sin ack el mensaje queda pendiente: pasado JOB_CLAIM_IDLE_MS se reclama con un intento
+            # más, así que termina reintentado o en dead-letter
+            logger.error("Trabajo %s pendiente por un error de Redis: %s",
+                         message.task.get("file_id"), e)
+            return False
+
+    async def _handle(self, message: QueuedTask) -> bool:
+        task = message.task
+        job = await self.cache.get_job(task["file_id"]) or JobService.new_job(
+            task["file_id"], task["filename"], task.get("size_bytes", 0)
+        )
+        t0 = time.perf_counter()
+
+        if message.attempts >= settings.JOB_MAX_ATTEMPTS:
+            # Reclamado después de que otros workers se cayeran procesándolo
+            error = f"El trabajo superó {settings.JOB_MAX_ATTEMPTS} intentos sin completarse"
+            await asyncio.to_thread(self.queue.dead_letter, message, error)
+            await self.jobs.fail(job, error, t0)
+            logger.error("Trabajo %s a dead-letter: %s", task["file_id"], error)
+            return False
+
+        en_cola = await self.jobs.start(job)
+        try:
+            cache_data = await self.analyze(task)
+        except Exception as e:
+            retrying = await asyncio.to_thread(self.queue.retry, message, str(e))
+            await self.jobs.fail(job, str(e), t0, final=not retrying)
+            logger.warning("Trabajo %s falló (intento %d): %s",
+                           task["file_id"], message.attempts + 1, e)
+            return False
+
+        await self.jobs.finish(job, cache_data, t0, en_cola)
+        await asyncio.to_thread(self.queue.ack, message.message_id)
+        return True
+
+    async def run_once(self, block_ms: int = None) -> int:
+        """Primero los mensajes abandonados por workers caídos, después los nuevos"""
+        # El cliente de la cola es síncrono y XREADGROUP bloquea hasta block_ms: en un hilo
+        messages = await asyncio.to_thread(self._poll, block_ms)
+        for message in messages:
+            await self.handle(message)
+        return len(messages)
+
+    def _poll(self, block_ms: int = None) -> list:
+        return (self.queue.claim_stalled(self.consumer)
+                or self.queue.read(self.consumer, block_ms=block_ms))
+
+    async def run(self):
+        await asyncio.to_thread(self.queue.ensure_group)
+        logger.info("Worker %s escuchando %s (grupo %s)",
+                    self.consumer, self.queue.stream, self.queue.group)
+        while not self._stop.is_set():
+            await self.run_once(block_ms=settings.JOB_BLOCK_MS)
+
+    def stop(self, *_):
+        # Termina el mensaje en curso; lo que no llegó a ack lo reclama otro worker
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker de análisis sobre Redis Streams")
+    parser.add_argument("--consumer",
+                        help="Nombre dentro del consumer group (por defecto host-pid)")
+    parser.add_argument("--once", action="store_true",
+                        help="Procesa lo pendiente una vez y termina")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    worker = Worker(args.consumer)
+    if not args.once:
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+    asyncio.run(_serve(worker, args.once))
+
+
+async def _serve(worker: Worker, once: bool):
+    try:
+        if once:
+            await asyncio.to_thread(worker.queue.ensure_group)
+            while await worker.run_once():
+                pass
+        else:
+            await worker.run()
+    finally:
+        # Como el lifespan de la API: sin apagar los pools, sus procesos no dejan salir al worker
+        worker.shutdown()
+        ColumnProfiler.shutdown()
+        await worker.cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark del análisis de CSV por rangos de bytes: throughput (MB/s) según la cantidad de
+procesos, comparado con la lectura secuencial en streaming.
+
+    python -m benchmarks.csv_ranges --rows 2000000 --workers 1 2 4 8 16
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.data_processor import DataProcessor
+from benchmarks.parsers import build_csv
+
+
+def run(rows: int, workers: list):
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+        f.write(build_csv(rows))
+        path = f.name
+    try:
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"CSV: {rows:,} filas, {size_mb:.1f} MB, {os.cpu_count()} CPUs")
+        print(f"{'procesos':>8} {'tiempo_s':>10} {'MB/s':>8} {'speedup':>8}")
+
+        t0 = time.perf_counter()
+        with open(path, "rb") as source:
+            DataProcessor.process_file(source, "bench.csv", streaming=True)
+        base = time.perf_counter() - t0
+        print(f"{'stream':>8} {base:>10.3f} {size_mb / base:>8.1f} {1.0:>8.2f}")
+
+        for n in workers:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n, mp_context=context) as executor:
+                # Calentar los procesos para no medir el arranque del intérprete
+                list(executor.map(abs, range(n)))
+                t0 = time.perf_counter()
+                DataProcessor.process_csv_ranges(path, "bench.csv", executor, n)
+                elapsed = time.perf_counter() - t0
+            print(f"{n:>8} {elapsed:>10.3f} {size_mb / elapsed:>8.1f} {base / elapsed:>8.2f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    run(args.rows, args.workers)
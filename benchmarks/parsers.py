@@ -0,0 +1,72 @@
+"""
+Benchmark de los parsers de CSV: throughput de lectura (MB/s y filas/s) por backend
+y verificación de que todos producen el mismo análisis.
+
+    python -m benchmarks.parsers --rows 500000 --repeat 3
+"""
+import argparse
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from app.services.data_processor import DataProcessor
+from app.services.parsers import PARSERS
+
+
+def build_csv(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "edad": rng.integers(18, 65, rows),
+        "salario": np.round(rng.normal(50000, 8000, rows), 2),
+        "departamento": rng.choice(["IT", "RRHH", "Ventas", "Marketing"], rows),
+        "remoto": rng.choice(["Sí", "No"], rows),
+        "email": [f"user{i}@empresa.com" for i in range(rows)],
+        "ingreso": pd.Timestamp("2015-01-01")
+        + pd.to_timedelta(rng.integers(0, 3000, rows), unit="D"),
+    })
+    df.loc[::13, "salario"] = np.nan
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def run(rows: int, repeat: int):
+    data = build_csv(rows)
+    size_mb = len(data) / (1024 * 1024)
+    print(f"CSV: {rows:,} filas, {size_mb:.1f} MB")
+    print(f"{'parser':<10} {'lectura_s':>10} {'MB/s':>8} {'filas/s':>12} {'análisis_s':>11}")
+
+    results = {}
+    for name, backend in PARSERS.items():
+        if not backend.available():
+            print(f"{name:<10} {'no instalado':>10}")
+            continue
+
+        read_times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            DataProcessor._read_csv_compact(BytesIO(data), backend)
+            read_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        results[name] = DataProcessor.process_file(data, "bench.csv", streaming=False, parser=name)
+        total = time.perf_counter() - t0
+
+        best = min(read_times)
+        print(
+            f"{name:<10} {best:>10.3f} {size_mb / best:>8.1f} {rows / best:>12,.0f} {total:>11.3f}"
+        )
+
+    reference = results.pop("pandas")
+    for name, result in results.items():
+        same = result["analisis_columnas"] == reference["analisis_columnas"]
+        print(f"{name}: análisis {'idéntico' if same else 'DISTINTO'} al de pandas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
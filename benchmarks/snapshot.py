@@ -0,0 +1,62 @@
+"""
+Benchmark de la foto columnar: tamaño frente al CSV y tiempo de carga (todas las columnas
+y una sola, con mmap) frente al parseo del CSV original.
+
+    python -m benchmarks.snapshot --rows 1000000 --repeat 3
+"""
+import argparse
+import os
+import tempfile
+import time
+from io import BytesIO
+
+from app.services.data_processor import DataProcessor
+from app.services.snapshot import DatasetSnapshot
+from benchmarks.parsers import build_csv
+
+
+def _best(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), value
+
+
+def _touch(df):
+    # La suma recorre todas las páginas de los numéricos: mide la lectura y no solo el mapeo
+    return df.select_dtypes("number").sum()
+
+
+def run(rows: int, repeat: int):
+    data = build_csv(rows)
+    size_mb = len(data) / (1024 * 1024)
+    lectura_s, df = _best(lambda: DataProcessor._read_csv_compact(BytesIO(data)), repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = DatasetSnapshot.write(df, directory, "bench.csv", lectura_s)
+        snapshot_mb = manifest["bytes"] / (1024 * 1024)
+        print(f"CSV: {rows:,} filas, {size_mb:.1f} MB; snapshot {snapshot_mb:.1f} MB "
+              f"({snapshot_mb / size_mb:.2f}x), escritura {manifest['escritura_s']:.3f} s")
+        print(f"{'carga':<22} {'tiempo_s':>10} {'vs CSV':>8}")
+        print(f"{'parseo CSV':<22} {lectura_s:>10.3f} {1.0:>8.2f}")
+
+        cases = [("snapshot completo", None)] + [
+            (f"snapshot '{column['nombre']}'", [column["nombre"]])
+            for column in manifest["columnas"][:3]
+        ]
+        for label, columns in cases:
+            elapsed, _ = _best(
+                lambda: _touch(DatasetSnapshot.read(directory, manifest, columns)), repeat
+            )
+            print(f"{label:<22} {elapsed:>10.3f} {lectura_s / elapsed:>8.1f}")
+        print(f"archivos: {len(os.listdir(directory))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,111 @@
+"""
+Benchmark del formato de las stats en Redis: tiempo de encode/decode y bytes por entrada
+del JSON de antes frente a StatsCodec con cada serializador y compresión instalados, en un
+único valor y como el hash por secciones y columnas que escribe CacheService.set_stats.
+Con --redis mide además MEMORY USAGE de cada entrada en un Redis real.
+
+    python -m benchmarks.stats_codec --columns 2000 --repeat 5 --redis redis://localhost:6379/0
+"""
+import argparse
+import importlib.util
+import json
+import time
+from io import BytesIO
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.cache_service import (
+    CacheService, build_cache_data, stats_fields, stats_from_fields
+)
+from app.services.data_processor import DataProcessor
+from app.services.stats_codec import StatsCodec
+
+
+def build_stats(columns: int, rows: int, seed: int = 0) -> dict:
+    """Stats de un CSV ancho: tres de cada cuatro columnas numéricas, el resto texto"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 4 == 3:
+            data[f"texto_{i}"] = rng.choice(["alfa", "beta", "gamma", "delta", "épsilon"], rows)
+        else:
+            data[f"valor_{i}"] = np.round(rng.normal(i, 10, rows), 3)
+    csv = pd.DataFrame(data).to_csv(index=False).encode("utf-8")
+    result = DataProcessor.process_file(BytesIO(csv), "ancho.csv")
+    # CacheService() no se conecta a Redis hasta el primer comando
+    return CacheService()._convert_numpy_types(build_cache_data(result))
+
+
+def _best(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), value
+
+
+def _variants():
+    yield "json (antes)", None, None
+    serializers = ["json"] + (["msgpack"] if importlib.util.find_spec("msgpack") else [])
+    compressions = ["none", "zlib"] + (["zstd"] if importlib.util.find_spec("zstandard") else [])
+    for serializer in serializers:
+        for compression in compressions:
+            yield f"{serializer}+{compression}", serializer, compression
+    for serializer in serializers:
+        yield f"hash {serializer}", serializer, "auto"
+
+
+def run(columns: int, rows: int, repeat: int, redis_url: str = None):
+    stats = build_stats(columns, rows)
+    client = None
+    if redis_url:
+        import redis
+        client = redis.Redis.from_url(redis_url)
+
+    print(f"Stats de {columns:,} columnas")
+    print(f"{'formato':<16} {'bytes':>10} {'ratio':>7} {'encode_ms':>10} {'decode_ms':>10}"
+          + (f" {'redis_bytes':>12}" if client else ""))
+    base = None
+    for label, serializer, compression in _variants():
+        hashed = label.startswith("hash")
+        if serializer is None:
+            encode, decode = json.dumps, json.loads
+        elif hashed:
+            encode, decode = stats_fields, stats_from_fields
+        else:
+            encode, decode = StatsCodec.encode, StatsCodec.decode
+        with patch.object(settings, "STATS_SERIALIZER", serializer or "json"), \
+                patch.object(settings, "STATS_COMPRESSION", compression or "none"):
+            encode_s, value = _best(lambda: encode(stats), repeat)
+            decode_s, decoded = _best(lambda: decode(value), repeat)
+        assert decoded == json.loads(json.dumps(stats))
+        if hashed:
+            size = sum(len(name) + len(field) for name, field in value.items())
+        else:
+            size = len(value.encode("utf-8") if isinstance(value, str) else value)
+        base = base or size
+        line = (f"{label:<16} {size:>10,} {base / size:>7.2f} {encode_s * 1000:>10.2f} "
+                f"{decode_s * 1000:>10.2f}")
+        if client:
+            key = f"bench:stats:{label}"
+            if hashed:
+                client.hset(key, mapping=value)
+            else:
+                client.set(key, value)
+            line += f" {client.memory_usage(key, samples=0):>12,}"
+            client.delete(key)
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--columns", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--redis", default=None, help="URL de un Redis para medir MEMORY USAGE")
+    args = parser.parse_args()
+    run(args.columns, args.rows, args.repeat, args.redis)
@@ -0,0 +1,91 @@
+"""
+Benchmark de latencia de GET /files/stats/{file_id} con muchos pedidos concurrentes: guarda unas
+stats en Redis y las pide desde --concurrency clientes a la vez (p50/p95/p99 y pedidos por segundo).
+Por defecto corre la app en este proceso (ASGITransport, con su lifespan y su pool de Redis);
+con --url mide un servidor ya levantado (uvicorn app.main:app). Necesita Redis y MinIO.
+
+    python -m benchmarks.stats_latency --concurrency 500 --requests 4 --columns 200
+    python -m benchmarks.stats_latency --no-l1   # sin cache L1: cada pedido va a Redis
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.stats_codec import build_stats
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def _client(http: httpx.AsyncClient, path: str, requests: int, latencies: list,
+                  start: asyncio.Event):
+    await start.wait()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = await http.get(path)
+        latencies.append(time.perf_counter() - t0)
+        response.raise_for_status()
+
+
+async def _measure(http: httpx.AsyncClient, path: str, concurrency: int, requests: int) -> tuple:
+    latencies = []
+    start = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_client(http, path, requests, latencies, start))
+        for _ in range(concurrency)
+    ]
+    t0 = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - t0
+
+
+async def run(concurrency: int, requests: int, columns: int, url: str = None):
+    from app.api.endpoints import cache_service
+    from app.main import app
+
+    file_id = f"bench-{uuid.uuid4()}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with app.router.lifespan_context(app):
+        await cache_service.set_stats(file_id, build_stats(columns, rows=200))
+        transport = None if url else httpx.ASGITransport(app=app)
+        base_url = url or "http://bench"
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits,
+                                     timeout=60) as http:
+            path = f"{settings.API_V1_STR}/files/stats/{file_id}"
+            # Calentamiento: conexiones del pool y, si está activo, el L1
+            await _measure(http, path, min(concurrency, 50), 1)
+            latencies, elapsed = await _measure(http, path, concurrency, requests)
+        metrics = cache_service.local_metrics()
+        await cache_service.delete_stats(file_id)
+
+    ms = [value * 1000 for value in latencies]
+    print(f"{len(ms):,} pedidos, {concurrency} concurrentes, stats de {columns} columnas "
+          f"({'servidor ' + url if url else 'en proceso'}; "
+          f"L1 {'activo' if metrics['activo'] else 'inactivo'}, "
+          f"pool de {settings.REDIS_POOL_MAX_CONNECTIONS} conexiones)")
+    print(f"{'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8} {'media_ms':>9} "
+          f"{'pedidos/s':>10}")
+    print(f"{_percentile(ms, 0.5):>8.1f} {_percentile(ms, 0.95):>8.1f} "
+          f"{_percentile(ms, 0.99):>8.1f} "
+          f"{max(ms):>8.1f} {statistics.mean(ms):>9.1f} {len(ms) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4, help="Pedidos por cliente")
+    parser.add_argument("--columns", type=int, default=200)
+    parser.add_argument("--url", default=None, help="URL base de un servidor ya levantado")
+    parser.add_argument("--no-l1", action="store_true", help="Desactiva el cache L1 de stats")
+    args = parser.parse_args()
+    if args.no_l1:
+        settings.STATS_L1_ENABLED = False
+    asyncio.run(run(args.concurrency, args.requests, args.columns, args.url))
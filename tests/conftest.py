@@ -1,11 +1,15 @@
+import asyncio
 import pytest
 import pandas as pd
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 import tempfile
 import os
 from io import BytesIO
 
+# Los tests parchean DataProcessor/PDFService en este proceso: el trabajo de CPU corre en hilos
+os.environ.setdefault("PROCESS_POOL_WORKERS", "0")
+
 from app.main import app
 from app.services.cache_service import CacheService
 from app.services.storage_service import StorageService
@@ -17,12 +21,29 @@ def client():
     return TestClient(app)
 
 
+async def _no_messages(**kwargs):
+    # Como el get_message real con timeout: cede el event loop y vuelve sin mensaje
+    await asyncio.sleep(0.01)
+
+
 @pytest.fixture
 def mock_redis():
-    """Mock de Redis para tests unitarios"""
-    with patch('redis.Redis') as mock:
+    """
+    Mock del cliente de redis.asyncio para tests unitarios: comandos con await, pipeline sin
+    await
+    """
+    with patch('redis.asyncio.BlockingConnectionPool') as pool, \
+            patch('redis.asyncio.Redis') as mock:
         redis_instance = Mock()
-        mock.from_url.return_value = redis_instance
+        for command in ("get", "setex", "delete", "publish", "hget", "hmget", "hgetall", "aclose"):
+            setattr(redis_instance, command, AsyncMock())
+        redis_instance.pipeline.return_value.execute = AsyncMock()
+        pubsub = redis_instance.pubsub.return_value
+        pubsub.subscribe = AsyncMock()
+        pubsub.aclose = AsyncMock()
+        pubsub.get_message = AsyncMock(side_effect=_no_messages)
+        mock.return_value = redis_instance
+        redis_instance.pool = pool
         yield redis_instance
 
 
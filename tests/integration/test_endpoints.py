@@ -1,8 +1,14 @@
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import AsyncMock, patch, Mock
 import json
 from io import BytesIO
 
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import cache_service
+from app.services.upload_service import UploadSpool
+from app.main import app
+
 
 @pytest.mark.integration
 class TestFileUploadEndpoint:
@@ -81,6 +87,346 @@ class TestFileUploadEndpoint:
         assert response.status_code == 500
         assert "No se pudo guardar el archivo en MinIO" in response.json()["detail"]
 
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_upload_file_too_large(self, mock_storage, client):
+        """Test error 413 cuando el archivo supera MAX_FILE_SIZE_MB"""
+        with patch('app.core.config.settings.MAX_FILE_SIZE_MB', 1):
+            big_csv = b"col\n" + b"1234567\n" * (200 * 1024)
+
+            files = {
+                "file": ("big.csv", BytesIO(big_csv), "text/csv")
+            }
+
+            response = client.post("/api/v1/files/upload", files=files)
+
+        assert response.status_code == 413
+        mock_storage.assert_not_called()
+
+    @patch('app.api.endpoints.snapshot_store.save_state')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_csv_pipeline_mode(self, mock_cache, mock_state, client, sample_csv_bytes):
+        """Test upload en modo pipeline: MinIO y parser leen el mismo stream a la vez"""
+        stored = {}
+
+        def fake_save(filename, file_bytes, content_type):
+            stored[filename] = file_bytes.read()
+            return True
+
+        with patch('app.services.storage_service.StorageService.save_file', side_effect=fake_save):
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            response = client.post("/api/v1/files/upload?pipeline=true", files=files)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert stored["test.csv"] == sample_csv_bytes
+        assert data["resumen"]["total_filas"] == 5
+        assert "almacenamiento_s" in data["tiempos"]
+        assert "procesamiento_s" in data["tiempos"]
+        # El CSV se leyó por bloques: su estado queda en MinIO para anexar filas
+        mock_state.assert_called_once()
+        assert mock_state.call_args.args[0] == data["file_id"]
+
+    @patch('app.services.cache_service.CacheService.set_stats')
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_upload_excel_pipeline_mode(self, mock_storage, mock_cache, client,
+                                        sample_excel_content):
+        """Test Excel en modo pipeline se procesa al terminar la recepción"""
+        mock_storage.return_value = True
+
+        files = {"file": ("test.xlsx", BytesIO(sample_excel_content), "application/octet-stream")}
+        response = client.post("/api/v1/files/upload?pipeline=true", files=files)
+
+        assert response.status_code == 201
+        assert response.json()["resumen"]["total_filas"] == 4
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_async_mode(self, mock_cache, mock_storage, client, sample_csv_bytes):
+        """Test mode=async responde 202 y el trabajo queda consultable"""
+        mock_storage.return_value = True
+        jobs = {}
+
+        with patch('app.services.cache_service.CacheService.set_job',
+                   side_effect=lambda file_id, job: jobs.__setitem__(file_id, dict(job))), \
+                patch('app.services.cache_service.CacheService.get_job', side_effect=jobs.get):
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            response = client.post("/api/v1/files/upload?mode=async", files=files)
+
+            assert response.status_code == 202
+            file_id = response.json()["file_id"]
+
+            job_response = client.get(f"/api/v1/files/jobs/{file_id}")
+
+        assert job_response.status_code == 200
+        job = job_response.json()
+        assert job["estado"] == "Procesado"
+        assert job["progreso"] == 100
+        assert "procesamiento_s" in job["tiempos"]
+        mock_cache.assert_called_once()
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_upload_async_closes_spool_on_error(self, mock_storage, client, sample_csv_bytes):
+        """Test si Redis falla al registrar el trabajo el spool igual se cierra"""
+        mock_storage.return_value = True
+        closed = []
+        close = UploadSpool.close
+
+        with patch('app.services.cache_service.CacheService.set_job',
+                   side_effect=ConnectionError("redis")), \
+                patch.object(UploadSpool, "close", autospec=True,
+                             side_effect=lambda spool: closed.append(spool) or close(spool)):
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            with pytest.raises(ConnectionError):
+                client.post("/api/v1/files/upload?mode=async", files=files)
+
+        assert len(closed) == 1
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_async_queue_backend(self, mock_cache, mock_storage, client, sample_csv_bytes):
+        """Test con JOB_BACKEND=queue la API solo guarda el archivo y publica el trabajo"""
+        mock_storage.return_value = True
+        jobs = {}
+
+        with patch('app.api.endpoints.settings.JOB_BACKEND', "queue"), \
+                patch('app.api.endpoints.job_queue') as mock_queue, \
+                patch('app.services.cache_service.CacheService.set_job',
+                      side_effect=lambda file_id, job: jobs.__setitem__(file_id, dict(job))):
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            response = client.post("/api/v1/files/upload?mode=async&columns=edad", files=files)
+
+        assert response.status_code == 202
+        file_id = response.json()["file_id"]
+        assert jobs[file_id]["estado"] == "Subido"
+        mock_cache.assert_not_called()
+
+        # Cada upload va a su propia clave en MinIO, la que lee el worker
+        assert mock_storage.call_args.kwargs["object_name"] == f"{file_id}/test.csv"
+        task = mock_queue.enqueue.call_args.args[0]
+        assert task["object_name"] == f"{file_id}/test.csv"
+        assert task["file_id"] == file_id
+        assert task["columns"] == {"names": ["edad"], "pattern": None}
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_preview_mode(self, mock_cache, mock_storage, client, sample_csv_bytes):
+        """Test mode=preview responde con la muestra y el análisis completo reemplaza las stats"""
+        mock_storage.return_value = True
+        jobs = {}
+
+        with patch('app.services.cache_service.CacheService.set_job',
+                   side_effect=lambda file_id, job: jobs.__setitem__(file_id, dict(job))):
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            response = client.post("/api/v1/files/upload?mode=preview", files=files)
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["resumen"]["metodo_muestreo"] == "reservorio"
+        assert data["analisis_columnas"]["edad"]["intervalos_confianza"]["promedio"][0] is not None
+        assert jobs[data["file_id"]]["estado"] == "Procesado"
+
+        # Primero la vista previa y después el análisis completo, con el mismo file_id
+        assert [c.args[0] for c in mock_cache.call_args_list] == [data["file_id"]] * 2
+        assert "filas_muestra" in mock_cache.call_args_list[0].args[1]["resumen_general"]
+        assert "filas_muestra" not in mock_cache.call_args_list[1].args[1]["resumen_general"]
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_upload_preview_closes_spool_on_error(self, mock_storage, client, sample_csv_bytes):
+        """Test si Redis falla al guardar la vista previa el spool igual se cierra"""
+        mock_storage.return_value = True
+        closed = []
+        close = UploadSpool.close
+
+        failing = patch('app.services.cache_service.CacheService.set_stats',
+                        side_effect=ConnectionError("redis"))
+        with failing, \
+                patch.object(UploadSpool, "close", autospec=True,
+                             side_effect=lambda spool: closed.append(spool) or close(spool)):
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            with pytest.raises(ConnectionError):
+                client.post("/api/v1/files/upload?mode=preview", files=files)
+
+        assert len(closed) == 1
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_append_rows(self, mock_storage, client, sample_csv_bytes):
+        """Test anexar un lote actualiza las stats con el estado guardado, sin releer el archivo"""
+        mock_storage.return_value = True
+        stats, states, stored_states = {}, {}, {}
+        lines = sample_csv_bytes.splitlines(keepends=True)
+
+        cache = 'app.services.cache_service.CacheService'
+        store = 'app.api.endpoints.snapshot_store'
+        with patch(f'{cache}.set_stats', side_effect=stats.__setitem__), \
+                patch(f'{cache}.get_stats',
+                      side_effect=lambda file_id, **kwargs: stats.get(file_id)), \
+                patch(f'{cache}.set_state', side_effect=states.__setitem__), \
+                patch(f'{cache}.get_state', side_effect=states.get), \
+                patch(f'{store}.save_state', side_effect=stored_states.__setitem__), \
+                patch(f'{store}.load_state', side_effect=stored_states.get), \
+                patch(f'{cache}.lock', return_value=AsyncMock()):
+            files = {"file": ("ventas.csv", BytesIO(b"".join(lines[:3])), "text/csv")}
+            response = client.post("/api/v1/files/upload?pipeline=true", files=files)
+            file_id = response.json()["file_id"]
+            # El estado del upload va a MinIO; a Redis solo llega con el primer anexo
+            assert file_id in stored_states
+            assert file_id not in states
+
+            batch = {"file": ("lote.csv", BytesIO(lines[0] + b"".join(lines[3:])), "text/csv")}
+            response = client.post(f"/api/v1/files/{file_id}/append", files=batch)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["filas_anexadas"] == 3
+        assert data["total_filas"] == 5
+        assert data["anexos"] == 1
+        assert stats[file_id]["resumen_general"]["nombre_archivo"] == "ventas.csv"
+        assert stats[file_id]["analisis_columnas"]["edad"]["valores_totales"] == 5
+        assert file_id in states
+        # El lote queda guardado bajo el file_id, aparte del archivo original
+        assert mock_storage.call_args.kwargs["object_name"].startswith(f"{file_id}/anexos/")
+
+    @patch('app.services.cache_service.CacheService.lock')
+    @patch('app.services.cache_service.CacheService.get_state')
+    @patch('app.services.cache_service.CacheService.get_stats')
+    def test_append_rows_errors(self, mock_get_stats, mock_get_state, mock_lock, client,
+                                sample_csv_bytes):
+        """Test 404 sin stats, 409 sin estado ni snapshot y 409 si otro anexo tiene el lock"""
+        mock_lock.return_value = AsyncMock()
+
+        def append():
+            files = {"file": ("lote.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            return client.post("/api/v1/files/some-id/append", files=files)
+
+        mock_get_stats.return_value = None
+        assert append().status_code == 404
+
+        mock_get_stats.return_value = {"resumen_general": {"total_filas": 1}}
+        mock_get_state.return_value = None
+        with patch('app.api.endpoints.snapshot_store.fetch',
+                   side_effect=FileNotFoundError("some-id")), \
+                patch('app.api.endpoints.snapshot_store.load_state', return_value=None):
+            assert append().status_code == 409
+
+        mock_lock.return_value.acquire.return_value = False
+        response = append()
+        assert response.status_code == 409
+        assert "anexando" in response.json()["detail"]
+
+    @patch('app.services.cache_service.CacheService.get_job')
+    def test_get_job_not_found(self, mock_get_job, client):
+        """Test 404 para un trabajo inexistente"""
+        mock_get_job.return_value = None
+
+        response = client.get("/api/v1/files/jobs/nonexistent-id")
+
+        assert response.status_code == 404
+
+    def test_cache_metrics(self, client):
+        """Test las métricas del L1 de stats; sin suscripción a invalidaciones queda inactivo"""
+        response = client.get("/api/v1/files/cache")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["activo"] is False
+        assert {"aciertos", "fallos", "tasa_aciertos", "bytes", "max_bytes"} <= set(data)
+
+    def test_lifespan_manages_redis_pool(self, mock_redis):
+        """Test el lifespan crea el pool de Redis del proceso, activa el L1 y lo cierra al apagar"""
+        with patch.object(cache_service, "_client", None):
+            with TestClient(app) as client:
+                mock_redis.pool.from_url.assert_called_once()
+                assert client.get("/api/v1/files/cache").json()["activo"] is True
+
+            mock_redis.aclose.assert_awaited_once_with(close_connection_pool=True)
+            assert cache_service.local_metrics()["activo"] is False
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_upload_unknown_parser(self, mock_storage, client, sample_csv_bytes):
+        """Test parser inexistente se rechaza antes de recibir el archivo"""
+        files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+
+        response = client.post("/api/v1/files/upload?parser=polars", files=files)
+
+        assert response.status_code == 400
+        assert "polars" in response.json()["detail"]
+        mock_storage.assert_not_called()
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_with_parser(self, mock_cache, mock_storage, client, sample_csv_bytes):
+        """Test el parser elegido se informa en la respuesta"""
+        mock_storage.return_value = True
+        files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+
+        response = client.post("/api/v1/files/upload?parser=pandas", files=files)
+
+        assert response.status_code == 201
+        assert response.json()["parser"] == "pandas"
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_with_columns(self, mock_cache, mock_storage, client, sample_csv_bytes):
+        """Test solo se analizan las columnas pedidas y el resumen trae el esquema completo"""
+        mock_storage.return_value = True
+        files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+
+        response = client.post("/api/v1/files/upload?columns=edad&columns_regex=^sal", files=files)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["resumen"]["columnas"] == ["nombre", "edad", "salario"]
+        assert data["resumen"]["columnas_analizadas"] == ["edad", "salario"]
+        assert set(data["preview_analisis"]) == {"edad", "salario"}
+
+        response = client.post("/api/v1/files/upload?columns=bono",
+                               files={"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")})
+        assert response.status_code == 400
+        assert "bono" in response.json()["detail"]
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    @patch('app.services.cache_service.CacheService.set_stats')
+    def test_upload_writes_snapshot(self, mock_cache, mock_storage, client, sample_csv_bytes,
+                                    tmp_path):
+        """Test el upload publica la foto columnar y después se cargan solo las columnas pedidas"""
+        from app.services.snapshot import SnapshotStore
+
+        mock_storage.return_value = True
+        snapshots = SnapshotStore(Mock(), str(tmp_path))
+        with patch('app.api.endpoints.snapshot_store', snapshots) as store:
+            mock_snapshot = store.storage.save_snapshot
+            files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+            response = client.post("/api/v1/files/upload", files=files)
+
+            assert response.status_code == 201
+            data = response.json()
+            assert data["snapshot"]["columnas"] == 3
+            assert data["snapshot"]["bytes"] > 0
+            mock_snapshot.assert_called_once()
+            assert mock_snapshot.call_args.args[2][-1] == "manifest.json"
+            mock_storage.assert_called_once()
+            mock_cache.assert_called_once()
+
+            response = client.get(f"/api/v1/files/snapshot/{data['file_id']}?columns=edad")
+            assert response.status_code == 200
+            snapshot = response.json()
+            assert snapshot["carga"]["columnas"] == ["edad"]
+            assert snapshot["snapshot"]["filas"] == 5
+            assert snapshot["carga"]["lectura_s"] is not None
+
+            response = client.get(f"/api/v1/files/snapshot/{data['file_id']}?columns=bono")
+            assert response.status_code == 400
+
+    @patch('app.services.storage_service.StorageService.save_file')
+    def test_upload_invalid_columns_regex(self, mock_storage, client, sample_csv_bytes):
+        """Test una regex inválida se rechaza antes de recibir el archivo"""
+        files = {"file": ("test.csv", BytesIO(sample_csv_bytes), "text/csv")}
+
+        response = client.post("/api/v1/files/upload?columns_regex=sal(", files=files)
+
+        assert response.status_code == 400
+        mock_storage.assert_not_called()
+
     def test_upload_malformed_csv(self, client):
         """Test con CSV malformado"""
         malformed_csv = b"esta,no,es\nuna,estructura,csv,valida,con,demasiadas,columnas"
@@ -138,6 +484,25 @@ class TestStatsEndpoints:
         assert response.status_code == 404
         assert "No se encontraron stats" in response.json()["detail"]
 
+    @patch('app.services.cache_service.CacheService.get_stats_columns')
+    @patch('app.services.cache_service.CacheService.get_stats')
+    def test_get_stats_selected_columns(self, mock_cache, mock_columns, client):
+        """Test ?columns= pide al cache solo las columnas resueltas contra las analizadas"""
+        mock_columns.return_value = ["edad", "nombre", "ciudad"]
+        mock_cache.return_value = {"analisis_columnas": {"edad": {"tipo_datos": "Numérico"}}}
+
+        response = client.get("/api/v1/files/stats/test-id?columns=edad")
+
+        assert response.status_code == 200
+        mock_cache.assert_called_once_with("test-id", columns=["edad"])
+
+        response = client.get("/api/v1/files/stats/test-id?columns=no_existe")
+        assert response.status_code == 400
+
+        mock_columns.return_value = None
+        response = client.get("/api/v1/files/stats/test-id?columns=edad")
+        assert response.status_code == 404
+
     @patch('app.services.cache_service.CacheService.get_stats')
     def test_get_summary_success(self, mock_cache, client):
         """Test obtener resumen exitosamente"""
@@ -184,6 +549,17 @@ class TestPDFExportEndpoint:
         # Verificar que se llamó al servicio PDF
         mock_pdf.assert_called_once()
 
+    @patch('app.services.cache_service.CacheService.get_stats')
+    def test_export_pdf_pool_saturated(self, mock_cache, client):
+        """Test 503 con Retry-After cuando el pool de procesos está saturado"""
+        mock_cache.return_value = {"some": "stats"}
+
+        with patch('app.api.endpoints.processing_pool.max_queue', 0):
+            response = client.get("/api/v1/files/export/pdf/test-file-id")
+
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
     @patch('app.services.cache_service.CacheService.get_stats')
     def test_export_pdf_not_found(self, mock_cache, client):
         """Test PDF cuando no hay datos"""
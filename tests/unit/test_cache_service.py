@@ -1,36 +1,64 @@
+import asyncio
 import pytest
 import json
+import redis
 import numpy as np
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 
-from app.services.cache_service import CacheService
+from app.core.config import settings
+from app.services.cache_service import CacheService, stats_fields, stats_from_fields
+from app.services.stats_codec import StatsCodec
+
+
+ANALYSIS = {
+    "resumen_general": {
+        "nombre_archivo": "test.csv", "total_filas": 2, "columnas": ["edad", "nombre"]
+    },
+    "analisis_columnas": {
+        "edad": {"tipo_datos": "Numérico", "interpretacion": ["Valor promedio: 30.00"]},
+        "nombre": {"tipo_datos": "Texto", "interpretacion": ["Valores únicos: 2"]}
+    },
+    "estadisticas_pandas": {
+        "edad": {"count": 2, "mean": 30.0}, "nombre": {"count": 2, "top": "Ana"}
+    }
+}
+
+
+def _fake_hash(mock_redis, stats):
+    """HGET/HMGET del mock sobre los campos que dejaría set_stats"""
+    stored = stats_fields(stats)
+    mock_redis.hget.side_effect = lambda key, name: stored.get(name)
+    mock_redis.hmget.side_effect = lambda key, names: [stored.get(name) for name in names]
+    return stored
 
 
 class TestCacheService:
     """Tests unitarios para CacheService"""
 
-    def test_set_stats_simple_dict(self, cache_service_mock, mock_redis):
+    @pytest.mark.asyncio
+    async def test_set_stats_simple_dict(self, cache_service_mock, mock_redis):
         """Test guardar estadísticas simples"""
         test_stats = {
             "columna1": {"count": 10, "mean": 25.5},
             "columna2": {"count": 10, "unique": 5}
         }
 
-        cache_service_mock.set_stats("test-id", test_stats)
-
-        # Verificar que se llamó setex con los parámetros correctos
-        mock_redis.setex.assert_called_once()
-        call_args = mock_redis.setex.call_args
+        await cache_service_mock.set_stats("test-id", test_stats)
 
-        assert call_args[0][0] == "stats:test-id"
-        assert call_args[0][1] == 3600  # expire_seconds por defecto
+        # Verificar que se reemplazó el hash con su expiración en una transacción
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        pipe = mock_redis.pipeline.return_value
+        pipe.delete.assert_called_once_with("stats:test-id")
+        pipe.expire.assert_called_once_with("stats:test-id", 3600)  # expire_seconds por defecto
+        pipe.execute.assert_called_once()
 
-        # Verificar que el JSON es válido
-        stored_json = call_args[0][2]
-        parsed_data = json.loads(stored_json)
-        assert parsed_data["columna1"]["count"] == 10
+        # Verificar que los campos se decodifican
+        fields = pipe.hset.call_args.kwargs["mapping"]
+        assert pipe.hset.call_args.args[0] == "stats:test-id"
+        assert stats_from_fields(fields)["columna1"]["count"] == 10
 
-    def test_set_stats_with_numpy_types(self, cache_service_mock, mock_redis):
+    @pytest.mark.asyncio
+    async def test_set_stats_with_numpy_types(self, cache_service_mock, mock_redis):
         """Test guardar estadísticas con tipos numpy"""
         test_stats = {
             "columna1": {
@@ -40,59 +68,234 @@ class TestCacheService:
             }
         }
 
-        cache_service_mock.set_stats("test-id", test_stats)
+        await cache_service_mock.set_stats("test-id", test_stats)
 
         # Verificar que se convirtieron los tipos numpy
-        call_args = mock_redis.setex.call_args
-        stored_json = call_args[0][2]
-        parsed_data = json.loads(stored_json)
+        fields = mock_redis.pipeline.return_value.hset.call_args.kwargs["mapping"]
+        parsed_data = stats_from_fields(fields)
 
         # Verificar que son tipos nativos de Python
         assert isinstance(parsed_data["columna1"]["count"], int)
         assert isinstance(parsed_data["columna1"]["mean"], float)
         assert isinstance(parsed_data["columna1"]["array"], list)
 
-    def test_set_stats_custom_expiration(self, cache_service_mock, mock_redis):
+    @pytest.mark.asyncio
+    async def test_set_stats_custom_expiration(self, cache_service_mock, mock_redis):
         """Test guardar con expiración personalizada"""
         test_stats = {"test": "data"}
 
-        cache_service_mock.set_stats("test-id", test_stats, expire_seconds=7200)
+        await cache_service_mock.set_stats("test-id", test_stats, expire_seconds=7200)
 
-        call_args = mock_redis.setex.call_args
-        assert call_args[0][1] == 7200
+        mock_redis.pipeline.return_value.expire.assert_called_once_with("stats:test-id", 7200)
 
-    def test_get_stats_success(self, cache_service_mock, mock_redis):
-        """Test obtener estadísticas exitosamente"""
-        # Mock de datos en Redis
-        test_data = {"columna1": {"count": 10}}
-        mock_redis.get.return_value = json.dumps(test_data)
+    def test_stats_fields_split_columns(self):
+        """Test cada sección y cada columna de las secciones por columna es un campo del hash"""
+        fields = stats_fields(ANALYSIS)
 
-        result = cache_service_mock.get_stats("test-id")
+        assert set(fields) == {
+            "_secciones", "resumen_general", "analisis_columnas", "estadisticas_pandas",
+            "columna:edad", "columna:nombre", "pandas:edad", "pandas:nombre"
+        }
+        assert stats_from_fields(fields) == ANALYSIS
+        assert list(stats_from_fields(fields)) == list(ANALYSIS)
 
-        mock_redis.get.assert_called_once_with("stats:test-id")
-        assert result == test_data
+    @pytest.mark.asyncio
+    async def test_get_stats_success(self, cache_service_mock, mock_redis):
+        """Test obtener estadísticas exitosamente"""
+        # Mock del hash en Redis (el cliente binario devuelve los nombres de campo en bytes)
+        fields = stats_fields(ANALYSIS)
+        mock_redis.hgetall.return_value = {name.encode(): value for name, value in fields.items()}
 
-    def test_get_stats_not_found(self, cache_service_mock, mock_redis):
-        """Test obtener estadísticas no encontradas"""
-        mock_redis.get.return_value = None
+        result = await cache_service_mock.get_stats("test-id")
 
-        result = cache_service_mock.get_stats("nonexistent-id")
+        mock_redis.hgetall.assert_called_once_with("stats:test-id")
+        assert result == ANALYSIS
 
-        assert result is None
+    @pytest.mark.asyncio
+    async def test_get_stats_not_found(self, cache_service_mock, mock_redis):
+        """Test obtener estadísticas no encontradas"""
+        mock_redis.hgetall.return_value = {}
+        mock_redis.hget.return_value = None
+        mock_redis.hmget.return_value = [None, None]
+
+        assert await cache_service_mock.get_stats("nonexistent-id") is None
+        sections = ["resumen_general"]
+        assert await cache_service_mock.get_stats("nonexistent-id", sections=sections) is None
+        assert await cache_service_mock.get_stats("nonexistent-id", columns=["edad"]) is None
+        assert await cache_service_mock.get_stats_columns("nonexistent-id") is None
+
+    @pytest.mark.asyncio
+    async def test_get_stats_reads_only_requested_fields(self, cache_service_mock, mock_redis):
+        """Test con secciones y columnas se piden exactamente esos campos en un solo HMGET"""
+        _fake_hash(mock_redis, ANALYSIS)
+
+        result = await cache_service_mock.get_stats(
+            "test-id", sections=["analisis_columnas"], columns=["nombre"]
+        )
+
+        mock_redis.hmget.assert_called_once_with(
+            "stats:test-id", ["_secciones", "analisis_columnas", "columna:nombre"]
+        )
+        assert result == {"analisis_columnas": {"nombre": ANALYSIS["analisis_columnas"]["nombre"]}}
+
+    @pytest.mark.asyncio
+    async def test_get_stats_sections_skip_pandas(self, cache_service_mock, mock_redis):
+        """Test el resumen trae todas las columnas del análisis sin tocar el bloque de pandas"""
+        _fake_hash(mock_redis, ANALYSIS)
+
+        sections = ["resumen_general", "analisis_columnas"]
+        result = await cache_service_mock.get_stats("test-id", sections=sections)
+
+        requested = [name for call in mock_redis.hmget.call_args_list for name in call.args[1]]
+        assert not any(
+            name.startswith("pandas") or name == "estadisticas_pandas" for name in requested
+        )
+        assert result == {key: ANALYSIS[key] for key in ("resumen_general", "analisis_columnas")}
+        assert await cache_service_mock.get_stats_columns("test-id") == ["edad", "nombre"]
+
+    @pytest.mark.asyncio
+    async def test_get_stats_columns_across_sections(self, cache_service_mock, mock_redis):
+        _fake_hash(mock_redis, ANALYSIS)
+
+        result = await cache_service_mock.get_stats("test-id", columns=["edad", "no_existe"])
+
+        assert list(result) == list(ANALYSIS)
+        assert list(result["analisis_columnas"]) == ["edad"]
+        assert list(result["estadisticas_pandas"]) == ["edad"]
+
+    @pytest.mark.asyncio
+    async def test_get_stats_legacy_value(self, cache_service_mock, mock_redis):
+        """Test las entradas de antes (un valor JSON en la clave) se siguen leyendo y filtrando"""
+        wrongtype = redis.exceptions.ResponseError(
+            "WRONGTYPE Operation against a key holding the wrong kind of value"
+        )
+        mock_redis.hgetall.side_effect = wrongtype
+        mock_redis.hget.side_effect = wrongtype
+        mock_redis.hmget.side_effect = wrongtype
+        mock_redis.get.return_value = json.dumps(ANALYSIS)
+
+        assert await cache_service_mock.get_stats("test-id") == ANALYSIS
+        assert await cache_service_mock.get_stats("test-id", sections=["resumen_general"]) == {
+            "resumen_general": ANALYSIS["resumen_general"]
+        }
+        assert await cache_service_mock.get_stats_columns("test-id") == ["edad", "nombre"]
+        mock_redis.get.assert_called_with("stats:test-id")
 
-    def test_get_stats_invalid_json(self, cache_service_mock, mock_redis):
+    @pytest.mark.asyncio
+    async def test_get_stats_invalid_json(self, cache_service_mock, mock_redis):
         """Test manejar JSON inválido en Redis"""
+        mock_redis.hgetall.side_effect = redis.exceptions.ResponseError("WRONGTYPE")
         mock_redis.get.return_value = "invalid-json"
 
         with pytest.raises(json.JSONDecodeError):
-            cache_service_mock.get_stats("test-id")
+            await cache_service_mock.get_stats("test-id")
 
-    def test_delete_stats(self, cache_service_mock, mock_redis):
+    @pytest.mark.asyncio
+    async def test_delete_stats(self, cache_service_mock, mock_redis):
         """Test eliminar estadísticas"""
-        cache_service_mock.delete_stats("test-id")
+        await cache_service_mock.delete_stats("test-id")
 
         mock_redis.delete.assert_called_once_with("stats:test-id")
 
+    @pytest.mark.asyncio
+    async def test_set_and_delete_publish_invalidation(self, cache_service_mock, mock_redis):
+        """Test sobrescribir o borrar stats avisa a los L1 de los demás procesos"""
+        await cache_service_mock.set_stats("test-id", {"a": 1})
+        await cache_service_mock.delete_stats("test-id")
+
+        assert mock_redis.publish.call_count == 2
+        mock_redis.publish.assert_called_with(settings.STATS_INVALIDATION_CHANNEL, "test-id")
+
+    @pytest.mark.asyncio
+    async def test_get_stats_uses_local_cache_while_listening(self, cache_service_mock, mock_redis):
+        """Test con la suscripción activa, la segunda lectura no va a Redis y vence con la clave"""
+        await cache_service_mock.start_invalidation_listener()
+        pubsub = mock_redis.pubsub.return_value
+        pubsub.subscribe.assert_awaited_once_with(settings.STATS_INVALIDATION_CHANNEL)
+        pipe = mock_redis.pipeline.return_value
+        fields = stats_fields(ANALYSIS)
+        pipe.execute.return_value = [fields, 30_000]
+
+        assert await cache_service_mock.get_stats("test-id") == ANALYSIS
+        assert await cache_service_mock.get_stats("test-id") == ANALYSIS
+        # Las lecturas parciales salen del L1 si las stats completas ya están
+        assert await cache_service_mock.get_stats("test-id", sections=["resumen_general"]) == {
+            "resumen_general": ANALYSIS["resumen_general"]
+        }
+
+        pipe.execute.assert_awaited_once()
+        pipe.pttl.assert_called_once_with("stats:test-id")
+        mock_redis.hmget.assert_not_called()
+        metrics = cache_service_mock.local_metrics()
+        assert metrics["activo"] is True
+        assert metrics["aciertos"] == 2
+        assert metrics["bytes"] == sum(StatsCodec.payload_size(value) for value in fields.values())
+
+        # Otro proceso sobrescribe las stats: llega el aviso y se vuelve a leer de Redis
+        cache_service_mock._on_invalidation({"data": b"test-id"})
+        pipe.execute.return_value = [stats_fields({"a": 2}), 30_000]
+        assert await cache_service_mock.get_stats("test-id") == {"a": 2}
+
+        await cache_service_mock.close()
+        assert cache_service_mock.local_metrics()["activo"] is False
+        mock_redis.aclose.assert_awaited_once_with(close_connection_pool=True)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_local_misses_share_one_read(self, cache_service_mock, mock_redis):
+        """
+        Test varios pedidos que no encuentran las stats en el L1 hacen una sola lectura de
+        Redis
+        """
+        await cache_service_mock.start_invalidation_listener()
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [stats_fields(ANALYSIS), 30_000]
+
+        reads = (cache_service_mock.get_stats("test-id") for _ in range(10))
+        results = await asyncio.gather(*reads)
+
+        assert results == [ANALYSIS] * 10
+        pipe.execute.assert_awaited_once()
+        assert cache_service_mock.local_metrics()["vuelos"]["compartidos"] == 9
+        await cache_service_mock.close()
+
+    @pytest.mark.asyncio
+    async def test_listener_error_disables_local_cache(self, cache_service_mock, mock_redis):
+        """Test si se cae la suscripción se vacía el L1 y las lecturas van a Redis"""
+        await cache_service_mock.start_invalidation_listener()
+        cache_service_mock.local.set("test-id", {"a": 1}, 8, 60)
+
+        pubsub = mock_redis.pubsub.return_value
+        pubsub.get_message.side_effect = redis.exceptions.ConnectionError("caído")
+        await cache_service_mock._listener
+        mock_redis.hgetall.return_value = stats_fields({"a": 2})
+
+        assert cache_service_mock.listening is False
+        assert await cache_service_mock.get_stats("test-id") == {"a": 2}
+        await cache_service_mock.stop_invalidation_listener()
+
+    @pytest.mark.asyncio
+    async def test_listener_not_started_without_redis(self, cache_service_mock, mock_redis):
+        pubsub = mock_redis.pubsub.return_value
+        pubsub.subscribe.side_effect = redis.exceptions.ConnectionError("caído")
+
+        await cache_service_mock.start_invalidation_listener()
+
+        assert cache_service_mock.listening is False
+        mock_redis.pubsub.return_value.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_set_and_get_job(self, cache_service_mock, mock_redis):
+        """Test el estado del trabajo se guarda junto a las stats con prefijo job:"""
+        await cache_service_mock.set_job("test-id", {"estado": "Subido", "progreso": np.int64(0)})
+
+        call_args = mock_redis.setex.call_args
+        assert call_args[0][0] == "job:test-id"
+        assert json.loads(call_args[0][2])["progreso"] == 0
+
+        mock_redis.get.return_value = call_args[0][2]
+        assert (await cache_service_mock.get_job("test-id"))["estado"] == "Subido"
+        mock_redis.get.assert_called_with("job:test-id")
+
     def test_convert_numpy_types_nested_dict(self, cache_service_mock):
         """Test conversión de tipos numpy en diccionarios anidados"""
         nested_data = {
@@ -148,17 +351,32 @@ class TestCacheService:
 
         assert result == 42
 
-    @patch('app.core.config.settings.REDIS_URL', 'redis://localhost:6379/0')
-    def test_cache_service_initialization(self):
-        """Test inicialización del servicio de cache"""
-        with patch('redis.Redis') as mock_redis_class:
-            mock_instance = Mock()
-            mock_redis_class.from_url.return_value = mock_instance
-
+    def test_connect_creates_one_bounded_pool(self):
+        """Test el pool se crea una vez, acotado y con los timeouts de Settings, sin conectarse"""
+        with patch('redis.asyncio.BlockingConnectionPool') as pool_class, \
+                patch('redis.asyncio.Redis') as redis_class:
             service = CacheService()
-
-            mock_redis_class.from_url.assert_called_once_with(
-                'redis://localhost:6379/0',
-                decode_responses=True
+            pool_class.from_url.assert_not_called()
+
+            client = service.connect()
+            assert service.connect() is client
+            assert service.client is client
+
+            pool_class.from_url.assert_called_once_with(
+                settings.REDIS_URL,
+                max_connections=settings.REDIS_POOL_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS
             )
-            assert service.client == mock_instance
\ No newline at end of file
+            redis_class.assert_called_once_with(connection_pool=pool_class.from_url.return_value)
+
+    @pytest.mark.asyncio
+    async def test_state_is_binary(self, cache_service_mock, mock_redis):
+        """Test el estado binario se guarda y se lee tal cual, con prefijo state:"""
+        await cache_service_mock.set_state("test-id", b"\x00estado")
+        mock_redis.get.return_value = b"\x00estado"
+
+        assert await cache_service_mock.get_state("test-id") == b"\x00estado"
+        mock_redis.setex.assert_awaited_once_with("state:test-id", 3600, b"\x00estado")
+        mock_redis.get.assert_awaited_once_with("state:test-id")
@@ -0,0 +1,161 @@
+import pytest
+import numpy as np
+import pandas as pd
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import Mock, patch
+
+from multiprocessing import shared_memory
+
+from app.services.column_profiler import ColumnProfiler, NumericBlock
+from app.services.data_processor import DataProcessor
+
+
+@pytest.fixture
+def numeric_frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "entero": rng.integers(0, 50, 500),
+        "decimal": rng.normal(10, 3, 500),
+        "con_nulos": np.where(rng.random(500) < 0.2, np.nan, rng.random(500)),
+        "vacia": np.full(500, np.nan)
+    })
+    return df
+
+
+class TestColumnProfiler:
+    """Tests para el perfil numérico vectorizado"""
+
+    def test_matches_pandas(self, numeric_frame):
+        """Test las reducciones 2-D coinciden con las de pandas columna a columna"""
+        profile = ColumnProfiler.profile_numeric(numeric_frame.to_numpy(dtype=np.float64))
+        describe = numeric_frame.describe()
+
+        for j, col in enumerate(numeric_frame.columns):
+            expected = describe[col]
+            assert profile["count"][j] == expected["count"]
+            assert profile["nulls"][j] == numeric_frame[col].isna().sum()
+            assert profile["distinct"][j] == numeric_frame[col].nunique()
+            for key, row in (("mean", "mean"), ("std", "std"), ("min", "min"), ("max", "max")):
+                assert profile[key][j] == pytest.approx(expected[row], nan_ok=True)
+            assert profile["percentiles"][3, j] == pytest.approx(expected["50%"], nan_ok=True)
+
+    def test_sketch_path_above_threshold(self, numeric_frame):
+        """Test por encima del umbral de filas los cuantiles salen del sketch"""
+        block = numeric_frame.to_numpy(dtype=np.float64)
+        with patch('app.core.config.settings.QUANTILE_SKETCH_MIN_ROWS', 100):
+            profile = ColumnProfiler.profile_numeric(block)
+
+        assert profile["min"][0] == numeric_frame["entero"].min()
+        assert profile["distinct"][1] == 500
+        assert np.isnan(profile["percentiles"][:, 3]).all()
+
+    def test_process_file_without_describe(self, numeric_frame):
+        """Test el análisis en memoria arma estadisticas_pandas sin llamar a describe()"""
+        df = numeric_frame.assign(texto=["a", "b", "b", "c", None] * 100)
+        csv = df.to_csv(index=False).encode()
+
+        with patch.object(pd.DataFrame, "describe", side_effect=AssertionError("describe")):
+            result = DataProcessor.process_file(csv, "data.csv", streaming=False)
+
+        stats = result["estadisticas_pandas"]
+        expected = pd.read_csv(BytesIO(csv)).describe(include="all")
+        assert set(stats) == set(expected.columns)
+        assert set(stats["decimal"]) == set(expected.index)
+        assert stats["decimal"]["mean"] == pytest.approx(expected["decimal"]["mean"])
+        assert stats["texto"]["top"] == "b"
+        assert stats["texto"]["freq"] == 200
+        columns = result["analisis_columnas"]
+        assert columns["entero"]["estadisticas"]["minimo"] == numeric_frame["entero"].min()
+        assert columns["vacia"]["interpretacion"] == "No hay datos numéricos válidos"
+
+    def test_infinite_values_match_pandas(self):
+        """Test con ±inf la mediana y el desvío coinciden con median() y std() de pandas"""
+        result = DataProcessor.process_file(b"a\n1\ninf\n3\n", "inf.csv", streaming=False)
+        stats = result["analisis_columnas"]["a"]["estadisticas"]
+        values = pd.Series([1, np.inf, 3])
+
+        assert stats["mediana"] == values.median() == 3.0
+        with np.errstate(invalid="ignore"):
+            assert np.isnan(stats["desviacion_estandar"]) and np.isnan(values.std())
+        assert stats["maximo"] == np.inf
+
+        profile = ColumnProfiler.profile_numeric(np.array([[-np.inf], [-np.inf], [0.0], [5.0]]))
+        assert profile["percentiles"][3, 0] == pd.Series([-np.inf, -np.inf, 0, 5]).median()
+
+    def test_large_integer_extremes_are_exact(self):
+        """Test los extremos de enteros mayores que 2^53 no pasan por float64"""
+        csv = b"a\n1\n9007199254740993\n-9007199254740995\n"
+        result = DataProcessor.process_file(csv, "grande.csv", streaming=False)
+        stats = result["analisis_columnas"]["a"]["estadisticas"]
+
+        assert stats["maximo"] == 9007199254740993
+        assert stats["minimo"] == -9007199254740995
+
+    @pytest.mark.slow
+    def test_parallel_profile_matches_serial(self, numeric_frame):
+        """Test con muchas columnas los grupos se perfilan en procesos y se unen en orden"""
+        wide = pd.concat([numeric_frame.add_suffix(f"_{i}") for i in range(3)], axis=1)
+        serial = DataProcessor._profile_dataframe(wide, "ancho.csv")
+
+        try:
+            with patch('app.core.config.settings.COLUMN_PARALLEL_MIN_COLUMNS', 4), \
+                    patch('app.core.config.settings.COLUMN_PARALLEL_WORKERS', 3):
+                with ColumnProfiler.block(*wide.shape) as block:
+                    assert block.name is not None
+                    name = block.name
+                parallel = DataProcessor._profile_dataframe(wide, "ancho.csv")
+        finally:
+            ColumnProfiler.shutdown()
+
+        assert list(parallel["analisis_columnas"]) == list(wide.columns)
+        assert parallel["analisis_columnas"] == serial["analisis_columnas"]
+        # El bloque compartido se libera al salir del with
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_narrow_block_stays_local(self):
+        """Test por debajo del umbral el bloque es memoria normal del proceso"""
+        with ColumnProfiler.block(10, 3) as block:
+            assert block.name is None
+            assert block.array.flags.f_contiguous
+        assert isinstance(block, NumericBlock)
+
+    def test_workers_share_cpus_with_processing_pool(self):
+        """Test por defecto cada proceso del pool usa su parte de las CPU, no todas"""
+        with patch('app.services.column_profiler.os.cpu_count', return_value=8), \
+                patch('app.core.config.settings.COLUMN_PARALLEL_WORKERS', 0):
+            with patch('app.core.config.settings.PROCESS_POOL_WORKERS', 2):
+                assert ColumnProfiler.workers() == 4
+            with patch('app.core.config.settings.PROCESS_POOL_WORKERS', 16):
+                assert ColumnProfiler.workers() == 1
+            with patch('app.core.config.settings.PROCESS_POOL_WORKERS', 0):
+                assert ColumnProfiler.workers() == 8
+
+    def test_child_process_profiles_sequentially(self):
+        """Test en un hijo del pool no se anida otro pool de procesos ni memoria compartida"""
+        in_child = patch('app.services.column_profiler.multiprocessing.parent_process',
+                         return_value=Mock())
+        with in_child, \
+                patch('app.core.config.settings.COLUMN_PARALLEL_MIN_COLUMNS', 4), \
+                patch('app.core.config.settings.COLUMN_PARALLEL_WORKERS', 3):
+            assert ColumnProfiler.workers() == 1
+            with ColumnProfiler.block(10, 8) as block:
+                assert block.name is None
+
+    def test_executor_created_once_across_threads(self):
+        """Test pedidos concurrentes en hilos comparten un único executor"""
+        def slow_executor(**kwargs):
+            time.sleep(0.01)  # Sin el lock, otros hilos verían _executor vacío mientras tanto
+            return Mock()
+
+        executor_patch = patch('app.services.column_profiler.ProcessPoolExecutor',
+                               side_effect=slow_executor)
+        with executor_patch as executor_class:
+            with ThreadPoolExecutor(8) as threads:
+                executors = list(threads.map(lambda _: ColumnProfiler.executor(), range(32)))
+            ColumnProfiler.shutdown()
+
+        executor_class.assert_called_once()
+        assert all(executor is executors[0] for executor in executors)
@@ -0,0 +1,112 @@
+import io
+import pytest
+import pandas as pd
+from io import BytesIO
+
+from app.services.column_selection import ColumnSelection, ColumnSelectionError
+from app.services.data_processor import DataProcessor
+
+
+CSV = b"id,nombre,precio_lista,precio_final,notas\n1,a,10,9,x\n2,b,20,18,y\n3,c,30,27,z\n"
+
+
+class NonSeekable(io.BytesIO):
+    """Stream como el del modo pipeline: no permite volver al inicio"""
+
+    def seekable(self):
+        return False
+
+
+class TestColumnSelection:
+    """Tests para la proyección de columnas"""
+
+    def test_from_request(self):
+        """Test columns acepta repetidos y comas; sin nada pedido no hay selección"""
+        selection = ColumnSelection.from_request(["id, nombre", "id"], None)
+        assert selection.names == ["id", "nombre"]
+        assert ColumnSelection.from_request(None, None) is None
+        assert ColumnSelection.from_request([], "^precio").pattern == "^precio"
+
+    def test_invalid_regex(self):
+        """Test una expresión regular inválida falla al construir la selección"""
+        with pytest.raises(ColumnSelectionError):
+            ColumnSelection(pattern="precio(")
+
+    def test_resolve(self):
+        """Test nombres y regex se combinan en el orden del encabezado"""
+        header = ["id", "nombre", "precio_lista", "precio_final"]
+        selection = ColumnSelection(["nombre"], "^precio")
+        assert selection.resolve(header) == ["nombre", "precio_lista", "precio_final"]
+        with pytest.raises(ColumnSelectionError, match="inexistentes"):
+            ColumnSelection(["id", "costo"]).resolve(header)
+        with pytest.raises(ColumnSelectionError, match="Ninguna"):
+            ColumnSelection(pattern="^costo").resolve(header)
+
+
+class TestProcessFileProjection:
+    """Tests para process_file con columns"""
+
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_only_selected_columns_analyzed(self, streaming):
+        """Test solo se analizan las columnas pedidas y el esquema sigue completo"""
+        selection = ColumnSelection(["nombre"], "^precio")
+        result = DataProcessor.process_file(CSV, "data.csv", streaming=streaming, columns=selection)
+
+        resumen = result["resumen_general"]
+        assert resumen["columnas"] == ["id", "nombre", "precio_lista", "precio_final", "notas"]
+        assert resumen["total_columnas"] == 5
+        assert resumen["columnas_analizadas"] == ["nombre", "precio_lista", "precio_final"]
+        assert list(result["analisis_columnas"]) == resumen["columnas_analizadas"]
+        assert set(result["estadisticas_pandas"]) == {"nombre", "precio_lista", "precio_final"}
+        assert result["analisis_columnas"]["precio_final"]["estadisticas"]["maximo"] == 27
+
+    def test_unknown_column_before_parsing(self, monkeypatch):
+        """Test un nombre inexistente falla con la lectura del encabezado, sin parsear los datos"""
+        calls = []
+        read_csv = pd.read_csv
+        monkeypatch.setattr(pd, "read_csv", lambda *a, **kw: calls.append(kw) or read_csv(*a, **kw))
+
+        with pytest.raises(ColumnSelectionError):
+            DataProcessor.process_file(CSV, "data.csv", columns=ColumnSelection(["costo"]))
+        assert calls == [{"nrows": 0}]
+
+    def test_non_seekable_stream(self):
+        """Test en un stream el encabezado se anota durante la lectura y se valida igual"""
+        result = DataProcessor.process_file(
+            NonSeekable(CSV), "data.csv", columns=ColumnSelection(["notas"])
+        )
+        assert result["resumen_general"]["columnas_analizadas"] == ["notas"]
+        assert len(result["resumen_general"]["columnas"]) == 5
+
+        with pytest.raises(ColumnSelectionError):
+            DataProcessor.process_file(
+                NonSeekable(CSV), "data.csv", columns=ColumnSelection(["costo"])
+            )
+
+    def test_pyarrow_projection(self):
+        """Test el parser pyarrow recibe la selección como include_columns"""
+        pytest.importorskip("pyarrow")
+        result = DataProcessor.process_file(CSV, "data.csv", streaming=False, parser="pyarrow",
+                                            columns=ColumnSelection(pattern="^precio"))
+        assert list(result["analisis_columnas"]) == ["precio_lista", "precio_final"]
+
+    def test_excel_selection_per_sheet(self):
+        """Test en un libro la selección se valida contra todas las hojas"""
+        buffer = BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            pd.read_csv(BytesIO(CSV)).to_excel(writer, sheet_name="ventas", index=False)
+            clientes = pd.DataFrame({"cliente": ["x"], "edad": [30]})
+            clientes.to_excel(writer, sheet_name="clientes", index=False)
+
+        result = DataProcessor.process_file(buffer.getvalue(), "libro.xlsx",
+                                            columns=ColumnSelection(["precio_final", "edad"]))
+
+        hojas = result["resumen_general"]["hojas"]
+        assert list(hojas["ventas"]["analisis_columnas"]) == ["precio_final"]
+        assert hojas["ventas"]["total_columnas"] == 5
+        assert list(hojas["clientes"]["analisis_columnas"]) == ["edad"]
+
+        with pytest.raises(ColumnSelectionError):
+            DataProcessor.process_file(
+                buffer.getvalue(), "libro.xlsx", columns=ColumnSelection(["costo"])
+            )
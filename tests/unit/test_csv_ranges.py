@@ -0,0 +1,137 @@
+import pytest
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from io import BufferedReader
+from unittest.mock import patch
+
+from app.services.column_selection import ColumnSelection
+from app.services.csv_ranges import CsvRangeSplitter, RangeReader, scan_range
+from app.services.data_processor import DataProcessor
+from app.services.process_pool import ProcessingPool
+from app.services.upload_service import UploadSpool
+
+
+@pytest.fixture
+def quoted_csv(tmp_path):
+    """CSV con saltos de línea, comas y comillas escapadas dentro de campos entre comillas"""
+    rng = np.random.default_rng(0)
+    n = 5_000
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "valor": rng.normal(100, 10, n),
+        "nota": rng.choice(['linea 1\nlinea 2', 'dijo "hola"', 'simple', 'a,b', '"\n"'], n),
+        "grupo": rng.choice(["x", "y", "z"], n)
+    })
+    path = tmp_path / "datos.csv"
+    df.to_csv(path, index=False)
+    return str(path), df
+
+
+def split(path, parts):
+    header = CsvRangeSplitter.header(path)
+    size = len(open(path, "rb").read())
+    offsets = CsvRangeSplitter.candidates(len(header), size, parts)
+    scans = [scan_range(path, start, end) for start, end in zip(offsets, offsets[1:] + [size])]
+    return header, CsvRangeSplitter.resolve(offsets, scans, size)
+
+
+class TestCsvRangeSplitter:
+    """Tests para el split de un CSV en rangos alineados a filas"""
+
+    @pytest.mark.parametrize("parts", [1, 4, 13])
+    def test_ranges_parse_to_the_same_rows(self, quoted_csv, parts):
+        """Test los rangos cubren el archivo y cada uno parsea filas completas, aun con comillas"""
+        path, df = quoted_csv
+        header, ranges = split(path, parts)
+
+        assert header == b"id,valor,nota,grupo\n"
+        assert ranges[0][0] == len(header)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        frames = [
+            pd.read_csv(BufferedReader(RangeReader(path, start, end, header)))
+            for start, end in ranges
+        ]
+        pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), df)
+
+    def test_range_without_boundary_joins_previous(self, tmp_path):
+        """Test un rango que cae entero dentro de un campo entre comillas se une al anterior"""
+        path = tmp_path / "largo.csv"
+        path.write_bytes(b'a,b\n1,"' + b"x\n" * 200 + b'"\n2,y\n')
+
+        header, ranges = split(str(path), 8)
+
+        frames = [
+            pd.read_csv(BufferedReader(RangeReader(str(path), s, e, header))) for s, e in ranges
+        ]
+        assert pd.concat(frames)["a"].tolist() == [1, 2]
+
+
+class TestProcessCsvRanges:
+    """Tests para el map-reduce de process_csv_ranges"""
+
+    @pytest.mark.parametrize("parts", [1, 6])
+    def test_matches_streaming(self, quoted_csv, parts):
+        """Test combinar los rangos da el mismo análisis que la lectura secuencial"""
+        path, _ = quoted_csv
+        with open(path, "rb") as f:
+            expected = DataProcessor.process_file(f, "datos.csv", streaming=True)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            result = DataProcessor.process_csv_ranges(path, "datos.csv", executor, parts)
+
+        assert result["resumen_general"].pop("rangos") == parts
+        assert result["resumen_general"] == expected["resumen_general"]
+        for col in ("nota", "grupo"):
+            assert result["analisis_columnas"][col] == expected["analisis_columnas"][col]
+        # Los cuantiles salen de sketches combinados: iguales dentro de la cota de error de rango
+        for col in ("id", "valor"):
+            got, want = result["analisis_columnas"][col], expected["analisis_columnas"][col]
+            assert got["valores_unicos"] == want["valores_unicos"]
+            for key in ("promedio", "desviacion_estandar", "minimo", "maximo"):
+                assert got["estadisticas"][key] == pytest.approx(want["estadisticas"][key])
+            spread = want["estadisticas"]["maximo"] - want["estadisticas"]["minimo"]
+            median = want["estadisticas"]["mediana"]
+            assert got["estadisticas"]["mediana"] == pytest.approx(median, abs=0.05 * spread)
+
+    def test_types_fixed_from_head(self, tmp_path):
+        """Test una columna numérica al principio se analiza como numérica en todos los rangos"""
+        path = tmp_path / "mixto.csv"
+        rows = [f"{i},{i}" for i in range(2_000)] + [f"{i},n/d" for i in range(2_000, 2_010)]
+        path.write_text("id,medida\n" + "\n".join(rows) + "\n")
+
+        with ThreadPoolExecutor(max_workers=2) as executor, \
+                patch('app.core.config.settings.CSV_CHUNK_ROWS', 500):
+            result = DataProcessor.process_csv_ranges(str(path), "mixto.csv", executor, 4)
+
+        medida = result["analisis_columnas"]["medida"]
+        assert medida["tipo_datos"] == "Numérico"
+        assert medida["estadisticas"]["maximo"] == 1_999
+
+    def test_column_selection(self, quoted_csv):
+        """Test la selección de columnas llega a cada rango como usecols"""
+        path, _ = quoted_csv
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = DataProcessor.process_csv_ranges(path, "datos.csv", executor, 3,
+                                                      columns=ColumnSelection(["valor"]))
+        assert list(result["analisis_columnas"]) == ["valor"]
+        assert result["resumen_general"]["columnas"] == ["id", "valor", "nota", "grupo"]
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_pool_splits_large_csv(self, quoted_csv):
+        """Test en modo procesos un CSV sobre el umbral se analiza por rangos en el pool"""
+        path, df = quoted_csv
+        pool = ProcessingPool(max_workers=2, max_queue=1)
+        spool = UploadSpool("datos.csv", "text/csv")
+        spool.write(open(path, "rb").read())
+        try:
+            with patch('app.core.config.settings.CSV_PARALLEL_MIN_MB', 0):
+                result = await pool.process_spool(spool)
+        finally:
+            spool.close()
+            pool.shutdown()
+
+        assert result["resumen_general"]["rangos"] == 2
+        assert result["resumen_general"]["total_filas"] == len(df)
+        assert pool.queue_depth == 0
@@ -34,8 +34,8 @@ class TestEdgeCases:
 
         result = DataProcessor._get_column_type(bool_series)
 
-        # Debería ser "Otro"
-        assert result == "Otro"
+        # Los booleanos tienen su propio tipo
+        assert result == "Booleano"
 
     def test_analyze_text_column_with_single_value(self):
         """Test análisis de columna de texto con un solo valor único"""
@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import pandas as pd
+from io import BytesIO
+
+from app.services.data_processor import DataProcessor
+from app.services.frame_compactor import FrameCompactor
+
+
+@pytest.fixture
+def empleados_csv_bytes():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "edad": rng.integers(18, 65, n),
+        "salario": rng.normal(50000, 8000, n).round(3),
+        "departamento": rng.choice(["IT", "RRHH", "Ventas", "Marketing"], n),
+        "remoto": rng.choice(["Sí", "No"], n),
+    })
+    df.loc[::9, "departamento"] = None
+    return df.to_csv(index=False).encode("utf-8")
+
+
+class TestFrameCompactor:
+    """Tests para la carga compacta"""
+
+    def test_compact_dtypes(self, empleados_csv_bytes):
+        """Test category para texto de pocos distintos y enteros angostos"""
+        df = DataProcessor._read_csv_compact(BytesIO(empleados_csv_bytes))
+
+        assert isinstance(df["departamento"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["remoto"].dtype, pd.CategoricalDtype)
+        assert df["edad"].dtype == np.int8
+        # salario no entra en float32 sin perder precisión
+        assert df["salario"].dtype == np.float64
+
+    def test_float_downcast_only_when_lossless(self):
+        """Test float32 solo si todos los valores se conservan"""
+        exact = pd.Series([0.5, 1.25, np.nan, 1024.0])
+        lossy = pd.Series([0.1, 1.25])
+
+        assert FrameCompactor._downcast_float(exact).dtype == np.float32
+        assert FrameCompactor._downcast_float(lossy).dtype == np.float64
+
+    def test_footprint_reported(self, empleados_csv_bytes):
+        """Test la respuesta informa la memoria antes y después de compactar"""
+        result = DataProcessor.process_file(empleados_csv_bytes, "empleados.csv", streaming=False)
+        memoria = result["resumen_general"]["memoria"]
+
+        plain = pd.read_csv(BytesIO(empleados_csv_bytes))
+        assert memoria["antes_bytes"] == plain.memory_usage(index=False, deep=True).sum()
+        assert memoria["despues_bytes"] < memoria["antes_bytes"] / 3
+
+    def test_categorical_analysis_matches_object(self, empleados_csv_bytes):
+        """Test el bincount sobre códigos da los mismos conteos que value_counts"""
+        plain = pd.read_csv(BytesIO(empleados_csv_bytes))
+        result = DataProcessor.process_file(empleados_csv_bytes, "empleados.csv", streaming=False)
+        depto = result["analisis_columnas"]["departamento"]
+
+        expected = plain["departamento"].value_counts()
+        assert depto["tipo_datos"] == "Categórico"
+        assert depto["valores_vacios"] == plain["departamento"].isna().sum()
+        assert depto["estadisticas"]["valores_unicos"] == len(expected)
+        assert depto["estadisticas"]["valor_mas_comun"] == expected.index[0]
+        assert depto["estadisticas"]["frecuencia"] == expected.iloc[0]
+
+    def test_categorical_ties_keep_first_appearance(self):
+        """Test con conteos empatados gana el valor que aparece primero, como en value_counts"""
+        csv = b"remoto\n" + b"\n".join([b"SI", b"NO", b"NO", b"SI"] * 5)
+        result = DataProcessor.process_file(csv, "empleados.csv", streaming=False)
+        remoto = result["analisis_columnas"]["remoto"]
+
+        assert remoto["estadisticas"]["valor_mas_comun"] == "SI"
+        assert result["estadisticas_pandas"]["remoto"]["top"] == "SI"
@@ -0,0 +1,164 @@
+import json
+import uuid
+
+import pytest
+import redis
+from unittest.mock import MagicMock, Mock, patch
+
+from app.core.config import settings
+from app.services.job_queue import JobQueue, QueuedTask
+
+
+@pytest.fixture
+def redis_client():
+    client = Mock()
+    client.pipeline.return_value = MagicMock()
+    return client
+
+
+def _fields(task, attempts=0):
+    return {"task": json.dumps(task), "attempts": str(attempts)}
+
+
+class TestJobQueue:
+    """Tests unitarios para JobQueue con un cliente de redis simulado"""
+
+    def test_ensure_group_ignores_existing(self, redis_client):
+        """Test crear el grupo dos veces no es un error"""
+        redis_client.xgroup_create.side_effect = redis.ResponseError(
+            "BUSYGROUP Consumer Group name already exists"
+        )
+
+        JobQueue(redis_client).ensure_group()
+
+        redis_client.xgroup_create.assert_called_once_with(
+            settings.JOB_STREAM, settings.JOB_GROUP, id="0", mkstream=True
+        )
+
+    def test_enqueue_serializes_task(self, redis_client):
+        """Test el trabajo va como JSON con sus intentos y el stream queda acotado"""
+        JobQueue(redis_client).enqueue({"file_id": "a", "filename": "x.csv"})
+
+        stream, fields = redis_client.xadd.call_args.args
+        assert stream == settings.JOB_STREAM
+        assert json.loads(fields["task"]) == {"file_id": "a", "filename": "x.csv"}
+        assert fields["attempts"] == 0
+        assert redis_client.xadd.call_args.kwargs["maxlen"] == settings.JOB_STREAM_MAXLEN
+
+    def test_read_decodes_messages(self, redis_client):
+        """Test read entrega los mensajes nuevos del grupo como QueuedTask"""
+        redis_client.xreadgroup.return_value = [
+            [settings.JOB_STREAM, [("1-0", _fields({"file_id": "a"}, 1))]]
+        ]
+
+        messages = JobQueue(redis_client).read("w1", block_ms=10)
+
+        received = [(m.message_id, m.task, m.attempts) for m in messages]
+        assert received == [("1-0", {"file_id": "a"}, 1)]
+        redis_client.xreadgroup.assert_called_once_with(
+            settings.JOB_GROUP, "w1", {settings.JOB_STREAM: ">"}, count=1, block=10
+        )
+
+    def test_claim_stalled_counts_deliveries(self, redis_client):
+        """Test un mensaje reclamado suma como intentos las entregas previas sin ack"""
+        redis_client.xautoclaim.return_value = ["0-0", [("1-0", _fields({"file_id": "a"}))], []]
+        redis_client.xpending_range.return_value = [{"message_id": "1-0", "times_delivered": 3}]
+
+        messages = JobQueue(redis_client).claim_stalled("w2", min_idle_ms=100)
+
+        assert messages[0].attempts == 2
+        redis_client.xautoclaim.assert_called_once_with(
+            settings.JOB_STREAM, settings.JOB_GROUP, "w2", 100, start_id="0-0", count=1
+        )
+
+    def test_claim_stalled_acks_deleted_entries(self, redis_client):
+        """Test un mensaje pendiente que ya no está en el stream solo se saca del PEL"""
+        redis_client.xautoclaim.return_value = ["0-0", [("1-0", None)]]
+
+        assert JobQueue(redis_client).claim_stalled("w2") == []
+        redis_client.xack.assert_called_once_with(settings.JOB_STREAM, settings.JOB_GROUP, "1-0")
+
+    def test_ack_removes_message(self, redis_client):
+        JobQueue(redis_client).ack("1-0")
+
+        redis_client.xack.assert_called_once_with(settings.JOB_STREAM, settings.JOB_GROUP, "1-0")
+        redis_client.xdel.assert_called_once_with(settings.JOB_STREAM, "1-0")
+
+    def test_retry_requeues_in_transaction(self, redis_client):
+        """Test un fallo con intentos disponibles reencola y hace ack en la misma transacción"""
+        pipe = redis_client.pipeline.return_value
+
+        retrying = JobQueue(redis_client).retry(QueuedTask("1-0", {"file_id": "a"}, 0), "boom")
+
+        assert retrying is True
+        redis_client.pipeline.assert_called_once_with(transaction=True)
+        stream, fields = pipe.xadd.call_args.args
+        assert stream == settings.JOB_STREAM and fields["attempts"] == 1
+        pipe.xack.assert_called_once()
+        pipe.execute.assert_called_once()
+        redis_client.xadd.assert_not_called()
+
+    def test_retry_dead_letters_last_attempt(self, redis_client):
+        """Test el último intento fallido va al stream de dead-letter con el error"""
+        pipe = redis_client.pipeline.return_value
+        message = QueuedTask("1-0", {"file_id": "a"}, settings.JOB_MAX_ATTEMPTS - 1)
+
+        assert JobQueue(redis_client).retry(message, "boom") is False
+
+        stream, fields = pipe.xadd.call_args.args
+        assert stream == settings.JOB_DEAD_LETTER_STREAM
+        assert fields["error"] == "boom"
+        assert fields["attempts"] == settings.JOB_MAX_ATTEMPTS
+        pipe.xdel.assert_called_once_with(settings.JOB_STREAM, "1-0")
+
+
+def _local_redis():
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True,
+                                      socket_connect_timeout=0.5)
+        client.ping()
+        return client
+    except redis.RedisError:
+        return None
+
+
+@pytest.mark.skipif(_local_redis() is None, reason="Requiere un Redis en REDIS_URL")
+class TestJobQueueRedis:
+    """Contra un Redis real: entrega única en el grupo, reclamo de pendientes y dead-letter"""
+
+    @pytest.fixture
+    def queue(self):
+        client = _local_redis()
+        suffix = uuid.uuid4().hex
+        with patch.object(settings, "JOB_STREAM", f"test:jobs:{suffix}"), \
+                patch.object(settings, "JOB_DEAD_LETTER_STREAM", f"test:jobs:{suffix}:dead"):
+            queue = JobQueue(client)
+            queue.ensure_group()
+            yield queue
+        client.delete(queue.stream, queue.dead_letter_stream)
+
+    def test_each_message_goes_to_one_consumer(self, queue):
+        queue.enqueue({"file_id": "a"})
+
+        assert len(queue.read("w1")) == 1
+        assert queue.read("w2") == []
+
+    def test_stalled_message_is_claimed(self, queue):
+        queue.enqueue({"file_id": "a"})
+        queue.read("w1")
+
+        claimed = queue.claim_stalled("w2", min_idle_ms=0)
+
+        assert claimed[0].task == {"file_id": "a"}
+        assert claimed[0].attempts == 1
+        queue.ack(claimed[0].message_id)
+        assert queue.client.xlen(queue.stream) == 0
+
+    def test_failures_end_in_dead_letter(self, queue):
+        queue.enqueue({"file_id": "a"})
+        for _ in range(settings.JOB_MAX_ATTEMPTS):
+            message = queue.read("w1")[0]
+            queue.retry(message, "boom")
+
+        assert queue.client.xlen(queue.stream) == 0
+        assert queue.client.xlen(queue.dead_letter_stream) == 1
@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.job_service import JobService, JobState, JobQueueFullError
+
+
+@pytest.fixture
+def job_cache():
+    """Cache en memoria que registra cada estado guardado"""
+    cache = AsyncMock()
+    cache.history = []
+    cache.set_job.side_effect = lambda file_id, job: cache.history.append(dict(job))
+    return cache
+
+
+class TestJobService:
+    """Tests unitarios para JobService"""
+
+    @pytest.mark.asyncio
+    async def test_create_registers_subido(self, job_cache):
+        """Test crear un trabajo lo guarda como Subido"""
+        service = JobService(job_cache, max_pending=2)
+
+        job = await service.create("id-1", "test.csv", 10)
+
+        assert job["estado"] == JobState.SUBIDO
+        assert job["progreso"] == 0
+        job_cache.set_job.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_create_rejects_when_queue_full(self, job_cache):
+        """Test la cola acotada rechaza trabajos de más"""
+        service = JobService(job_cache, max_pending=1)
+        await service.create("id-1", "a.csv", 1)
+
+        with pytest.raises(JobQueueFullError):
+            await service.create("id-2", "b.csv", 1)
+
+    @pytest.mark.asyncio
+    async def test_create_releases_slot_when_redis_fails(self, job_cache):
+        """Test si no se puede registrar el trabajo su lugar en la cola se libera"""
+        service = JobService(job_cache, max_pending=1)
+        job_cache.set_job.side_effect = ConnectionError("redis caído")
+
+        with pytest.raises(ConnectionError):
+            await service.create("id-1", "a.csv", 1)
+
+        job_cache.set_job.side_effect = None
+        job = await service.create("id-2", "b.csv", 1)
+        assert job["file_id"] == "id-2"
+
+    @pytest.mark.asyncio
+    async def test_run_success_transitions(self, job_cache):
+        """Test el trabajo pasa por Procesando y termina en Procesado con stats en cache"""
+        service = JobService(job_cache, max_pending=1)
+        job = await service.create("id-1", "test.csv", 10)
+
+        async def process():
+            return {"resumen_general": {}}
+
+        result = await service.run(job, process)
+
+        estados = [h["estado"] for h in job_cache.history]
+        assert estados[0] == JobState.SUBIDO
+        assert JobState.PROCESANDO in estados
+        assert result["estado"] == JobState.PROCESADO
+        assert result["progreso"] == 100
+        assert "procesamiento_s" in result["tiempos"]
+        job_cache.set_stats.assert_awaited_once_with("id-1", {"resumen_general": {}})
+
+        # El lugar en la cola se libera al terminar
+        await service.create("id-2", "otro.csv", 10)
+
+    @pytest.mark.asyncio
+    async def test_run_error_transition(self, job_cache):
+        """Test un fallo de procesamiento deja el trabajo en Error"""
+        service = JobService(job_cache, max_pending=1)
+        job = await service.create("id-1", "test.csv", 10)
+
+        async def failing():
+            raise ValueError("CSV inválido")
+
+        result = await service.run(job, failing)
+
+        assert result["estado"] == JobState.ERROR
+        assert "CSV inválido" in result["error"]
+        job_cache.set_stats.assert_not_called()
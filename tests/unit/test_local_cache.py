@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from app.services.local_cache import LocalCache
+
+
+class TestLocalCache:
+    """Tests unitarios para el cache L1 en memoria"""
+
+    def test_lru_eviction_by_bytes(self):
+        """Test se desalojan las menos usadas hasta que entra la nueva, contando bytes"""
+        cache = LocalCache(max_bytes=100)
+        cache.set("a", {"v": 1}, 40, 60)
+        cache.set("b", {"v": 2}, 40, 60)
+        assert cache.get("a") == {"v": 1}  # "b" pasa a ser la menos usada
+
+        cache.set("c", {"v": 3}, 50, 60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": 1}
+        metrics = cache.metrics()
+        assert metrics["bytes"] == 90
+        assert metrics["desalojos"] == 1
+
+    def test_too_large_is_not_cached(self):
+        cache = LocalCache(max_bytes=10)
+
+        assert cache.set("a", "x", 11, 60) is False
+        assert cache.get("a") is None
+
+    def test_entries_expire(self):
+        cache = LocalCache(max_bytes=100)
+        with patch("app.services.local_cache.time.monotonic", return_value=1000.0):
+            cache.set("a", "x", 1, 5)
+        with patch("app.services.local_cache.time.monotonic", return_value=1004.0):
+            assert cache.get("a") == "x"
+        with patch("app.services.local_cache.time.monotonic", return_value=1005.0):
+            assert cache.get("a") is None
+        assert cache.metrics()["entradas"] == 0
+
+    def test_invalidation_discards_reads_started_before(self):
+        """Test un valor leído antes de una invalidación no se guarda"""
+        cache = LocalCache(max_bytes=100)
+        version = cache.version
+
+        cache.delete("a")
+
+        assert cache.set("a", "viejo", 1, 60, version) is False
+        assert cache.set("a", "nuevo", 1, 60, cache.version) is True
+
+    def test_hit_ratio(self):
+        cache = LocalCache(max_bytes=100)
+        assert cache.metrics()["tasa_aciertos"] is None
+
+        cache.set("a", "x", 1, 60)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+
+        metrics = cache.metrics()
+        assert (metrics["aciertos"], metrics["fallos"]) == (2, 1)
+        assert metrics["tasa_aciertos"] == 0.6667
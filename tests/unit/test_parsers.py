@@ -0,0 +1,80 @@
+import pytest
+import pandas as pd
+from io import BytesIO
+from unittest.mock import patch
+
+from app.services.data_processor import DataProcessor
+from app.services.parsers import (
+    get_parser, ParserUnavailableError, ParserBackend, PARSERS, PandasParser, NA_VALUES
+)
+
+
+@pytest.fixture
+def parser_csv_bytes():
+    """CSV con los casos donde los motores difieren: fechas, nulos, texto vacío y enteros con
+    nulos"""
+    return (
+        "id,fecha,nota,monto,depto\n"
+        "1,2023-01-01,hola,10,IT\n"
+        "2,2023-01-02,,NA,RRHH\n"
+        "3,2023-01-03,\"con, coma\",30,IT\n"
+        "4,,null,40,\n"
+    ).encode("utf-8")
+
+
+class TestParsers:
+    """Tests para la selección de parsers"""
+
+    def test_get_parser_by_name(self):
+        """Test elegir el parser por nombre o por configuración"""
+        assert get_parser("pandas").name == "pandas"
+        with patch('app.core.config.settings.PARSER_BACKEND', "pandas"):
+            assert get_parser().name == "pandas"
+
+    def test_auto_prefers_pyarrow_when_available(self):
+        """Test auto usa pyarrow si está instalado y si no cae a pandas"""
+        with patch.object(PARSERS["pyarrow"], "available", return_value=True):
+            assert get_parser("auto").name == "pyarrow"
+        with patch.object(PARSERS["pyarrow"], "available", return_value=False):
+            assert get_parser("auto").name == "pandas"
+
+    def test_unknown_or_missing_parser(self):
+        """Test parser desconocido o sin su dependencia"""
+        with pytest.raises(ParserUnavailableError):
+            get_parser("polars")
+        with patch.object(PARSERS["pyarrow"], "available", return_value=False):
+            with pytest.raises(ParserUnavailableError):
+                get_parser("pyarrow")
+
+    def test_pandas_parser_reads_csv(self, parser_csv_bytes):
+        """Test el parser de referencia lee igual que pd.read_csv"""
+        df = PandasParser().read_csv(BytesIO(parser_csv_bytes))
+        pd.testing.assert_frame_equal(df, pd.read_csv(BytesIO(parser_csv_bytes)))
+
+    def test_backend_requires_read_csv(self):
+        """Test un backend sin read_csv no se puede instanciar"""
+        with pytest.raises(TypeError):
+            ParserBackend()
+
+    def test_na_values_match_pandas_defaults(self):
+        """Test la lista de nulos para pyarrow son exactamente los que read_csv toma como nulos"""
+        rows = "".join(f'"{value}",x\n' for value in NA_VALUES)
+        csv = ("texto,control\n" + rows + '"NAN",x\n').encode()
+
+        df = pd.read_csv(BytesIO(csv))
+
+        assert df["texto"].iloc[:-1].isna().all()
+        assert df["texto"].iloc[-1] == "NAN"
+
+    def test_pyarrow_matches_pandas(self, parser_csv_bytes):
+        """Test pyarrow produce el mismo DataFrame y el mismo análisis que pandas"""
+        pytest.importorskip("pyarrow")
+        expected = DataProcessor._read_csv_compact(BytesIO(parser_csv_bytes), PARSERS["pandas"])
+        actual = DataProcessor._read_csv_compact(BytesIO(parser_csv_bytes), PARSERS["pyarrow"])
+        pd.testing.assert_frame_equal(actual, expected)
+
+        a = DataProcessor.process_file(parser_csv_bytes, "test.csv", streaming=False,
+                                       parser="pandas")
+        b = DataProcessor.process_file(parser_csv_bytes, "test.csv", streaming=False,
+                                       parser="pyarrow")
+        assert a["analisis_columnas"] == b["analisis_columnas"]
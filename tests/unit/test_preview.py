@@ -0,0 +1,108 @@
+import pytest
+import numpy as np
+import pandas as pd
+from io import BytesIO
+from unittest.mock import patch
+
+from app.services.column_selection import ColumnSelection
+from app.services.data_processor import DataProcessor
+from app.services.preview import PreviewSampler
+
+
+@pytest.fixture
+def large_frame():
+    rng = np.random.default_rng(3)
+    n = 50_000
+    return pd.DataFrame({
+        "monto": rng.normal(100, 15, n),
+        "cantidad": rng.integers(0, 20, n),
+        "canal": rng.choice(["web", "tienda", None], n)
+    })
+
+
+class TestPreviewSampler:
+    """Tests para el muestreo del modo preview"""
+
+    def test_stream_sample_is_uniform(self):
+        """Test el reservorio por claves toma filas de todo el archivo y cuenta el total exacto"""
+        frame = pd.DataFrame({"i": np.arange(100_000)})
+        chunks = (frame.iloc[start:start + 7_000] for start in range(0, len(frame), 7_000))
+
+        sample = PreviewSampler.sample_stream(chunks, 1_000)
+
+        assert len(sample.frame) == 1_000
+        assert sample.total_rows == 100_000 and not sample.exact
+        assert sample.frame["i"].is_monotonic_increasing
+        # Una muestra uniforme tiene promedio cerca de la mitad del rango
+        assert abs(sample.frame["i"].mean() - 50_000) < 3_000
+
+    def test_small_stream_is_exact(self):
+        """Test si el archivo entra en la muestra el resultado es exacto"""
+        sample = PreviewSampler.sample_stream([pd.DataFrame({"a": [1, 2, 3]})], 10)
+        assert sample.exact
+        assert sample.frame["a"].tolist() == [1, 2, 3]
+
+    def test_offsets_estimate_total_rows(self, large_frame):
+        """Test el muestreo por offsets estima el total de filas con el largo de las líneas"""
+        source = BytesIO(large_frame.to_csv(index=False).encode())
+
+        sample = PreviewSampler.sample_offsets(source, 2_000)
+
+        assert list(sample.frame.columns) == ["monto", "cantidad", "canal"]
+        assert 1_500 < len(sample.frame) <= 2_000
+        assert sample.total_rows == pytest.approx(len(large_frame), rel=0.05)
+        assert source.tell() == 0
+
+    def test_intervals_cover_population(self, large_frame):
+        """Test los intervalos de promedio y mediana contienen el valor del archivo completo"""
+        values = large_frame["monto"].to_numpy()
+        sample = values[np.random.default_rng(0).choice(len(values), 2_000, replace=False)]
+
+        low, high = PreviewSampler.mean_interval(sample, len(values), 0.99)
+        assert low < values.mean() < high
+        low, high = PreviewSampler.median_interval(sample, 0.99)
+        assert low < np.median(values) < high
+
+        # Con la muestra igual a la población el intervalo del promedio se cierra
+        low, high = PreviewSampler.mean_interval(values, len(values), 0.95)
+        assert low == pytest.approx(high)
+
+
+class TestPreviewFile:
+    """Tests para DataProcessor.preview_file"""
+
+    @pytest.mark.parametrize("offset_min_mb,method", [(1_000, "reservorio"), (0, "offsets")])
+    def test_preview_marks_estimates(self, large_frame, offset_min_mb, method):
+        """Test el resultado trae totales estimados, intervalos y la marca de aproximado"""
+        csv = large_frame.to_csv(index=False).encode()
+        with patch('app.core.config.settings.PREVIEW_OFFSET_SAMPLING_MIN_MB', offset_min_mb):
+            result = DataProcessor.preview_file(csv, "data.csv", rows=5_000)
+
+        resumen = result["resumen_general"]
+        assert resumen["aproximado"] is True
+        assert resumen["metodo_muestreo"] == method
+        assert resumen["total_filas"] == pytest.approx(len(large_frame), rel=0.05)
+
+        monto = result["analisis_columnas"]["monto"]
+        assert monto["aproximado"] is True
+        assert monto["valores_muestra"] <= 5_000
+        low, high = monto["intervalos_confianza"]["promedio"]
+        assert low < monto["estadisticas"]["promedio"] < high
+        canal = result["analisis_columnas"]["canal"]
+        assert canal["valores_vacios"] == pytest.approx(large_frame["canal"].isna().sum(), rel=0.1)
+        assert "intervalos_confianza" not in canal
+
+    def test_preview_with_columns_and_excel(self, large_frame):
+        """
+        Test la vista previa respeta la selección de columnas y muestrea la primera hoja de un
+        libro
+        """
+        buffer = BytesIO()
+        large_frame.head(500).to_excel(buffer, index=False)
+
+        result = DataProcessor.preview_file(buffer.getvalue(), "libro.xlsx", rows=100,
+                                            columns=ColumnSelection(["monto"]))
+
+        assert result["resumen_general"]["columnas_analizadas"] == ["monto"]
+        assert result["resumen_general"]["total_filas"] == 500
+        assert result["analisis_columnas"]["monto"]["valores_muestra"] == 100
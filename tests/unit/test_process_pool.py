@@ -0,0 +1,91 @@
+import asyncio
+import io
+import threading
+import pytest
+import pandas as pd
+
+from app.services.process_pool import ProcessingPool, PoolSaturatedError
+from app.services.upload_service import UploadSpool
+
+
+class TestProcessingPool:
+    """Tests unitarios para ProcessingPool"""
+
+    @pytest.mark.asyncio
+    async def test_run_in_threads_when_no_workers(self):
+        """Test con 0 procesos el trabajo corre en un hilo, fuera del event loop"""
+        pool = ProcessingPool(max_workers=0, max_queue=2)
+
+        thread_name = await pool.run(lambda: threading.current_thread().name)
+
+        assert thread_name != threading.current_thread().name
+        assert pool.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_rejects(self):
+        """Test con la cola llena se lanza PoolSaturatedError con Retry-After"""
+        pool = ProcessingPool(max_workers=0, max_queue=1)
+        release = threading.Event()
+
+        first = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(PoolSaturatedError) as exc_info:
+            await pool.run(lambda: None)
+        assert exc_info.value.retry_after > 0
+
+        release.set()
+        await first
+
+    @pytest.mark.asyncio
+    async def test_wait_mode_queues_instead_of_rejecting(self):
+        """Test wait=True espera un lugar libre en vez de fallar"""
+        pool = ProcessingPool(max_workers=0, max_queue=1)
+        release = threading.Event()
+
+        first = asyncio.ensure_future(pool.run(release.wait))
+        second = asyncio.ensure_future(pool.run(lambda: "ok", wait=True))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+
+        release.set()
+        await first
+        assert await second == "ok"
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_process_spool_in_child_process(self, sample_csv_bytes):
+        """Test en modo procesos el hijo lee el spool por ruta"""
+        pool = ProcessingPool(max_workers=1, max_queue=2)
+        spool = UploadSpool("test.csv", "text/csv")
+        spool.write(sample_csv_bytes)
+        try:
+            result = await pool.process_spool(spool)
+        finally:
+            spool.close()
+            pool.shutdown()
+
+        assert result["resumen_general"]["total_filas"] == 5
+        assert spool.path is not None
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_workbook_sheets_in_parallel(self):
+        """Test cada hoja de un .xlsx se analiza como una tarea del pool y se combinan"""
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            pd.DataFrame({"a": [1, 2, 3]}).to_excel(writer, sheet_name="uno", index=False)
+            pd.DataFrame({"b": ["x", "y"]}).to_excel(writer, sheet_name="dos", index=False)
+
+        pool = ProcessingPool(max_workers=2, max_queue=1)
+        spool = UploadSpool("libro.xlsx", "application/vnd.ms-excel")
+        spool.write(buffer.getvalue())
+        try:
+            result = await pool.process_spool(spool)
+        finally:
+            spool.close()
+            pool.shutdown()
+
+        assert result["resumen_general"]["total_hojas"] == 2
+        assert result["resumen_general"]["hojas"]["dos"]["total_filas"] == 2
+        assert pool.queue_depth == 0
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+import redis
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.core.config import settings
+from app.services.single_flight import SingleFlight
+
+
+def _counting(value=b"pdf", delay=0.01):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return compute, calls
+
+
+def _shared_flight(acquired=True, holder=None):
+    """SingleFlight con un CacheService de mentira: lease de Redis y resultados con await"""
+    client = Mock()
+    lease = client.lock.return_value
+    lease.acquire = AsyncMock(return_value=acquired)
+    lease.release = AsyncMock()
+    client.get = AsyncMock(return_value=holder)
+    client.set = AsyncMock()
+    client.mget = AsyncMock()
+    return SingleFlight(Mock(client=client)), client
+
+
+class TestSingleFlight:
+    """Tests unitarios para el single-flight por clave"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_computation(self):
+        flights = SingleFlight()
+        compute, calls = _counting()
+
+        results = await asyncio.gather(*(flights.run("pdf:a", compute) for _ in range(20)))
+
+        assert results == [b"pdf"] * 20
+        assert len(calls) == 1
+        assert flights.metrics() == {
+            "en_vuelo": 0, "calculos": 1, "compartidos": 19, "de_otra_replica": 0
+        }
+
+    @pytest.mark.asyncio
+    async def test_distinct_keys_and_later_calls_compute_again(self):
+        flights = SingleFlight()
+        compute, calls = _counting()
+
+        await asyncio.gather(flights.run("pdf:a", compute), flights.run("pdf:b", compute))
+        await flights.run("pdf:a", compute)
+
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_error_reaches_every_waiter(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("no hay stats")
+
+        runs = (flights.run("pdf:a", fail) for _ in range(3))
+        results = await asyncio.gather(*runs, return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flights.metrics()["en_vuelo"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_the_flight(self):
+        flights = SingleFlight()
+        compute, calls = _counting(delay=0.05)
+
+        first = asyncio.ensure_future(flights.run("pdf:a", compute))
+        second = asyncio.ensure_future(flights.run("pdf:a", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == b"pdf"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_leader_stores_result_under_its_token(self):
+        flights, client = _shared_flight(acquired=True)
+        compute, calls = _counting()
+
+        assert await flights.run("pdf:a", compute, shared=True) == b"pdf"
+
+        client.lock.assert_called_once_with(
+            "vuelo:pdf:a", timeout=settings.SINGLE_FLIGHT_LEASE_SECONDS
+        )
+        token = client.lock.return_value.acquire.call_args.kwargs["token"]
+        client.set.assert_awaited_once_with(f"vuelo:pdf:a:{token}", b"pdf",
+                                            ex=settings.SINGLE_FLIGHT_RESULT_TTL_SECONDS)
+        client.lock.return_value.release.assert_awaited_once()
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_follower_reads_result_from_other_replica(self):
+        flights, client = _shared_flight(acquired=False, holder=b"otro")
+        client.mget.side_effect = [[None, b"otro"], [b"pdf-remoto", None]]
+        compute, calls = _counting()
+
+        with patch.object(settings, "SINGLE_FLIGHT_POLL_SECONDS", 0):
+            assert await flights.run("pdf:a", compute, shared=True) == b"pdf-remoto"
+
+        client.mget.assert_awaited_with(["vuelo:pdf:a:otro", "vuelo:pdf:a"])
+        assert calls == []
+        assert flights.metrics()["de_otra_replica"] == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_follower_takes_over_when_leader_fails(self):
+        flights, client = _shared_flight(holder=b"otro")
+        client.lock.return_value.acquire.side_effect = [False, True]
+        client.mget.return_value = [None, None]  # El líder soltó el lease sin dejar resultado
+        compute, calls = _counting()
+
+        with patch.object(settings, "SINGLE_FLIGHT_POLL_SECONDS", 0):
+            assert await flights.run("pdf:a", compute, shared=True) == b"pdf"
+
+        assert len(calls) == 1
+        client.set.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_shared_without_redis_computes_locally(self):
+        flights, client = _shared_flight()
+        client.lock.return_value.acquire.side_effect = redis.exceptions.ConnectionError("caído")
+        compute, calls = _counting()
+
+        runs = (flights.run("pdf:a", compute, shared=True) for _ in range(5))
+        results = await asyncio.gather(*runs)
+
+        assert results == [b"pdf"] * 5
+        assert len(calls) == 1
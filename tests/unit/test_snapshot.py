@@ -0,0 +1,209 @@
+import os
+import shutil
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from minio.error import S3Error
+
+from app.core.config import settings
+from app.services.data_processor import DataProcessor
+from app.services.snapshot import DatasetSnapshot, SnapshotStore, MANIFEST, STAGING_MAX_AGE_SECONDS
+
+
+class FakeStorage:
+    """Bucket en un directorio: registra qué objetos se bajan"""
+
+    def __init__(self, root):
+        self.root = root
+        self.downloads = []
+
+    @staticmethod
+    def snapshot_object(file_id, name):
+        return f"snapshots/{file_id}/{name}"
+
+    def save_snapshot(self, file_id, directory, names):
+        target = os.path.join(self.root, "snapshots", file_id)
+        os.makedirs(target, exist_ok=True)
+        for name in names:
+            shutil.copy(os.path.join(directory, name), os.path.join(target, name))
+
+    def save_snapshot_bytes(self, file_id, name, data):
+        target = os.path.join(self.root, "snapshots", file_id)
+        os.makedirs(target, exist_ok=True)
+        with open(os.path.join(target, name), "wb") as f:
+            f.write(data)
+
+    def download_file(self, object_name, destination):
+        path = os.path.join(self.root, object_name)
+        if not os.path.exists(path):
+            raise S3Error("NoSuchKey", "The specified key does not exist", "", "", "", "", "")
+        self.downloads.append(object_name)
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, destination)
+
+
+@pytest.fixture
+def typed_frame():
+    return pd.DataFrame({
+        "id": pd.Series([1, 2, 3, 4], dtype=np.int16),
+        "monto": pd.Series([1.5, np.nan, 3.25, 4.0], dtype=np.float32),
+        "ciudad": pd.Series(["Lima", "Quito", None, "Lima"], dtype="category"),
+        "nota": ["ñandú", None, "", "texto largo"],
+        "fecha": pd.to_datetime(["2024-01-01", "2024-02-01", None, "2024-03-01"]),
+        "activo": [True, False, True, True],
+        "cantidad": pd.array([1, None, 3, 4], dtype="Int64")
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(FakeStorage(str(tmp_path / "bucket")), cache_dir=str(tmp_path / "cache"))
+
+
+class TestDatasetSnapshot:
+    """Tests unitarios para la foto columnar"""
+
+    def test_roundtrip_preserves_types(self, tmp_path, typed_frame):
+        """Test cada codificación vuelve con los mismos valores y dtypes"""
+        manifest = DatasetSnapshot.write(typed_frame, str(tmp_path), "datos.csv", lectura_s=0.5)
+
+        df = DatasetSnapshot.read(str(tmp_path), manifest)
+
+        pd.testing.assert_frame_equal(df, typed_frame)
+        assert manifest["filas"] == 4
+        assert manifest["lectura_s"] == 0.5
+        assert [c["codificacion"] for c in manifest["columnas"]] == [
+            "plano", "plano", "diccionario", "utf8", "plano", "plano", "plano"
+        ]
+        assert manifest["bytes"] == sum(c["bytes"] for c in manifest["columnas"])
+
+    def test_numeric_columns_are_memory_mapped(self, tmp_path, typed_frame):
+        """Test los numéricos se leen sobre el archivo, sin copiarlos a memoria"""
+        manifest = DatasetSnapshot.write(typed_frame, str(tmp_path), "datos.csv")
+
+        df = DatasetSnapshot.read(str(tmp_path), manifest, ["monto"])
+
+        assert df.columns.tolist() == ["monto"]
+        values = df["monto"].to_numpy()
+        assert not values.flags.writeable
+        while not isinstance(values, np.memmap):
+            values = values.base
+            assert values is not None
+
+    def test_process_file_writes_snapshot(self, tmp_path, sample_csv_bytes):
+        """Test un CSV cargado en memoria deja su foto con el tiempo de parseo"""
+        result = DataProcessor.process_file(sample_csv_bytes, "test.csv",
+                                            snapshot_dir=str(tmp_path))
+
+        manifest = result["snapshot"]
+        assert manifest["lectura_s"] is not None
+        assert [c["nombre"] for c in manifest["columnas"]] == result["resumen_general"]["columnas"]
+        assert os.path.exists(tmp_path / MANIFEST)
+
+    def test_streaming_does_not_write_snapshot(self, tmp_path, sample_csv_bytes):
+        result = DataProcessor.process_file(sample_csv_bytes, "test.csv", streaming=True,
+                                            snapshot_dir=str(tmp_path))
+
+        assert "snapshot" not in result
+
+
+class TestSnapshotStore:
+    """Tests unitarios para SnapshotStore"""
+
+    def test_publish_and_load_only_requested_columns(self, store, tmp_path, typed_frame):
+        """
+        Test con el cache local vacío solo se bajan el manifest y los archivos de las columnas
+        pedidas
+        """
+        staging = store.staging()
+        manifest = DatasetSnapshot.write(typed_frame, staging, "datos.csv")
+        summary = store.publish("f1", staging, manifest)
+        assert summary["columnas"] == 7
+        assert not os.path.exists(staging)
+
+        shutil.rmtree(os.path.join(store.cache_dir, "f1"))
+        df = store.load("f1", ["ciudad"])
+
+        assert df["ciudad"].tolist()[:2] == ["Lima", "Quito"]
+        assert sorted(os.path.basename(name) for name in store.storage.downloads) == [
+            "2.codigos.npy", "2.datos.npy", "2.offsets.npy", MANIFEST
+        ]
+
+    def test_load_uses_local_cache(self, store, typed_frame):
+        staging = store.staging()
+        store.publish("f1", staging, DatasetSnapshot.write(typed_frame, staging, "datos.csv"))
+
+        store.load("f1")
+
+        assert store.storage.downloads == []
+
+    def test_missing_snapshot(self, store):
+        assert store.manifest("nope") is None
+        with pytest.raises(FileNotFoundError):
+            store.load("nope")
+
+    def test_load_unknown_column(self, store, typed_frame):
+        staging = store.staging()
+        store.publish("f1", staging, DatasetSnapshot.write(typed_frame, staging, "datos.csv"))
+
+        with pytest.raises(KeyError):
+            store.load("f1", ["no_existe"])
+
+    def test_publish_result_failure_keeps_analysis(self, store, typed_frame):
+        """Test si la subida falla se descarta la foto y el resultado sigue sin la clave snapshot"""
+        staging = store.staging()
+        result = {"snapshot": DatasetSnapshot.write(typed_frame, staging, "datos.csv")}
+        store.storage.save_snapshot = lambda *args: (_ for _ in ()).throw(OSError("sin conexión"))
+
+        assert store.publish_result("f1", staging, result) is None
+        assert "snapshot" not in result
+        assert not os.path.exists(staging)
+
+    def test_evict_least_recently_used(self, store, typed_frame):
+        """
+        Test pasado SNAPSHOT_CACHE_MAX_MB se borran las fotos usadas hace más tiempo, y se vuelven
+        a bajar
+        """
+        for i, file_id in enumerate(["vieja", "usada", "nueva"]):
+            staging = store.staging()
+            manifest = DatasetSnapshot.write(typed_frame, staging, "datos.csv")
+            store.publish(file_id, staging, manifest)
+            old = time.time() - 3600 + i * 60
+            os.utime(os.path.join(store.cache_dir, file_id), (old, old))
+        store.load("usada")  # Pasa a ser la más reciente
+        size = sum(f.stat().st_size for f in os.scandir(os.path.join(store.cache_dir, "nueva")))
+
+        with patch.object(settings, "SNAPSHOT_CACHE_MAX_MB", 2.5 * size / (1024 * 1024)):
+            assert store.evict() == ["vieja"]
+            assert store.evict(keep="nueva") == []
+
+        assert sorted(os.listdir(store.cache_dir)) == ["nueva", "usada"]
+        assert store.load("vieja")["id"].tolist() == [1, 2, 3, 4]
+
+    def test_evict_skips_recent_and_drops_stale_staging(self, store, typed_frame):
+        """
+        Test no se borran fotos recién usadas (puede haber una lectura en curso) y sí los staging
+        abandonados
+        """
+        staging = store.staging()
+        store.publish("f1", staging, DatasetSnapshot.write(typed_frame, staging, "datos.csv"))
+        abandoned = store.staging()
+        old = time.time() - STAGING_MAX_AGE_SECONDS - 1
+        os.utime(abandoned, (old, old))
+
+        with patch.object(settings, "SNAPSHOT_CACHE_MAX_MB", 0):
+            assert store.evict() == []
+
+        assert os.listdir(store.cache_dir) == ["f1"]
+
+    def test_state_saved_next_to_snapshot(self, store):
+        """Test el estado del análisis por bloques se guarda en el bucket, no en el cache local"""
+        assert store.load_state("f1") is None
+
+        assert store.save_state("f1", b"\x93NUMPY estado") is True
+
+        assert store.load_state("f1") == b"\x93NUMPY estado"
+        assert not os.path.exists(os.path.join(store.cache_dir, "f1"))
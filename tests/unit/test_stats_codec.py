@@ -0,0 +1,99 @@
+import importlib.util
+import json
+import zlib
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.stats_codec import StatsCodec, StatsCodecError, HEADER, MAGIC, VERSION, JSON
+
+
+def _wide_stats(columns=200):
+    return {
+        "resumen_general": {
+            "nombre_archivo": "ancho.csv", "total_filas": 1000, "total_columnas": columns
+        },
+        "analisis_columnas": {
+            f"col_{i}": {
+                "nombre_columna": f"col_{i}",
+                "tipo_datos": "Numérico",
+                "estadisticas": {
+                    "promedio": i * 1.5, "minimo": 0, "maximo": i, "percentiles": {"p25": i / 4}
+                },
+                "interpretacion": [f"Valor promedio: {i * 1.5:.2f}"]
+            } for i in range(columns)
+        },
+        "estadisticas_pandas": {
+            f"col_{i}": {"count": 1000, "mean": i * 1.5, "top": None} for i in range(columns)
+        }
+    }
+
+
+class TestStatsCodec:
+    """Tests unitarios para el formato binario de las stats"""
+
+    def test_roundtrip_small_is_not_compressed(self):
+        stats = {"resumen_general": {"nombre_archivo": "ñandú.csv", "total_filas": 3}}
+
+        value = StatsCodec.encode(stats)
+
+        assert value.startswith(MAGIC)
+        assert value[HEADER.size - 5:HEADER.size - 4] == b"-"
+        assert StatsCodec.decode(value) == stats
+
+    @patch.object(settings, "STATS_COMPRESSION", "zlib")
+    def test_large_payload_is_compressed(self):
+        """Test por encima del umbral se comprime y queda mucho más chico que el JSON de antes"""
+        stats = _wide_stats()
+
+        value = StatsCodec.encode(stats)
+
+        assert StatsCodec.decode(value) == stats
+        assert len(value) < len(json.dumps(stats)) / 4
+        assert StatsCodec.payload_size(value) >= settings.STATS_COMPRESSION_MIN_BYTES
+
+    @patch.object(settings, "STATS_COMPRESSION", "zlib")
+    def test_dictionary_compresses_single_column(self):
+        """Test el diccionario prefijado comprime una sola columna mucho mejor que zlib solo"""
+        column = _wide_stats(1)["analisis_columnas"]["col_0"]
+        column.update(valores_totales=1000, valores_vacios=0, valores_unicos=998, exacto=True)
+        payload = json.dumps(column, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+        value = StatsCodec.encode(column)
+
+        assert StatsCodec.decode(value) == column
+        assert len(value) - HEADER.size < len(zlib.compress(payload, 1)) * 0.75
+
+    def test_unknown_compression(self):
+        """Test un código de compresión que encode no escribe se rechaza"""
+        payload = json.dumps(_wide_stats(3)).encode("utf-8")
+        value = HEADER.pack(MAGIC, VERSION, JSON, b"z", len(payload)) + zlib.compress(payload)
+
+        with pytest.raises(StatsCodecError):
+            StatsCodec.decode(value)
+
+    def test_reads_legacy_json(self):
+        """Test las entradas guardadas con json.dumps se siguen leyendo, como str o bytes"""
+        stats = _wide_stats(3)
+        legacy = json.dumps(stats)
+
+        assert StatsCodec.decode(legacy) == stats
+        assert StatsCodec.decode(legacy.encode("utf-8")) == stats
+        assert StatsCodec.payload_size(legacy) == len(legacy)
+
+    def test_unknown_version(self):
+        value = bytearray(StatsCodec.encode({"a": 1}))
+        value[len(MAGIC)] = 99
+
+        with pytest.raises(StatsCodecError):
+            StatsCodec.decode(bytes(value))
+
+    @patch.object(settings, "STATS_SERIALIZER", "msgpack")
+    def test_msgpack_requires_package(self):
+        if importlib.util.find_spec("msgpack") is None:
+            with pytest.raises(StatsCodecError):
+                StatsCodec.encode({"a": 1})
+        else:
+            stats = _wide_stats()
+            assert StatsCodec.decode(StatsCodec.encode(stats)) == stats
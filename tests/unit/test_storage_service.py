@@ -1,8 +1,11 @@
 import pytest
 from unittest.mock import Mock, patch
+from minio.commonconfig import ENABLED, Filter
 from minio.error import S3Error
+from minio.lifecycleconfig import Expiration, LifecycleConfig, Rule
 
-from app.services.storage_service import StorageService
+from app.core.config import settings
+from app.services.storage_service import StorageService, SNAPSHOT_LIFECYCLE_RULE
 
 
 class TestStorageService:
@@ -146,4 +149,47 @@ class TestStorageService:
         result = service.save_file(filename, file_bytes)
 
         assert result is True
-        mock_client.put_object.assert_called_once()
\ No newline at end of file
+        mock_client.put_object.assert_called_once()
+
+    @patch('app.services.storage_service.Minio')
+    def test_save_file_unseekable_stream(self, mock_minio_class):
+        """Test un stream no seekable se sube como multipart de largo desconocido"""
+        mock_client = Mock()
+        mock_client.bucket_exists.return_value = True
+        mock_minio_class.return_value = mock_client
+
+        service = StorageService()
+        stream = Mock()
+        stream.seekable.return_value = False
+
+        result = service.save_file("stream.csv", stream, "text/csv")
+
+        assert result is True
+        kwargs = mock_client.put_object.call_args.kwargs
+        assert kwargs["length"] == -1
+        assert kwargs["part_size"] >= 5 * 1024 * 1024
+
+    @patch('app.services.storage_service.Minio')
+    def test_save_snapshot_sets_lifecycle_once(self, mock_minio_class, tmp_path):
+        """
+        Test la primera foto configura el vencimiento de snapshots/ sin pisar las otras reglas
+        del bucket
+        """
+        mock_client = Mock()
+        mock_client.bucket_exists.return_value = True
+        other = Rule(ENABLED, rule_filter=Filter(prefix="tmp/"), rule_id="otra",
+                     expiration=Expiration(days=7))
+        mock_client.get_bucket_lifecycle.return_value = LifecycleConfig([other])
+        mock_minio_class.return_value = mock_client
+        (tmp_path / "manifest.json").write_text("{}")
+
+        service = StorageService()
+        service.save_snapshot("f1", str(tmp_path), ["manifest.json"])
+        service.save_snapshot("f2", str(tmp_path), ["manifest.json"])
+
+        mock_client.set_bucket_lifecycle.assert_called_once()
+        rules = mock_client.set_bucket_lifecycle.call_args.args[1].rules
+        assert [rule.rule_id for rule in rules] == ["otra", SNAPSHOT_LIFECYCLE_RULE]
+        assert rules[1].rule_filter.prefix == "snapshots/"
+        assert rules[1].expiration.days == settings.SNAPSHOT_RETENTION_DAYS
+        assert mock_client.fput_object.call_count == 2
@@ -0,0 +1,381 @@
+import warnings
+import pytest
+import numpy as np
+import pandas as pd
+from io import BytesIO
+from unittest.mock import patch
+
+from app.services.data_processor import DataProcessor
+from app.services.accumulators import NumericAccumulator, StreamingAnalyzer, FrequencyAccumulator
+from app.services.sketches import ReservoirSample, QuantileSketch, HyperLogLog, SpaceSaving
+
+
+@pytest.fixture
+def mixed_csv_bytes():
+    """CSV con numéricos, texto y nulos para comparar ambos caminos"""
+    rng = np.random.default_rng(42)
+    n = 500
+    df = pd.DataFrame({
+        "edad": rng.integers(18, 65, n),
+        "salario": np.round(rng.normal(50000, 8000, n), 2),
+        "departamento": rng.choice(["IT", "RRHH", "Ventas", "Marketing"], n,
+                                   p=[0.4, 0.3, 0.2, 0.1]),
+        "vacia": [None] * n,
+    })
+    df.loc[::7, "salario"] = np.nan
+    df.loc[::11, "departamento"] = None
+    return df.to_csv(index=False).encode("utf-8")
+
+
+class TestStreamingAnalysis:
+    """El análisis por bloques debe dar la misma estructura y valores que el análisis en memoria"""
+
+    def test_streaming_matches_in_memory(self, mixed_csv_bytes):
+        """Test mismos conteos, momentos y frecuencias con bloques pequeños"""
+        exact = DataProcessor.process_file(mixed_csv_bytes, "test.csv", streaming=False)
+        with patch('app.core.config.settings.CSV_CHUNK_ROWS', 37):
+            streamed = DataProcessor.process_file(mixed_csv_bytes, "test.csv", streaming=True)
+
+        # La memoria compactada solo aplica al análisis en memoria
+        exact["resumen_general"].pop("memoria")
+        assert streamed["resumen_general"] == exact["resumen_general"]
+
+        for col in ["edad", "salario", "departamento", "vacia"]:
+            a = exact["analisis_columnas"][col]
+            b = streamed["analisis_columnas"][col]
+            for key in ["tipo_datos", "valores_totales", "valores_vacios", "valores_unicos"]:
+                assert a[key] == b[key], (col, key)
+
+        for col in ["edad", "salario"]:
+            a = dict(exact["analisis_columnas"][col]["estadisticas"])
+            b = dict(streamed["analisis_columnas"][col]["estadisticas"])
+            for key in ["promedio", "minimo", "maximo", "desviacion_estandar"]:
+                assert a[key] == pytest.approx(b[key]), (col, key)
+
+            # Mediana y percentiles vienen del sketch: su rango cae dentro del error informado
+            values = np.sort(pd.read_csv(BytesIO(mixed_csv_bytes))[col].dropna().to_numpy())
+            margin = (b["error_cuantiles"] + 0.01) * len(values)
+            for name, q in [("p5", 0.05), ("p25", 0.25), ("p75", 0.75), ("p95", 0.95)]:
+                lo = np.searchsorted(values, b["percentiles"][name] - 0.01, side="left")
+                hi = np.searchsorted(values, b["percentiles"][name] + 0.01, side="right")
+                assert lo - margin <= q * len(values) <= hi + margin, (col, name)
+
+        a = exact["analisis_columnas"]["departamento"]["estadisticas"]
+        b = streamed["analisis_columnas"]["departamento"]["estadisticas"]
+        assert a == b
+
+        vacia = streamed["analisis_columnas"]["vacia"]
+        assert vacia["interpretacion"] == "No hay datos numéricos válidos"
+
+    def test_streaming_estadisticas_pandas_shape(self, mixed_csv_bytes):
+        """Test estadisticas_pandas conserva las columnas y filas de describe(include="all")"""
+        exact = DataProcessor.process_file(mixed_csv_bytes, "test.csv", streaming=False)
+        streamed = DataProcessor.process_file(mixed_csv_bytes, "test.csv", streaming=True)
+
+        assert set(streamed["estadisticas_pandas"]) == set(exact["estadisticas_pandas"])
+        edad = streamed["estadisticas_pandas"]["edad"]
+        assert set(edad) == set(exact["estadisticas_pandas"]["edad"])
+        assert streamed["estadisticas_pandas"]["edad"]["mean"] == pytest.approx(
+            exact["estadisticas_pandas"]["edad"]["mean"]
+        )
+
+    def test_large_or_unseekable_source_streams(self):
+        """Test se elige el camino por bloques para streams sin tamaño conocido"""
+        class Unseekable(BytesIO):
+            def seekable(self):
+                return False
+
+        assert DataProcessor._should_stream(Unseekable(b"a\n1\n"))
+        assert not DataProcessor._should_stream(BytesIO(b"a\n1\n"))
+
+    def test_header_only_csv(self):
+        """Test CSV sin filas"""
+        result = DataProcessor.process_file(b"a,b\n", "test.csv", streaming=True)
+
+        assert result["resumen_general"]["total_filas"] == 0
+        assert result["resumen_general"]["columnas"] == ["a", "b"]
+
+
+class TestAccumulators:
+    """Tests de los acumuladores mergeables"""
+
+    def test_numeric_merge_equals_single_pass(self):
+        """Test combinar dos acumuladores da los mismos momentos que una sola pasada"""
+        rng = np.random.default_rng(0)
+        data = rng.normal(10, 3, 1000)
+
+        whole = NumericAccumulator()
+        whole.update(data)
+        left, right = NumericAccumulator(), NumericAccumulator()
+        left.update(data[:300])
+        right.update(data[300:])
+        left.merge(right)
+
+        assert left.n == whole.n == 1000
+        assert left.mean == pytest.approx(data.mean())
+        assert left.result()["desviacion_estandar"] == pytest.approx(data.std(ddof=1))
+        assert left.min == data.min() and left.max == data.max()
+
+    def test_analyzer_merge(self):
+        """Test los analizadores de distintas partes del archivo se combinan"""
+        df = pd.DataFrame({"x": [1, 2, 3, 4], "y": ["a", "b", "a", None]})
+        a, b = StreamingAnalyzer(), StreamingAnalyzer()
+        a.update(df.iloc[:2])
+        b.update(df.iloc[2:])
+        a.merge(b)
+
+        assert a.total_rows == 4
+        assert a.columns["x"].numeric.n == 4
+        assert a.columns["y"].nulls == 1
+        assert a.columns["y"].frequencies.result()["top"][0] == ("a", 2)
+
+    def test_quantile_sketch_exact_while_small(self):
+        """Test el sketch da cuantiles exactos mientras no compacta"""
+        sketch = QuantileSketch(k=1000)
+        data = np.arange(101, dtype=float)
+        sketch.update(data)
+
+        assert sketch.error_bound == 0.0
+        assert sketch.quantiles([0.5])[0] == 50.0
+
+    def test_quantile_sketch_error_bound(self):
+        """Test en columnas grandes el error de rango queda dentro de la cota informada"""
+        rng = np.random.default_rng(1)
+        data = rng.lognormal(3, 1, 200_000)
+        sketch = QuantileSketch(error=0.01)
+        for block in np.array_split(data, 20):
+            sketch.update(block)
+
+        assert sketch.n == len(data)
+        assert 0 < sketch.error_bound <= 0.011
+        assert sum(len(level) for level in sketch.levels) < 5 * sketch.k
+
+        sorted_data = np.sort(data)
+        qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+        for q, value in zip(qs, sketch.quantiles(qs)):
+            rank = np.searchsorted(sorted_data, value) / len(data)
+            assert abs(rank - q) <= sketch.error_bound
+
+    def test_quantile_sketch_merge(self):
+        """Test combinar sketches de particiones distintas"""
+        rng = np.random.default_rng(2)
+        data = rng.normal(0, 1, 100_000)
+        left, right = QuantileSketch(error=0.01), QuantileSketch(error=0.01)
+        left.update(data[:40_000])
+        right.update(data[40_000:])
+        left.merge(right)
+
+        rank = np.searchsorted(np.sort(data), left.quantiles([0.5])[0]) / len(data)
+        assert left.n == len(data)
+        assert abs(rank - 0.5) <= left.error_bound
+
+    def test_in_memory_uses_sketch_above_threshold(self):
+        """Test el análisis en memoria cambia al sketch por encima del umbral de filas"""
+        series = pd.Series(np.arange(5000, dtype=float))
+        with patch('app.core.config.settings.QUANTILE_SKETCH_MIN_ROWS', 1000):
+            result = DataProcessor._analyze_numeric_column(series, "valor")
+
+        stats = result["estadisticas"]
+        assert stats["error_cuantiles"] > 0
+        assert abs(stats["mediana"] - 2500) <= stats["error_cuantiles"] * 5000 + 1
+        assert set(stats["percentiles"]) == {"p1", "p5", "p25", "p75", "p95", "p99"}
+
+    def test_reservoir_sample_is_bounded(self):
+        """Test la muestra nunca supera su capacidad"""
+        sample = ReservoirSample(100)
+        for _ in range(10):
+            sample.update(np.arange(1000))
+
+        assert len(sample.values) == 100
+        assert sample.seen == 10_000
+        assert not sample.exact
+
+    def test_hyperloglog_estimate(self):
+        """Test el estimador HLL queda dentro de unas veces su error relativo"""
+        for n in (100, 50_000, 500_000):
+            hll = HyperLogLog()
+            hll.update(np.arange(n))
+            assert abs(hll.estimate() - n) / n <= 3 * hll.relative_error
+
+    def test_hyperloglog_merge(self):
+        """Test unir HLL de particiones con solapamiento cuenta cada valor una vez"""
+        left, right = HyperLogLog(), HyperLogLog()
+        left.update(pd.Series([f"id_{i}" for i in range(60_000)]))
+        right.update(pd.Series([f"id_{i}" for i in range(40_000, 100_000)]))
+        left.merge(right)
+
+        assert abs(left.estimate() - 100_000) / 100_000 <= 3 * left.relative_error
+
+    def test_streaming_distinct_switches_to_hll(self):
+        """Test por bloques los distintos pasan a ser estimados por encima del límite exacto"""
+        df = pd.DataFrame({"id": np.arange(5000), "grupo": ["a", "b"] * 2500})
+        csv = df.to_csv(index=False).encode()
+        with patch('app.core.config.settings.HLL_EXACT_LIMIT', 1000), \
+                patch('app.core.config.settings.CSV_CHUNK_ROWS', 700):
+            result = DataProcessor.process_file(csv, "data.csv", streaming=True)
+
+        ids = result["analisis_columnas"]["id"]
+        assert ids["exacto"] is False
+        assert abs(ids["valores_unicos"] - 5000) / 5000 <= 0.05
+        assert result["analisis_columnas"]["grupo"]["exacto"] is True
+        assert result["analisis_columnas"]["grupo"]["valores_unicos"] == 2
+
+    def test_in_memory_distinct_uses_hll_above_threshold(self):
+        """Test en memoria se evita nunique() en columnas numéricas grandes"""
+        series = pd.Series(np.arange(5000, dtype=float))
+        with patch('app.core.config.settings.HLL_MIN_ROWS', 1000):
+            unicos, exacto = DataProcessor._count_distinct(series)
+
+        assert exacto is False
+        assert abs(unicos - 5000) / 5000 <= 0.05
+        assert DataProcessor._count_distinct(series) == (5000, True)
+
+    def test_space_saving_exact_below_capacity(self):
+        """Test con menos distintos que contadores el top-k coincide con value_counts"""
+        values = pd.Series(list("aaabbc") * 10)
+        summary = SpaceSaving(capacity=10)
+        summary.update(values.iloc[:25])
+        summary.update(values.iloc[25:])
+
+        assert summary.exact
+        assert summary.top(3) == list(values.value_counts().head(3).items())
+
+    def test_space_saving_keeps_dtype_without_warning(self):
+        """Test el primer bloque no concatena el índice vacío (FutureWarning de pandas)"""
+        dates = pd.to_datetime(["2024-01-01", "2024-01-02"])
+        for values in ([True, False, True], dates, pd.Categorical(["a", "b"])):
+            summary = SpaceSaving(capacity=10)
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", FutureWarning)
+                summary.update(pd.Series(values))
+                summary.update(pd.Series(values))
+
+            assert summary.counts.index.dtype == pd.Series(values).value_counts().index.dtype
+            assert summary.counts.sum() == 2 * len(values)
+
+    def test_space_saving_bounded_heavy_hitters(self):
+        """Test con muchos distintos el resumen queda acotado y conserva los frecuentes"""
+        rng = np.random.default_rng(3)
+        noise = [f"u{i}" for i in range(20_000)]
+        values = pd.Series(["x"] * 3000 + ["y"] * 2000 + noise).sample(frac=1, random_state=0)
+        left, right = SpaceSaving(capacity=100), SpaceSaving(capacity=100)
+        for block in np.array_split(values.to_numpy(), 10):
+            (left if rng.random() < 0.5 else right).update(pd.Series(block))
+        left.merge(right)
+
+        top = left.top(2)
+        assert len(left.counts) <= 100
+        assert [v for v, _ in top] == ["x", "y"]
+        assert 3000 <= top[0][1] <= 3000 + left.floor
+        assert 2000 <= top[1][1] <= 2000 + left.floor
+
+    def test_near_unique_column_skips_frequencies(self):
+        """Test una columna casi única no cuenta frecuencias y estima distintos"""
+        df = pd.DataFrame({"email": [f"user{i}@mail.com" for i in range(3000)],
+                           "grupo": ["a", "b", "c"] * 1000})
+        csv = df.to_csv(index=False).encode()
+        with patch('app.core.config.settings.TOPK_NEAR_UNIQUE_MIN_ROWS', 500), \
+                patch('app.core.config.settings.CSV_CHUNK_ROWS', 1000):
+            streaming = DataProcessor.process_file(csv, "data.csv", streaming=True)
+            in_memory = DataProcessor.process_file(csv, "data.csv", streaming=False)
+
+        for result in (streaming, in_memory):
+            email = result["analisis_columnas"]["email"]
+            assert email["estadisticas"]["casi_unico"] is True
+            assert email["estadisticas"]["top_3_valores"] == []
+            assert abs(email["valores_unicos"] - 3000) / 3000 <= 0.05
+            assert result["analisis_columnas"]["grupo"]["estadisticas"]["valores_unicos"] == 3
+        assert in_memory["analisis_columnas"]["email"]["exacto"] is True
+        assert streaming["analisis_columnas"]["email"]["exacto"] is False
+
+    def test_frequency_accumulator_merge_near_unique(self):
+        """Test si una partición es casi única, el merge también lo es"""
+        unique, regular = FrequencyAccumulator(), FrequencyAccumulator()
+        with patch('app.core.config.settings.TOPK_NEAR_UNIQUE_MIN_ROWS', 100):
+            unique.update(pd.Series([str(i) for i in range(200)]))
+            regular.update(pd.Series(["a"] * 200))
+        regular.merge(unique)
+
+        assert regular.near_unique
+        assert not regular.exact
+        assert regular.result()["top"] == []
+
+
+class TestAnalyzerState:
+    """Estado persistible de los acumuladores y anexado de lotes"""
+
+    def test_state_roundtrip_continues_like_uninterrupted(self, mixed_csv_bytes):
+        """Test seguir desde el estado guardado da lo mismo que no haberlo cortado"""
+        df = pd.read_csv(BytesIO(mixed_csv_bytes))
+        with patch('app.core.config.settings.HLL_EXACT_LIMIT', 50):
+            whole, resumed = StreamingAnalyzer(), StreamingAnalyzer()
+            whole.update(df.iloc[:300])
+            resumed.update(df.iloc[:300])
+            resumed = StreamingAnalyzer.loads(resumed.dumps())
+            whole.update(df.iloc[300:])
+            resumed.update(df.iloc[300:])
+
+        assert (DataProcessor.build_streaming_result(resumed, "a.csv")
+                == DataProcessor.build_streaming_result(whole, "a.csv"))
+        assert resumed.columns["salario"].numeric.distinct is None
+
+    def test_state_keeps_compacted_sketch(self):
+        """Test un sketch que ya compactó conserva su estado y su cota de error"""
+        analyzer = StreamingAnalyzer()
+        analyzer.update(pd.DataFrame({"x": np.arange(20000, dtype=np.float64)}))
+
+        restored = StreamingAnalyzer.loads(analyzer.dumps())
+
+        sketch = restored.columns["x"].numeric.quantiles
+        assert sketch.compacted
+        assert sketch.error_bound == analyzer.columns["x"].numeric.quantiles.error_bound
+        merged = analyzer.columns["x"].numeric.quantiles
+        np.testing.assert_array_equal(sketch.quantiles([0.5]), merged.quantiles([0.5]))
+
+    def test_state_rejects_unknown_version(self):
+        analyzer = StreamingAnalyzer()
+        with patch('app.services.accumulators.STATE_VERSION', 99):
+            data = analyzer.dumps()
+
+        with pytest.raises(ValueError):
+            StreamingAnalyzer.loads(data)
+
+    def test_streaming_result_includes_state(self, mixed_csv_bytes):
+        result = DataProcessor.process_file(mixed_csv_bytes, "a.csv", streaming=True)
+
+        assert StreamingAnalyzer.loads(result["estado"]).total_rows == 500
+
+    def test_append_csv_matches_full_file(self, mixed_csv_bytes):
+        """Test anexar un lote al estado da el mismo análisis que el archivo completo por bloques"""
+        lines = mixed_csv_bytes.splitlines(keepends=True)
+        first, batch = b"".join(lines[:301]), lines[0] + b"".join(lines[301:])
+        state = DataProcessor.process_file(first, "a.csv", streaming=True)["estado"]
+
+        result, new_state = DataProcessor.append_csv(BytesIO(batch), "lote.csv", state)
+        full = DataProcessor.process_file(mixed_csv_bytes, "a.csv", streaming=True)
+
+        assert result["resumen_general"]["total_filas"] == 500
+        assert result["resumen_general"]["filas_anexadas"] == 200
+        assert result["analisis_columnas"] == full["analisis_columnas"]
+        assert StreamingAnalyzer.loads(new_state).total_rows == 500
+
+    def test_append_csv_from_snapshot(self, tmp_path, mixed_csv_bytes):
+        """Test sin estado guardado se arma desde la foto columnar del análisis en memoria"""
+        lines = mixed_csv_bytes.splitlines(keepends=True)
+        first = DataProcessor.process_file(b"".join(lines[:301]), "a.csv",
+                                           snapshot_dir=str(tmp_path))
+
+        result, _ = DataProcessor.append_csv(BytesIO(lines[0] + b"".join(lines[301:])), "lote.csv",
+                                             snapshot=(str(tmp_path), first["snapshot"]))
+
+        departamento = result["analisis_columnas"]["departamento"]
+        assert result["resumen_general"]["total_filas"] == 500
+        assert departamento["valores_vacios"] == len(range(0, 500, 11))
+        assert departamento["estadisticas"]["valores_unicos"] == 4
+
+    def test_append_csv_missing_columns(self, mixed_csv_bytes):
+        state = DataProcessor.process_file(mixed_csv_bytes, "a.csv", streaming=True)["estado"]
+
+        with pytest.raises(ValueError, match="salario"):
+            batch = BytesIO(b"edad,departamento,vacia,extra\n30,IT,,1\n")
+            DataProcessor.append_csv(batch, "lote.csv", state)
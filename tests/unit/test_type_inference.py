@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+from app.services.data_processor import DataProcessor
+from app.services.type_inference import TypeInference
+
+
+class TestTypeInference:
+    """Tests para la inferencia de tipos por muestra"""
+
+    @pytest.mark.parametrize("series", [
+        pd.Series([1, 2, 3], dtype="int32"),
+        pd.Series([1.5, 2.5], dtype="float32"),
+        pd.Series([1, None, 3], dtype="Int64"),
+        pd.Series(["$1,234", "$56.50", "$7"]),
+        pd.Series(["1,234,567", "12", "-3.5"]),
+    ])
+    def test_numeric(self, series):
+        """Test enteros/decimales de cualquier ancho y números guardados como texto"""
+        assert TypeInference.infer(series).kind == "numeric"
+
+    @pytest.mark.parametrize("series", [
+        pd.Series([True, False]),
+        pd.Series(["Sí", "No", "sí"]),
+        pd.Series(["true", "false", None]),
+    ])
+    def test_boolean(self, series):
+        """Test booleanos nativos y en texto"""
+        assert TypeInference.infer(series).label == "Booleano"
+
+    @pytest.mark.parametrize("values,fmt", [
+        (["2023-01-01", "2023-12-31"], "%Y-%m-%d"),
+        (["25/12/2023", "01/02/2023"], "%d/%m/%Y"),
+        (["12/25/2023", "01/02/2023"], "%m/%d/%Y"),
+    ])
+    def test_date_format(self, values, fmt):
+        """Test fechas con el formato detectado sobre toda la muestra"""
+        column_type = TypeInference.infer(pd.Series(values))
+
+        assert column_type.label == "Fecha/Texto"
+        assert column_type.date_format == fmt
+
+    def test_categorical_and_text(self):
+        """Test pocos distintos repetidos es categórico; valores libres son texto"""
+        assert TypeInference.infer(pd.Series(["IT", "RRHH", "Ventas"] * 20)).label == "Categórico"
+        assert TypeInference.infer(pd.Series([f"nota {i}" for i in range(60)])).label == "Texto"
+        assert TypeInference.infer(pd.Series(["1,5", "2,75"])).label != "Numérico"
+
+    def test_uses_bounded_sample(self):
+        """Test la inferencia mira a lo sumo TYPE_INFERENCE_SAMPLE_ROWS valores"""
+        series = pd.Series([f"${i:,}" for i in range(5000)])
+        with patch('app.core.config.settings.TYPE_INFERENCE_SAMPLE_ROWS', 100):
+            assert len(TypeInference.sample(series)) == 100
+            assert TypeInference.infer(series).numeric_text
+
+    def test_currency_column_analyzed_as_numeric(self):
+        """Test una columna "$1,234" recibe el análisis numérico en ambos caminos"""
+        csv = "monto,activo\n\"$1,000\",si\n\"$2,500.50\",no\n,si\n\"$500\",si\n".encode()
+        exact = DataProcessor.process_file(csv, "test.csv", streaming=False)
+        streamed = DataProcessor.process_file(csv, "test.csv", streaming=True)
+
+        for result in (exact, streamed):
+            monto = result["analisis_columnas"]["monto"]
+            assert monto["tipo_datos"] == "Numérico"
+            assert monto["valores_vacios"] == 1
+            assert monto["estadisticas"]["maximo"] == pytest.approx(2500.5)
+            expected_mean = np.mean([1000, 2500.5, 500])
+            assert monto["estadisticas"]["promedio"] == pytest.approx(expected_mean, abs=0.01)
+            assert result["analisis_columnas"]["activo"]["tipo_datos"] == "Booleano"
+
+    def test_non_numeric_values_reported(self):
+        """Test los valores que no convierten a número fuera de la muestra se informan aparte"""
+        rows = [f'"${i:,}"' for i in range(1, 2000)] + ["n/d"]
+        csv = ("monto\n" + "\n".join(rows) + "\n").encode()
+        with patch('app.core.config.settings.TYPE_INFERENCE_SAMPLE_ROWS', 100), \
+                patch('app.core.config.settings.CSV_CHUNK_ROWS', 500):
+            exact = DataProcessor.process_file(csv, "test.csv", streaming=False)
+            streamed = DataProcessor.process_file(csv, "test.csv", streaming=True)
+
+        for result in (exact, streamed):
+            monto = result["analisis_columnas"]["monto"]
+            assert monto["tipo_datos"] == "Numérico"
+            assert monto["valores_vacios"] == 0
+            assert monto["valores_no_numericos"] == 1
+            assert monto["estadisticas"]["maximo"] == 1999
@@ -0,0 +1,167 @@
+import os
+import pytest
+from starlette.requests import Request
+
+from app.services.upload_service import (
+    UploadService, UploadStream, UploadSpool, UploadTooLargeError, InvalidUploadError,
+    ChunkPipe, StageError
+)
+
+
+BOUNDARY = "limite123"
+
+
+def build_multipart(filename, content, field_name="file"):
+    """Arma un cuerpo multipart/form-data con un solo archivo"""
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def build_request(body, chunk_size=7, content_type=f"multipart/form-data; boundary={BOUNDARY}"):
+    """Request de Starlette que entrega el cuerpo en bloques pequeños"""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    messages = [{"type": "http.request", "body": c, "more_body": True} for c in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    return Request(scope, receive)
+
+
+class TestUploadService:
+    """Tests unitarios para la recepción en streaming del upload"""
+
+    @pytest.mark.asyncio
+    async def test_spool_upload_reads_file_in_chunks(self):
+        """Test el archivo llega completo al spool aunque venga en bloques"""
+        content = b"nombre,edad\nJuan,25\nMaria,30"
+        stream = await UploadStream(build_request(build_multipart("test.csv", content))).start()
+
+        assert stream.filename == "test.csv"
+        assert stream.content_type == "text/csv"
+
+        spool = await UploadService.spool_upload(stream)
+        try:
+            assert spool.size == len(content)
+            assert spool.rewind().read() == content
+        finally:
+            spool.close()
+
+    @pytest.mark.asyncio
+    async def test_spool_upload_enforces_max_size(self):
+        """Test el límite de tamaño se aplica mientras llegan los bytes"""
+        content = b"x" * 100
+        request = build_request(build_multipart("big.csv", content))
+        stream = await UploadStream(request, max_bytes=50).start()
+
+        with pytest.raises(UploadTooLargeError):
+            await UploadService.spool_upload(stream)
+
+        # No se siguió leyendo el cuerpo más allá del límite
+        assert stream.size <= 50 + 7
+
+    @pytest.mark.asyncio
+    async def test_missing_file_field(self):
+        """Test error cuando el multipart no trae el campo file"""
+        request = build_request(build_multipart("test.csv", b"a,b", field_name="otro"))
+
+        with pytest.raises(InvalidUploadError):
+            await UploadStream(request).start()
+
+    @pytest.mark.asyncio
+    async def test_non_multipart_request(self):
+        """Test error cuando la petición no es multipart"""
+        request = build_request(b"{}", content_type="application/json")
+
+        with pytest.raises(InvalidUploadError):
+            await UploadStream(request).start()
+
+    def test_spool_rolls_over_to_disk(self):
+        """Test el spool pasa a disco por encima del umbral de memoria"""
+        spool = UploadSpool("test.csv", "text/csv", max_memory_bytes=10)
+        try:
+            spool.write(b"a" * 5)
+            assert spool.path is None
+            spool.write(b"a" * 20)
+            assert spool.path is not None
+            assert spool.size == 25
+            assert spool.rewind().read() == b"a" * 25
+        finally:
+            spool.close()
+
+        # Al cerrar se borra el archivo temporal
+        assert not os.path.exists(spool.path)
+
+    def test_spool_ensure_on_disk(self):
+        """Test un spool pequeño se vuelca a disco cuando se necesita una ruta"""
+        spool = UploadSpool("test.csv", "text/csv")
+        try:
+            spool.write(b"a,b\n1,2\n")
+            path = spool.ensure_on_disk()
+            with open(path, "rb") as f:
+                assert f.read() == b"a,b\n1,2\n"
+        finally:
+            spool.close()
+
+
+class TestUploadPipeline:
+    """Tests del modo pipeline: el upload se reparte entre varias etapas a la vez"""
+
+    @pytest.mark.asyncio
+    async def test_tee_upload_feeds_every_stage(self):
+        """Test cada etapa recibe el archivo completo y se reportan tiempos"""
+        content = b"nombre,edad\n" + b"Juan,25\n" * 500
+        request = build_request(build_multipart("test.csv", content), chunk_size=64)
+        stream = await UploadStream(request).start()
+
+        results, tiempos = await UploadService.tee_upload(stream, {
+            "a": lambda pipe: pipe.read(),
+            "b": lambda pipe: len(pipe.readall()),
+        })
+
+        assert results["a"] == content
+        assert results["b"] == len(content)
+        for key in ("a_s", "b_s", "recepcion_s", "total_s", "solapamiento_s"):
+            assert key in tiempos
+
+    @pytest.mark.asyncio
+    async def test_tee_upload_stage_error(self):
+        """Test el error de una etapa no bloquea a las demás y se informa con su nombre"""
+        content = b"x" * 10_000
+        request = build_request(build_multipart("test.csv", content), chunk_size=64)
+        stream = await UploadStream(request).start()
+
+        def failing(pipe):
+            raise ValueError("fallo")
+
+        with pytest.raises(StageError) as exc_info:
+            await UploadService.tee_upload(stream, {"ok": lambda pipe: pipe.readall(),
+                                                    "mal": failing})
+
+        assert exc_info.value.stage == "mal"
+
+    @pytest.mark.asyncio
+    async def test_tee_upload_too_large_aborts_stages(self):
+        """Test superar el límite aborta todas las etapas"""
+        request = build_request(build_multipart("big.csv", b"x" * 1000))
+        stream = await UploadStream(request, max_bytes=100).start()
+
+        with pytest.raises(UploadTooLargeError):
+            await UploadService.tee_upload(stream, {"a": lambda pipe: pipe.readall()})
+
+    def test_chunk_pipe_discards_after_reader_closed(self):
+        """Test el productor no se bloquea si el lector terminó antes"""
+        pipe = ChunkPipe(max_chunks=1)
+        pipe.close_reader()
+
+        assert pipe.put(b"a")
+        assert pipe.put(b"b")
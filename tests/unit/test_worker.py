@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+import redis
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.core.config import settings
+from app.services.job_queue import QueuedTask
+from app.services.job_service import JobService, JobState
+from app.worker import Worker, _serve
+
+
+@pytest.fixture
+def worker(sample_csv_bytes):
+    jobs = {}
+    cache = AsyncMock()
+    cache.get_job.side_effect = jobs.get
+    cache.set_job.side_effect = lambda file_id, job: jobs.__setitem__(file_id, dict(job))
+    cache.jobs = jobs
+
+    storage = Mock()
+    storage.download_file.side_effect = lambda object_name, f: f.write(sample_csv_bytes)
+
+    queue = Mock()
+    queue.retry.return_value = True
+    return Worker("w1", job_queue=queue, storage=storage, cache=cache)
+
+
+def _message(attempts=0, **task):
+    task = dict({"file_id": "id-1", "filename": "test.csv", "size_bytes": 10,
+                 "object_name": "id-1/test.csv"}, **task)
+    return QueuedTask("1-0", task, attempts)
+
+
+class TestWorker:
+    """Tests unitarios para el worker de la cola"""
+
+    @pytest.mark.asyncio
+    async def test_handle_success_acks_after_stats(self, worker):
+        """Test el worker guarda las stats, marca Procesado y recién ahí hace ack"""
+        await worker.cache.set_job("id-1", JobService.new_job("id-1", "test.csv", 10))
+
+        assert await worker.handle(_message()) is True
+
+        worker.storage.download_file.assert_called_once()
+        assert worker.storage.download_file.call_args.args[0] == "id-1/test.csv"
+        stats = worker.cache.set_stats.call_args.args[1]
+        assert stats["resumen_general"]["total_filas"] == 5
+        assert worker.cache.jobs["id-1"]["estado"] == JobState.PROCESADO
+        worker.queue.ack.assert_called_once_with("1-0")
+
+    @pytest.mark.asyncio
+    async def test_handle_applies_column_selection(self, worker):
+        """Test la selección de columnas viaja en el mensaje"""
+        await worker.handle(_message(columns={"names": ["edad"], "pattern": None}))
+
+        stats = worker.cache.set_stats.call_args.args[1]
+        assert list(stats["analisis_columnas"]) == ["edad"]
+
+    @pytest.mark.asyncio
+    async def test_large_csv_uses_byte_ranges(self, worker):
+        """Test un CSV desde CSV_PARALLEL_MIN_MB se analiza por rangos en los procesos del worker"""
+        worker._executor = ThreadPoolExecutor(2)
+        with patch.object(settings, "CSV_PARALLEL_MIN_MB", 0), \
+                patch.object(settings, "CSV_PARALLEL_RANGES", 2):
+            assert await worker.handle(_message()) is True
+
+        stats = worker.cache.set_stats.call_args.args[1]
+        assert stats["resumen_general"]["total_filas"] == 5
+        assert stats["resumen_general"]["rangos"] >= 1
+        worker.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_handle_failure_requeues(self, worker):
+        """Test un fallo reencola el trabajo y lo deja Subido con el error"""
+        worker.storage.download_file.side_effect = RuntimeError("sin conexión")
+
+        assert await worker.handle(_message()) is False
+
+        worker.queue.retry.assert_called_once()
+        worker.queue.ack.assert_not_called()
+        job = worker.cache.jobs["id-1"]
+        assert job["estado"] == JobState.SUBIDO
+        assert job["reintentos"] == 1
+        assert job["error"] == "sin conexión"
+
+    @pytest.mark.asyncio
+    async def test_handle_failure_last_attempt_is_error(self, worker):
+        worker.storage.download_file.side_effect = RuntimeError("sin conexión")
+        worker.queue.retry.return_value = False
+
+        await worker.handle(_message())
+
+        assert worker.cache.jobs["id-1"]["estado"] == JobState.ERROR
+
+    @pytest.mark.asyncio
+    async def test_redis_error_leaves_message_pending(self, worker):
+        """Test si Redis falla al guardar las stats no hay ack ni reintento: se reclama después"""
+        worker.cache.set_stats.side_effect = redis.ConnectionError("redis caído")
+
+        assert await worker.handle(_message()) is False
+
+        worker.queue.ack.assert_not_called()
+        worker.queue.retry.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_exhausted_claim_goes_to_dead_letter(self, worker):
+        """Test un mensaje reclamado sin intentos restantes no se vuelve a procesar"""
+        assert await worker.handle(_message(attempts=settings.JOB_MAX_ATTEMPTS)) is False
+
+        worker.queue.dead_letter.assert_called_once()
+        worker.storage.download_file.assert_not_called()
+        assert worker.cache.jobs["id-1"]["estado"] == JobState.ERROR
+
+    @pytest.mark.asyncio
+    async def test_run_once_prefers_stalled(self, worker):
+        """Test los mensajes abandonados se procesan antes que los nuevos"""
+        worker.queue.claim_stalled.return_value = [_message()]
+
+        assert await worker.run_once() == 1
+        worker.queue.read.assert_not_called()
+
+        worker.queue.claim_stalled.return_value = []
+        worker.queue.read.return_value = []
+        assert await worker.run_once(block_ms=5) == 0
+        worker.queue.read.assert_called_once_with("w1", block_ms=5)
+
+    @pytest.mark.asyncio
+    async def test_blocking_read_yields_event_loop(self, worker):
+        """Test mientras XREADGROUP bloquea, el event loop sigue atendiendo otras tareas"""
+        worker.queue.claim_stalled.return_value = []
+        worker.queue.read.side_effect = lambda *args, **kwargs: time.sleep(0.2) or []
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while not polling.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        polling = asyncio.ensure_future(worker.run_once(block_ms=200))
+        await asyncio.gather(polling, ticker())
+
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_serve_shuts_down_pools(self, worker):
+        """Test al terminar se apagan el pool de rangos y el del perfil de columnas"""
+        worker.queue.claim_stalled.return_value = []
+        worker.queue.read.return_value = []
+        executor = worker._executor = Mock()
+
+        with patch('app.worker.ColumnProfiler.shutdown') as profiler_shutdown:
+            await _serve(worker, once=True)
+
+        executor.shutdown.assert_called_once()
+        profiler_shutdown.assert_called_once()
+        worker.cache.close.assert_awaited_once()
@@ -0,0 +1,87 @@
+import pytest
+import pandas as pd
+from io import BytesIO
+from unittest.mock import patch
+
+from app.services.data_processor import DataProcessor
+from app.services.xlsx_reader import XlsxReader
+
+
+@pytest.fixture
+def workbook_bytes():
+    """Libro con dos hojas de datos, una vacía y filas vacías al final de la primera"""
+    ventas = pd.DataFrame({
+        "producto": ["A", "B", "C", "A", "B", "A"],
+        "precio": [10.5, 20.0, 15.25, 10.5, 20.0, 11.0],
+        "unidades": [1, 2, 3, 4, 5, 6]
+    })
+    clientes = pd.DataFrame({"cliente": ["x", "y", "z"], "edad": [30, 40, None]})
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        ventas.to_excel(writer, sheet_name="ventas", index=False)
+        clientes.to_excel(writer, sheet_name="clientes", index=False)
+        pd.DataFrame({"sin_datos": []}).to_excel(writer, sheet_name="vacia", index=False)
+        # Celda con formato pero sin valor: openpyxl la ve como una fila vacía al final
+        writer.sheets["ventas"].cell(row=20, column=1).number_format = "0.00"
+    return buffer.getvalue()
+
+
+class TestXlsxReader:
+    """Tests para la lectura en streaming de .xlsx"""
+
+    def test_chunks_match_read_excel(self, workbook_bytes):
+        """Test los bloques concatenados equivalen a pandas.read_excel hoja por hoja"""
+        source = BytesIO(workbook_bytes)
+        assert XlsxReader.sheet_names(source) == ["ventas", "clientes", "vacia"]
+
+        for sheet in ("ventas", "clientes"):
+            chunks = list(XlsxReader.iter_chunks(source, sheet, chunksize=4))
+            expected = pd.read_excel(BytesIO(workbook_bytes), sheet_name=sheet)
+            pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+        assert len(list(XlsxReader.iter_chunks(source, "ventas", chunksize=4))) == 2
+
+    def test_empty_sheet_keeps_header(self, workbook_bytes):
+        """Test una hoja sin filas devuelve un bloque vacío con sus columnas"""
+        chunks = list(XlsxReader.iter_chunks(BytesIO(workbook_bytes), "vacia", chunksize=4))
+        assert len(chunks) == 1
+        assert list(chunks[0].columns) == ["sin_datos"]
+        assert chunks[0].empty
+
+    def test_header_names_like_pandas(self):
+        """Test encabezados vacíos y repetidos se nombran como en pandas"""
+        header = ("a", None, "a", "b", None, None)
+        assert XlsxReader._columns(header) == ["a", "Unnamed: 1", "a.1", "b"]
+
+
+class TestExcelSheets:
+    """Tests para el análisis de todas las hojas de un libro"""
+
+    def test_every_sheet_in_resumen(self, workbook_bytes):
+        """Test cada hoja aparece en resumen_general y la primera sigue en el nivel superior"""
+        result = DataProcessor.process_file(workbook_bytes, "libro.xlsx")
+
+        resumen = result["resumen_general"]
+        assert resumen["total_hojas"] == 3
+        assert list(resumen["hojas"]) == ["ventas", "clientes", "vacia"]
+        assert resumen["total_filas"] == 6
+        assert result["analisis_columnas"]["unidades"]["estadisticas"]["maximo"] == 6
+
+        clientes = resumen["hojas"]["clientes"]
+        assert clientes["total_filas"] == 3
+        assert clientes["analisis_columnas"]["edad"]["valores_vacios"] == 1
+        assert resumen["hojas"]["vacia"]["total_filas"] == 0
+
+    def test_large_sheet_uses_accumulators(self, workbook_bytes):
+        """Test una hoja de más de un bloque se analiza con los acumuladores del CSV en streaming"""
+        in_memory = DataProcessor.process_file(workbook_bytes, "libro.xlsx")
+        with patch('app.core.config.settings.CSV_CHUNK_ROWS', 2):
+            streamed = DataProcessor.process_file(workbook_bytes, "libro.xlsx")
+
+        assert "memoria" not in streamed["resumen_general"]
+        for col in ("precio", "unidades"):
+            for key in ("promedio", "minimo", "maximo"):
+                assert streamed["analisis_columnas"][col]["estadisticas"][key] == pytest.approx(
+                    in_memory["analisis_columnas"][col]["estadisticas"][key]
+                )
+        assert streamed["analisis_columnas"]["producto"]["estadisticas"]["valor_mas_comun"] == "A"
+        assert streamed["resumen_general"]["hojas"]["clientes"]["total_filas"] == 3